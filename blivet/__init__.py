@@ -24,8 +24,10 @@ __version__ = '2.0.2'
 
 import sys
 import importlib
+import threading
 import warnings
 import syslog
+from six.moves.collections_abc import Set  # pylint: disable=import-error
 
 from . import util, arch
 
@@ -59,7 +61,6 @@ import gi
 gi.require_version("GLib", "2.0")
 gi.require_version("BlockDev", "2.0")
 
-# initialize the libblockdev library
 from gi.repository import GLib
 from gi.repository import BlockDev as blockdev
 if arch.is_s390():
@@ -71,20 +72,125 @@ else:
 if hasattr(blockdev.Plugin, "NVME"):
     _REQUESTED_PLUGIN_NAMES.add("nvme")
 
-_requested_plugins = blockdev.plugin_specs_from_names(_REQUESTED_PLUGIN_NAMES)
-try:
-    # do not check for dependencies during libblockdev initialization, do runtime
-    # checks instead
-    blockdev.switch_init_checks(False)
-    succ_, avail_plugs = blockdev.try_reinit(require_plugins=_requested_plugins, reload=False, log_func=log_bd_message)
-except GLib.GError as err:
-    raise RuntimeError("Failed to initialize the libblockdev library: %s" % err)
-else:
-    avail_plugs = set(avail_plugs)
+# names of the attributes of the blockdev module holding the plugins' functions
+# if they differ from the names of the plugins
+_PLUGIN_ATTRS = {"mdraid": "md"}
+
+_plugins_lock = threading.Lock()
+_tried_plugins = set()
+_loaded_plugins = set()
+_failed_plugins = set()
+
+
+class _PluginNames(Set):
+
+    """
+    Read-only view of a set of plugin names which loads the plugins blivet
+    uses by default when it is first read, like the sets filled in when all
+    the plugins were loaded on import used to be.
+    """
+
+    def __init__(self, names):
+        """
+        :param set names: the set of names to provide a view of
+        """
+        self._names = names
+
+    @classmethod
+    def _from_iterable(cls, it):
+        return set(it)
+
+    def _loaded(self):
+        load_plugins()
+        return self._names
+
+    def __contains__(self, name):
+        return name in self._loaded()
+
+    def __iter__(self):
+        return iter(self._loaded())
+
+    def __len__(self):
+        return len(self._loaded())
+
+    def __repr__(self):
+        return repr(self._loaded())
+
+
+avail_plugs = _PluginNames(_loaded_plugins)
+missing_plugs = _PluginNames(_failed_plugins)
+
+
+def load_plugins(names=None):
+    """ Load libblockdev plugins that have not been loaded yet.
+
+        :param names: names of the plugins to load, all the plugins blivet
+                      uses by default
+        :type names: iterable of str or NoneType
+        :returns: names of the plugins that are loaded
+        :rtype: set of str
+
+        The plugins are loaded on demand, when their functions are first used,
+        their availability is checked or :data:`avail_plugs` or
+        :data:`missing_plugs` is read, so this only needs to be called to load
+        them ahead of time.
+    """
+    names = _REQUESTED_PLUGIN_NAMES if names is None else set(names)
+    if names <= _tried_plugins:
+        return _loaded_plugins
+
+    with _plugins_lock:
+        names = names - _tried_plugins
+        if not names:
+            return _loaded_plugins
+
+        # keep requesting the plugins loaded before so that they stay loaded
+        specs = blockdev.plugin_specs_from_names(names | _loaded_plugins)
+        try:
+            _succ, plugs = blockdev.try_reinit(require_plugins=specs, reload=False,
+                                               log_func=log_bd_message)
+        except GLib.GError as err:
+            raise RuntimeError("Failed to initialize the libblockdev library: %s" % err)
+
+        _loaded_plugins.update(plugs)
+        for p in names - _loaded_plugins:
+            log.info("Failed to load plugin %s", p)
+            _failed_plugins.add(p)
+        _tried_plugins.update(names)
+
+    return _loaded_plugins
+
+
+class _LazyPlugin(object):
+
+    """
+    Stand-in for the functions of a libblockdev plugin (e.g. blockdev.lvm)
+    which loads the plugin when any of them is requested.
+    """
+
+    def __init__(self, name, functions):
+        """
+        :param str name: name of the plugin
+        :param functions: the real object holding the plugin's functions
+        """
+        self._plugin_name = name
+        self._functions = functions
+
+    def __getattr__(self, attr):
+        if self._plugin_name not in _tried_plugins:
+            load_plugins([self._plugin_name])
+        return getattr(self._functions, attr)
+
+
+# do not check for dependencies during libblockdev initialization, do runtime
+# checks instead
+blockdev.switch_init_checks(False)
 
-missing_plugs = _REQUESTED_PLUGIN_NAMES - avail_plugs
-for p in missing_plugs:
-    log.info("Failed to load plugin %s", p)
+# the library is initialized when the first plugin is loaded
+for _name in _REQUESTED_PLUGIN_NAMES:
+    _attr = _PLUGIN_ATTRS.get(_name, _name)
+    if hasattr(blockdev, _attr) and not isinstance(getattr(blockdev, _attr), _LazyPlugin):
+        setattr(blockdev, _attr, _LazyPlugin(_name, getattr(blockdev, _attr)))
 
 
 class _LazyImportObject(object):
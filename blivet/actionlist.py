@@ -28,8 +28,9 @@ from .callbacks import callbacks as _callbacks
 from .deviceaction import ActionCreateDevice
 from .deviceaction import action_type_from_string, action_object_from_string
 from .devicelibs import lvm
-from .devices import PartitionDevice
+from .devices import PartitionDevice, LVMLogicalVolumeDevice, LVMVolumeGroupDevice
 from .errors import DiskLabelCommitError
+from .static_data import pvs_info, drop_vg_cache
 from . import tsort
 from .threads import blivet_lock, SynchronizedMeta
 
@@ -53,6 +54,24 @@ def with_flag(flag_attr):
     return run_func_with_flag_attr_set
 
 
+def _drop_lvm_info(action):
+    """ Drop cached lvm information about the VG changed by an action. """
+    device = action.device
+    vg = None
+    if isinstance(device, LVMVolumeGroupDevice):
+        vg = device
+    elif isinstance(device, LVMLogicalVolumeDevice):
+        vg = device.vg
+    elif isinstance(getattr(action, "container", None), LVMVolumeGroupDevice):
+        vg = action.container
+    elif "lvmpv" in (device.format.type, getattr(getattr(action, "format", None), "type", None)):
+        pvs_info.drop_pv_cache(device.path)
+        vg = next((c for c in device.children if isinstance(c, LVMVolumeGroupDevice)), None)
+
+    if vg is not None:
+        drop_vg_cache(vg.name, vg.uuid)
+
+
 @add_metaclass(SynchronizedMeta)
 class ActionList(object):
     _unsynchronized_methods = ['process']
@@ -64,16 +83,66 @@ class ActionList(object):
         self._completed_actions = []
         self.processing = False
 
+        self._index = None
+        self._index_key = None
+
     def __iter__(self):
         return iter(self._actions)
 
+    def _index_valid(self):
+        """ Whether the indexes reflect the current action list. """
+        return (self._index is not None and self._index_key[0] is self._actions and
+                self._index_key[1] == len(self._actions))
+
+    def _get_index(self):
+        """ Return the indexes of the action list, building them if needed.
+
+            :returns: a dict mapping "device", "container", "type" and "object"
+                      to dicts of lists of the actions with a given device id,
+                      container id, action type and object type, respectively
+            :rtype: dict
+
+            The lists are in the order of the action list. The indexes are
+            updated by the methods changing the action list and rebuilt when
+            the list was replaced or changed its length otherwise.
+        """
+        if not self._index_valid():
+            self._index = dict((name, dict()) for name in ("device", "container", "type", "object"))
+            for action in self._actions:
+                self._index_action(action)
+            self._index_key = (self._actions, len(self._actions))
+
+        return self._index
+
+    @staticmethod
+    def _index_keys(action):
+        container = getattr(action, "container", None)
+        return [("device", action.device.id),
+                ("container", container.id if container is not None else None),
+                ("type", action.type),
+                ("object", action.obj)]
+
+    def _index_action(self, action, remove=False):
+        for (name, key) in self._index_keys(action):
+            if remove:
+                self._index[name][key].remove(action)
+            else:
+                self._index[name].setdefault(key, []).append(action)
+
+    def _append(self, action):
+        valid = self._index_valid()
+        self._actions.append(action)
+        if valid:
+            self._index_action(action)
+            self._index_key = (self._actions, len(self._actions))
+
     def add(self, action):
         if self._add_func is not None:
             self._add_func(action)
 
         # apply the action before adding it in case apply raises an exception
         action.apply()
-        self._actions.append(action)
+        self._append(action)
         _callbacks.action_added(action=action)
         log.info("registered action: %s", action)
 
@@ -82,7 +151,11 @@ class ActionList(object):
             self._remove_func(action)
 
         action.cancel()
+        valid = self._index_valid()
         self._actions.remove(action)
+        if valid:
+            self._index_action(action, remove=True)
+            self._index_key = (self._actions, len(self._actions))
         _callbacks.action_removed(action=action)
         log.info("canceled action %s", action)
 
@@ -115,8 +188,20 @@ class ActionList(object):
         _type = action_type_from_string(action_type)
         _object = action_object_from_string(object_type)
 
+        # only look at the actions in the most selective applicable index
+        index = self._get_index()
+        if device is not None or devid is not None:
+            candidates = index["device"].get(device.id if device is not None else devid, [])
+        else:
+            buckets = []
+            if _type is not None:
+                buckets.append(index["type"].get(_type, []))
+            if _object is not None:
+                buckets.append(index["object"].get(_object, []))
+            candidates = min(buckets, key=len) if buckets else self._actions
+
         actions = []
-        for action in self._actions:
+        for action in candidates:
             if device is not None and action.device != device:
                 continue
 
@@ -137,48 +222,95 @@ class ActionList(object):
         return actions
 
     def prune(self):
-        """ Remove redundant/obsolete actions from the action list. """
-        for action in reversed(self._actions[:]):
-            if action not in self._actions:
+        """ Remove redundant/obsolete actions from the action list.
+
+            An action can only obsolete actions on the same device and actions
+            adding members to its device (see
+            :meth:`~.deviceaction.DeviceAction.obsoletes`), so only those are
+            checked for each action.
+        """
+        index = self._get_index()
+        position = dict((id(action), idx) for (idx, action) in enumerate(self._actions))
+        pruned = set()
+        for action in reversed(self._actions):
+            if id(action) in pruned:
                 log.debug("action %d already pruned", action.id)
                 continue
 
-            for obsolete in self._actions[:]:
+            candidates = dict((id(a), a) for a in index["device"].get(action.device.id, []))
+            candidates.update((id(a), a) for a in index["container"].get(action.device.id, []))
+            for key in sorted(candidates, key=position.get):
+                if key in pruned:
+                    continue
+
+                obsolete = candidates[key]
                 if action.obsoletes(obsolete):
                     log.info("removing obsolete action %d (%d)",
                              obsolete.id, action.id)
-                    self._actions.remove(obsolete)
+                    pruned.add(key)
 
-                    if obsolete.obsoletes(action) and action in self._actions:
+                    if obsolete.obsoletes(action) and id(action) not in pruned:
                         log.info("removing mutually-obsolete action %d (%d)",
                                  action.id, obsolete.id)
-                        self._actions.remove(action)
+                        pruned.add(id(action))
+
+        if pruned:
+            self._actions = [a for a in self._actions if id(a) not in pruned]
+
+    @staticmethod
+    def _relation_keys(action):
+        """ Return ids of the devices an action's ordering can depend on.
+
+            Apart from the ordering by action type, two actions can only
+            require one another if the sets returned for them intersect.
+        """
+        devices = [action.device, action.container,
+                   getattr(action.device, "container", None)]
+        return set(a.id for d in devices if d is not None for a in d.ancestors)
 
     def sort(self):
-        """ Sort actions based on dependencies. """
+        """ Sort actions based on dependencies.
+
+            All non-container actions of a higher type precede those of a
+            lower type (see :meth:`~.deviceaction.DeviceAction.requires`).
+            Those edges are expressed as ranks in the graph. The remaining
+            requirements are only checked between actions whose devices are
+            related by way of their ancestors or containers.
+        """
         if not self._actions:
             return
 
+        # bucket the actions by related device so we only have to compare
+        # actions that can possibly depend on each other
+        keys = [self._relation_keys(action) for action in self._actions]
+        buckets = dict()
+        for (idx, action_keys) in enumerate(keys):
+            for key in action_keys:
+                buckets.setdefault(key, []).append(idx)
+
+        ranks = dict((idx, None if action.is_container else action.type)
+                     for (idx, action) in enumerate(self._actions))
+
         edges = []
 
         # collect all ordering requirements for the actions
-        for action in self._actions:
-            action_idx = self._actions.index(action)
-            children = []
-            for _action in self._actions:
-                if _action == action:
+        for (action_idx, action) in enumerate(self._actions):
+            related = set(idx for key in keys[action_idx] for idx in buckets[key])
+            for child_idx in sorted(related):
+                if child_idx == action_idx:
                     continue
 
-                # create edges based on both action type and dependencies.
-                if _action.requires(action):
-                    children.append(_action)
+                # edges implied by action type are covered by the ranks
+                if ranks[action_idx] is not None and ranks[child_idx] is not None and \
+                   ranks[child_idx] < ranks[action_idx]:
+                    continue
 
-            for child in children:
-                child_idx = self._actions.index(child)
-                edges.append((action_idx, child_idx))
+                # create edges based on both action type and dependencies.
+                if self._actions[child_idx].requires(action):
+                    edges.append((action_idx, child_idx))
 
         # create a graph reflecting the ordering information we have
-        graph = tsort.create_graph(list(range(len(self._actions))), edges)
+        graph = tsort.create_graph(list(range(len(self._actions))), edges, ranks=ranks)
 
         # perform a topological sort based on the graph's contents
         order = tsort.tsort(graph)
@@ -235,7 +367,7 @@ class ActionList(object):
                 action = ActionCreateDevice(device)
                 # apply the action first in case the apply method fails
                 action.apply()
-                self._actions.append(action)
+                self._append(action)
 
         log.info("sorting actions...")
         self.sort()
@@ -306,6 +438,7 @@ class ActionList(object):
                         device.update_name()
                         device.format.device = device.path
 
+                _drop_lvm_info(action)
                 self._completed_actions.append(self._actions.pop(0))
                 _callbacks.action_executed(action=action)
 
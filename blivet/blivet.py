@@ -144,6 +144,25 @@ class Blivet(object):
         if flags.include_nodev:
             self.devicetree.handle_nodev_filesystems()
 
+    def refresh(self, devices=None):
+        """ Update storage configuration to reflect changes in system state.
+
+            :keyword devices: devices to re-scan even if they seem unchanged
+            :type devices: list of :class:`~.devices.StorageDevice`
+
+            Unlike :meth:`reset`, this keeps the existing device tree and only
+            scans devices that have been added, removed or changed since they
+            were last scanned. See :meth:`devicetree.DeviceTree.refresh`.
+        """
+        log.info("refreshing Blivet (version %s) instance %s", __version__, self)
+
+        self.devicetree.refresh(devices=devices)
+        self.edd_dict = get_edd_dict(self.partitioned)
+        self.devicetree.edd_dict = self.edd_dict
+
+        if flags.include_nodev:
+            self.devicetree.handle_nodev_filesystems()
+
     @property
     def devices(self):
         """ A list of all the devices in the device tree. """
@@ -1297,12 +1316,20 @@ class Blivet(object):
         return factory.device
 
     def copy(self):
+        """ Return a deep copy of this instance.
+
+            The whole device tree is copied, there is no copy-on-write. Only
+            immutable :class:`~.size.Size` instances and the disklabels'
+            original parted disks, which are never modified in place, are
+            shared with the copy.
+        """
         log.debug("starting Blivet copy")
         new = copy.deepcopy(self)
         # go through and re-get parted_partitions from the disks since they
         # don't get deep-copied
         hidden_partitions = [d for d in new.devicetree._hidden
                              if isinstance(d, PartitionDevice)]
+        parted_partitions = dict()
         for partition in new.partitions + hidden_partitions:
             if not partition._parted_partition:
                 continue
@@ -1311,8 +1338,15 @@ class Blivet(object):
             req_disks = (new.devicetree.get_device_by_id(disk.id) for disk in partition.req_disks)
             partition.req_disks = [disk for disk in req_disks if disk is not None]
 
-            p = partition.disk.format.parted_disk.getPartitionByPath(partition.path)
-            partition.parted_partition = p
+            # map each disk's partitions by path once instead of searching
+            # the disk for every partition
+            disk = partition.disk
+            if disk.id not in parted_partitions:
+                by_path = parted_partitions[disk.id] = dict()
+                for p in disk.format.parted_disk.partitions:
+                    by_path.setdefault(p.path, p)
+
+            partition.parted_partition = parted_partitions[disk.id].get(partition.path)
 
         log.debug("finished Blivet copy")
         return new
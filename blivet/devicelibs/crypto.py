@@ -49,6 +49,9 @@ DEFAULT_INTEGRITY_ALGORITHM = "crc32c"
 # from linux/drivers/md/dm-integrity.c
 MAX_JOURNAL_SIZE = 131072 * SECTOR_SIZE
 
+# default upper limit of the memory used by argon2 in cryptsetup
+LUKS2_MAX_MEMORY = Size("1 GiB")
+
 
 def calculate_luks2_max_memory():
     """ Calculates maximum RAM that will be used during LUKS format.
@@ -73,6 +76,19 @@ def calculate_luks2_max_memory():
         return free_mem.round_to_nearest(Size("128 MiB"), ROUND_DOWN)
 
 
+def calculate_luks_open_workers(max_workers):
+    """ Calculates how many LUKS devices can be opened at the same time.
+        Opening a LUKS2 device derives the key using up to as much memory as
+        the format used, which is at most the value returned by
+        :func:`calculate_luks2_max_memory` or the cryptsetup default limit.
+
+        :param int max_workers: the maximum number to return
+        :rtype: int
+    """
+    max_memory = calculate_luks2_max_memory() or LUKS2_MAX_MEMORY
+    return max(1, min(max_workers, int(available_memory() // max_memory)))
+
+
 def _integrity_tag_size(hash_alg):
     if hash_alg.startswith("crc32"):
         return 4
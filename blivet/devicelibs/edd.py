@@ -28,6 +28,10 @@ import os
 import re
 import struct
 import copy
+import threading
+import time
+
+from six.moves import queue
 
 from .. import util
 
@@ -35,6 +39,12 @@ log = logging.getLogger("blivet")
 testdata_log = logging.getLogger("testdata")
 testdata_log.setLevel(logging.DEBUG)
 
+MBR_READ_WORKERS = 16
+""" maximum number of disks to read MBR signatures from at the same time """
+
+MBR_READ_TIMEOUT = 10
+""" seconds to wait for MBR signatures before giving up on unresponsive disks """
+
 re_bios_device_number = re.compile(r'.*/int13_dev([0-9a-fA-F]+)/*$')
 re_host_bus_pci = re.compile(r'^(PCIX|PCI|XPRS|HTPT)\s*(\S*)\s*channel: (\S*)\s*$')
 re_interface_atapi = re.compile(r'^ATAPI\s*device: (\S*)\s*lun: (\S*)\s*$')
@@ -656,49 +666,107 @@ def collect_edd_data(root=None):
     return edd_data_dict
 
 
-def collect_mbrs(devices, root=None):
+def _read_mbr_signature(path):
+    """ Return the four bytes of MBR signature data from a disk. """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        # The signature is the unsigned integer at byte 440:
+        os.lseek(fd, 440, 0)
+        return os.read(fd, 4)
+    finally:
+        os.close(fd)
+
+
+def _read_mbr_signatures(paths, timeout):
+    """ Read MBR signature data from disks concurrently.
+
+        :param paths: paths of the disks to read
+        :type paths: list of str
+        :param timeout: seconds to wait for all reads to finish
+        :type timeout: int or float
+        :returns: dict mapping each path to its data, to the :class:`OSError`
+                  raised reading it, or to None if reading did not finish in
+                  time
+        :rtype: dict
+
+        Reads that block beyond the timeout are left running in their
+        (daemon) threads; their results are discarded.
+    """
+    results = dict.fromkeys(paths)
+    work = queue.Queue()
+    for path in paths:
+        work.put(path)
+
+    def worker():
+        while True:
+            try:
+                path = work.get_nowait()
+            except queue.Empty:
+                return
+
+            try:
+                results[path] = _read_mbr_signature(path)
+            except OSError as e:
+                results[path] = e
+
+    workers = [threading.Thread(target=worker, name="mbrsig%d" % i)
+               for i in range(min(MBR_READ_WORKERS, len(paths)))]
+    for t in workers:
+        t.daemon = True  # py2 compat
+        t.start()
+
+    deadline = time.time() + timeout
+    for t in workers:
+        t.join(max(deadline - time.time(), 0))
+
+    return dict(results)
+
+
+def collect_mbrs(devices, root=None, timeout=MBR_READ_TIMEOUT):
     """ Read MBR signatures from devices.
 
         Returns a dict mapping device names to their MBR signatures. It is not
         guaranteed this will succeed, with a new disk for instance.
+
+        The disks are read concurrently. Disks that do not respond within
+        timeout seconds are skipped.
     """
+    paths = [(util.Path("/dev", root=root) + dev.name) for dev in devices]
+    signatures = _read_mbr_signatures([path.ondisk for path in paths], timeout)
+
     mbr_dict = {}
-    for dev in devices:
-        fd = -1
-        try:
-            path = util.Path("/dev", root=root) + dev.name
-            fd = os.open(path.ondisk, os.O_RDONLY)
-            # The signature is the unsigned integer at byte 440:
-            os.lseek(fd, 440, 0)
-            data = os.read(fd, 4)
-            mbrsig = struct.unpack('I', data)
-            sdata = struct.unpack("BBBB", data)
-            sdata = "".join(["%02x" % (x,) for x in sdata])
-            os.close(fd)
-            testdata_log.debug("device %s data[440:443] = %s", path, sdata)
-        except OSError as e:
-            testdata_log.debug("device %s data[440:443] raised %s", path, e)
+    mbr_owners = {}     # reverse index of mbr_dict
+    for (dev, path) in zip(devices, paths):
+        data = signatures[path.ondisk]
+        if data is None:
+            testdata_log.debug("device %s data[440:443] timed out", path)
+            log.error("edd: timed out reading mbrsig from disk %s", dev.name)
+            continue
+        elif isinstance(data, OSError):
+            testdata_log.debug("device %s data[440:443] raised %s", path, data)
             log.error("edd: could not read mbrsig from disk %s: %s",
-                      dev.name, str(e))
-            if fd > 0:
-                os.close(fd)
+                      dev.name, str(data))
             continue
 
+        mbrsig = struct.unpack('I', data)
+        sdata = struct.unpack("BBBB", data)
+        sdata = "".join(["%02x" % (x,) for x in sdata])
+        testdata_log.debug("device %s data[440:443] = %s", path, sdata)
+
         mbrsig_str = "0x%08x" % mbrsig
         # sanity check
         if mbrsig_str == '0x00000000':
             log.info("edd: MBR signature on %s is zero. new disk image?",
                      dev.name)
             continue
-        else:
-            for (dev_name, mbrsig_str_old) in mbr_dict.items():
-                if mbrsig_str_old == mbrsig_str:
-                    log.error("edd: dupicite MBR signature %s for %s and %s",
-                              mbrsig_str, dev_name, dev.name)
-                    # this actually makes all the other data useless
-                    return {}
+        elif mbrsig_str in mbr_owners:
+            log.error("edd: dupicite MBR signature %s for %s and %s",
+                      mbrsig_str, mbr_owners[mbrsig_str], dev.name)
+            # this actually makes all the other data useless
+            return {}
         # update the dictionary
         mbr_dict[dev.name] = mbrsig_str
+        mbr_owners[mbrsig_str] = dev.name
     log.info("edd: collected mbr signatures: %s", mbr_dict)
     return mbr_dict
 
@@ -714,12 +782,12 @@ def get_edd_dict(devices, root=None):
         'interface', attempting to map pci device number, channel number etc. to
         a sysfs path, check that the path really exists, then read the device
         name (e.g 'sda') from there. Should this fail we try to match contents
-        of 'mbr_signature' to a real MBR signature found on the existing block
-        devices.
+        of 'mbr_signature' to a real MBR signature found on the block devices
+        that were not matched through their pci device.
     """
-    mbr_dict = collect_mbrs(devices, root=root)
     edd_entries_dict = collect_edd_data(root=root)
     edd_dict = {}
+    unmatched = []
     for (edd_number, edd_entry) in edd_entries_dict.items():
         matcher = EddMatcher(edd_entry, root=root)
         # first try to match through the pci dev etc.
@@ -727,20 +795,34 @@ def get_edd_dict(devices, root=None):
         log.debug("edd: data extracted from 0x%x:%r", edd_number, edd_entry)
         if name:
             log.info("edd: matched 0x%x to %s using PCI dev", edd_number, name)
-        # next try to compare mbr signatures
+            if not _add_edd_match(edd_dict, name, edd_number):
+                return {}
         else:
-            name = matcher.match_via_mbrsigs(mbr_dict)
-            if name:
-                log.info("edd: matched 0x%x to %s using MBR sig", edd_number, name)
+            unmatched.append((edd_number, matcher))
 
+    if not unmatched:
+        return edd_dict
+
+    # next try to compare mbr signatures
+    mbr_dict = collect_mbrs([d for d in devices if d.name not in edd_dict], root=root)
+    for (edd_number, matcher) in unmatched:
+        name = matcher.match_via_mbrsigs(mbr_dict)
         if name:
-            old_edd_number = edd_dict.get(name)
-            if old_edd_number:
-                log.info("edd: both edd entries 0x%x and 0x%x seem to map to %s",
-                         old_edd_number, edd_number, name)
-                # this means all the other data can be confused and useless
+            log.info("edd: matched 0x%x to %s using MBR sig", edd_number, name)
+            if not _add_edd_match(edd_dict, name, edd_number):
                 return {}
-            edd_dict[name] = edd_number
         else:
             log.error("edd: unable to match edd entry 0x%x", edd_number)
     return edd_dict
+
+
+def _add_edd_match(edd_dict, name, edd_number):
+    """ Record a match in edd_dict, returning False if name was already matched. """
+    old_edd_number = edd_dict.get(name)
+    if old_edd_number:
+        log.info("edd: both edd entries 0x%x and 0x%x seem to map to %s",
+                 old_edd_number, edd_number, name)
+        # this means all the other data can be confused and useless
+        return False
+    edd_dict[name] = edd_number
+    return True
@@ -94,8 +94,8 @@ def remove_pool(pool_uuid):
     if not availability.STRATIS_DBUS.available:
         raise StratisError("Stratis DBus service not available")
 
-    # repopulate the stratis info cache just to be sure all values are still valid
-    stratis_info.drop_cache()
+    # update the stratis info cache just to be sure all values are still valid
+    stratis_info.refresh(pools=[pool_uuid])
 
     if pool_uuid not in stratis_info.pools.keys():
         raise StratisError("Stratis pool with UUID %s not found" % pool_uuid)
@@ -114,13 +114,20 @@ def remove_pool(pool_uuid):
         if not succ:
             raise StratisError("Failed to remove stratis pool: %s (%d)" % (err, rc))
 
+    # the pool's block devices are released and their objects removed too
+    removed = [(pool_info.object_path, STRATIS_POOL_INTF)]
+    removed.extend((bd.object_path, STRATIS_BLOCKDEV_INTF) for bd in stratis_info.blockdevs.values()
+                   if bd.pool_uuid == pool_uuid)
+    for (path, interface) in removed:
+        stratis_info.interfaces_removed(path, [interface])
+
 
 def remove_filesystem(pool_uuid, fs_uuid):
     if not availability.STRATIS_DBUS.available:
         raise StratisError("Stratis DBus service not available")
 
-    # repopulate the stratis info cache just to be sure all values are still valid
-    stratis_info.drop_cache()
+    # update the stratis info cache just to be sure all values are still valid
+    stratis_info.refresh(pools=[pool_uuid], filesystems=[fs_uuid])
 
     if pool_uuid not in stratis_info.pools.keys():
         raise StratisError("Stratis pool with UUID %s not found" % pool_uuid)
@@ -142,6 +149,9 @@ def remove_filesystem(pool_uuid, fs_uuid):
         if not succ:
             raise StratisError("Failed to remove stratis filesystem: %s (%d)" % (err, rc))
 
+    stratis_info.interfaces_removed(fs_info.object_path, [STRATIS_FILESYSTEM_INTF])
+    stratis_info.update_objects([(pool_info.object_path, STRATIS_POOL_INTF)])
+
 
 def set_key(key_desc, passphrase, key_file):
     if passphrase:
@@ -208,29 +218,31 @@ def create_pool(name, devices, encrypted, passphrase, key_file):
     clevis_opt = GLib.Variant("(b(ss))", (False, ("", "")))
 
     try:
-        ((succ, _paths), rc, err) = safe_dbus.call_sync(STRATIS_SERVICE,
-                                                        STRATIS_PATH,
-                                                        STRATIS_MANAGER_INTF,
-                                                        "CreatePool",
-                                                        GLib.Variant("(s(bq)as(bs)(b(ss)))", (name, raid_opt,
-                                                                                              devices, key_opt,
-                                                                                              clevis_opt)))
+        ((succ, paths), rc, err) = safe_dbus.call_sync(STRATIS_SERVICE,
+                                                       STRATIS_PATH,
+                                                       STRATIS_MANAGER_INTF,
+                                                       "CreatePool",
+                                                       GLib.Variant("(s(bq)as(bs)(b(ss)))", (name, raid_opt,
+                                                                                             devices, key_opt,
+                                                                                             clevis_opt)))
     except safe_dbus.DBusCallError as e:
         raise StratisError("Failed to create stratis pool: %s" % str(e))
     else:
         if not succ:
             raise StratisError("Failed to create stratis pool: %s (%d)" % (err, rc))
 
-    # repopulate the stratis info cache so the new pool will be added
-    stratis_info.drop_cache()
+    # add the new pool and its block devices to the stratis info cache
+    (pool_path, bd_paths) = paths
+    stratis_info.update_objects([(pool_path, STRATIS_POOL_INTF)] +
+                                [(path, STRATIS_BLOCKDEV_INTF) for path in bd_paths])
 
 
 def create_filesystem(name, pool_uuid, fs_size=None):
     if not availability.STRATIS_DBUS.available:
         raise StratisError("Stratis DBus service not available")
 
-    # repopulate the stratis info cache just to be sure all values are still valid
-    stratis_info.drop_cache()
+    # update the stratis info cache just to be sure all values are still valid
+    stratis_info.refresh(pools=[pool_uuid])
 
     if pool_uuid not in stratis_info.pools.keys():
         raise StratisError("Stratis pool with UUID %s not found" % pool_uuid)
@@ -242,16 +254,17 @@ def create_filesystem(name, pool_uuid, fs_size=None):
         size_opt = GLib.Variant("(bs)", (False, ""))
 
     try:
-        ((succ, _paths), rc, err) = safe_dbus.call_sync(STRATIS_SERVICE,
-                                                        pool_info.object_path,
-                                                        STRATIS_POOL_INTF,
-                                                        "CreateFilesystems",
-                                                        GLib.Variant("(a(s(bs)))", ([GLib.Variant("(s(bs))", (name, size_opt))],)))
+        ((succ, paths), rc, err) = safe_dbus.call_sync(STRATIS_SERVICE,
+                                                       pool_info.object_path,
+                                                       STRATIS_POOL_INTF,
+                                                       "CreateFilesystems",
+                                                       GLib.Variant("(a(s(bs)))", ([GLib.Variant("(s(bs))", (name, size_opt))],)))
     except safe_dbus.DBusCallError as e:
         raise StratisError("Failed to create stratis filesystem on '%s': %s" % (pool_info.name, str(e)))
     else:
         if not succ:
             raise StratisError("Failed to create stratis filesystem on '%s': %s (%d)" % (pool_info.name, err, rc))
 
-    # repopulate the stratis info cache so the new filesystem will be added
-    stratis_info.drop_cache()
+    # add the new filesystem to the stratis info cache and update its pool
+    stratis_info.update_objects([(path, STRATIS_FILESYSTEM_INTF) for (path, _name) in paths] +
+                                [(pool_info.object_path, STRATIS_POOL_INTF)])
@@ -30,7 +30,12 @@ from ..threads import SynchronizedMeta
 import logging
 log = logging.getLogger("blivet")
 
-from .lib import ParentList
+from .lib import ParentList, notify_lookup_keys_changed
+
+
+def _func(method):
+    """ Return the function implementing a method (for py2 unbound methods). """
+    return getattr(method, "__func__", method)
 
 
 @add_metaclass(SynchronizedMeta)
@@ -73,6 +78,10 @@ class Device(util.ObjectID):
     _packages = []
     _external_dependencies = []
 
+    # indexes to tell about changes to this device's lookup keys
+    # (see :func:`~.lib.add_lookup_key_watcher`)
+    _lookup_key_watchers = frozenset()
+
     def __init__(self, name, parents=None):
         """
             :param name: the device name (generally a device node's basename)
@@ -86,6 +95,7 @@ class Device(util.ObjectID):
             raise ValueError("parents must be a list of Device instances")
 
         self._tags = set()
+        self._ancestor_cache = None
         self.parents = parents or []
         self._children = []
 
@@ -95,9 +105,13 @@ class Device(util.ObjectID):
             We can't do copy.deepcopy on parted objects, which is okay.
             For these parted objects, we just do a shallow copy.
         """
-        return util.variable_copy(self, memo,
-                                  omit=('node',),
-                                  shallow=('_parted_partition',))
+        new = util.variable_copy(self, memo,
+                                 omit=('node', '_ancestor_cache', '_lookup_key_watchers'),
+                                 shallow=('_parted_partition',))
+        new._ancestor_cache = None
+        # the copy is registered with the indexes of the trees it is added to
+        new._lookup_key_watchers = frozenset()
+        return new
 
     def __repr__(self):
         s = ("%(type)s instance (%(id)s) --\n"
@@ -137,12 +151,57 @@ class Device(util.ObjectID):
         """
         parent.remove_child(self)
 
+    def _parents_changed(self):
+        """ Called after this device's parent list has changed.
+
+            See :attr:`~.ParentList.changefunc`.
+        """
+        # the ancestors of this device and all of its descendants may have changed
+        devices = [self]
+        seen = set()
+        while devices:
+            device = devices.pop()
+            if device in seen:
+                continue
+
+            seen.add(device)
+            device._ancestor_cache = None
+            devices.extend(getattr(device, "_children", []))
+
+    def _get_ancestor_cache(self):
+        """ Return this device's ancestors and those of them with extra dependencies.
+
+            :returns: all ancestors (excluding this device) and the ancestors
+                      that override :meth:`depends_on`
+            :rtype: tuple of (frozenset, list)
+
+            The result is cached until the parent list of this device or of any
+            of its ancestors changes.
+        """
+        cache = getattr(self, "_ancestor_cache", None)
+        if cache is None:
+            ancestors = set()
+            devices = list(self.parents)
+            while devices:
+                device = devices.pop()
+                if device not in ancestors:
+                    ancestors.add(device)
+                    devices.extend(device.parents)
+
+            base = _func(Device.depends_on)
+            special = [a for a in ancestors if _func(type(a).depends_on) is not base]
+            cache = (frozenset(ancestors), special)
+            self._ancestor_cache = cache  # pylint: disable=attribute-defined-outside-init
+
+        return cache
+
     def _init_parent_list(self):
         """ Initialize this instance's parent list. """
         if not hasattr(self, "_parents"):
             # pylint: disable=attribute-defined-outside-init
             self._parents = ParentList(appendfunc=self._add_parent,
-                                       removefunc=self._remove_parent)
+                                       removefunc=self._remove_parent,
+                                       changefunc=self._parents_changed)
 
         # iterate over a copy of the parent list because we are altering it in
         # the for-cycle
@@ -233,14 +292,12 @@ class Device(util.ObjectID):
             :rtype: bool
         """
         # XXX does a device depend on itself?
-        if dep in self.parents:
+        ancestors, special = self._get_ancestor_cache()
+        if dep in ancestors:
             return True
 
-        for parent in self.parents:
-            if parent.depends_on(dep):
-                return True
-
-        return False
+        # some devices depend on more than their parents
+        return any(a.depends_on(dep) for a in special)
 
     def dracut_setup_args(self):
         return set()
@@ -258,8 +315,16 @@ class Device(util.ObjectID):
             raise ValueError("%s is not a valid name for this device" % value)
         self._name = value
 
+    def _update_name(self, value):
+        """ Set the device's name and tell any device indexes about it. """
+        old_name = self.name
+        self._set_name(value)
+        if self.name != old_name:
+            # descendants' names and paths may be derived from this one (LVs)
+            notify_lookup_keys_changed(self, recursive=True)
+
     name = property(lambda s: s._get_name(),
-                    lambda s, v: s._set_name(v),
+                    lambda s, v: s._update_name(v),
                     doc="This device's name")
 
     @property
@@ -280,10 +345,7 @@ class Device(util.ObjectID):
     @property
     def ancestors(self):
         """ A list of all of this device's ancestors, including itself. """
-        ancestors = set([self])
-        for p in [d for d in self.parents if d not in ancestors]:
-            ancestors.update(set(p.ancestors))
-        return list(ancestors)
+        return list(self._get_ancestor_cache()[0].union([self]))
 
     @property
     def packages(self):
@@ -30,7 +30,7 @@ from gi.repository import GLib
 import os
 from collections import namedtuple
 
-from .. import errors
+from .. import errors, load_plugins
 from .. import util
 from ..devicelibs import disk as disklib
 from ..flags import flags
@@ -778,6 +778,7 @@ class NVMeNamespaceDevice(DiskDevice):
             log.debug("Failed to get controllers for %s: libblockdev NVME plugin is not available", self.name)
             return self._controllers
 
+        load_plugins(["nvme"])
         try:
             controllers = blockdev.nvme_find_ctrls_for_ns(self.sysfs_path)
         except GLib.GError as err:
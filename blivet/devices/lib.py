@@ -20,6 +20,7 @@
 #
 from enum import Enum
 import os
+import weakref
 
 from .. import errors
 from .. import udev
@@ -139,6 +140,44 @@ def device_name_to_disk_by_path(device_name=None):
     raise errors.DeviceNotFoundError(device_name)
 
 
+def add_lookup_key_watcher(obj, watcher):
+    """ Register an object to be told about changes to a device's lookup keys.
+
+        :param obj: the device or format to watch
+        :type obj: :class:`~.devices.Device` or :class:`~.formats.DeviceFormat`
+        :param watcher: an object with an ``update(obj, recursive)`` method
+
+        The watcher is held by weak reference in the watched object's
+        ``_lookup_key_watchers`` attribute.
+    """
+    watchers = vars(obj).get("_lookup_key_watchers", frozenset())
+    obj._lookup_key_watchers = watchers | frozenset([weakref.ref(watcher)])
+
+
+def remove_lookup_key_watcher(obj, watcher):
+    """ Stop telling a watcher about changes to a device's lookup keys.
+
+        :param obj: the device or format being watched
+        :param watcher: the watcher registered by :func:`add_lookup_key_watcher`
+    """
+    watchers = vars(obj).get("_lookup_key_watchers", frozenset())
+    obj._lookup_key_watchers = watchers - frozenset([weakref.ref(watcher)])
+
+
+def notify_lookup_keys_changed(obj, recursive=False):
+    """ Notify the registered watchers that lookup keys have changed.
+
+        :param obj: the device whose name, path, sysfs path, UUID or format
+                    changed or the format whose UUID or label changed
+        :type obj: :class:`~.devices.Device` or :class:`~.formats.DeviceFormat`
+        :keyword bool recursive: whether the device's descendants are affected too
+    """
+    for ref in obj._lookup_key_watchers:
+        watcher = ref()
+        if watcher is not None:
+            watcher.update(obj, recursive=recursive)
+
+
 class ParentList(object):
 
     """ A list with auditing and side-effects for additions and removals.
@@ -160,7 +199,7 @@ class ParentList(object):
             x = ml[i]   # not ml[i] = x
     """
 
-    def __init__(self, items=None, appendfunc=None, removefunc=None):
+    def __init__(self, items=None, appendfunc=None, removefunc=None, changefunc=None):
         """
             :keyword items: initial contents
             :type items: any iterable
@@ -168,6 +207,8 @@ class ParentList(object):
             :type appendfunc: callable
             :keyword removefunc: a function to call before removing an item
             :type removefunc: callable
+            :keyword changefunc: a function to call after adding or removing an item
+            :type changefunc: callable
 
             appendfunc and removefunc should take the item to be added or
             removed and perform any checks or other processing. The appropriate
@@ -177,6 +218,9 @@ class ParentList(object):
             to the function. While this is not optimal for general-purpose use,
             it is ideal for the intended use as part of :class:`~.Device`. The
             functions themselves should not modify the :class:`~.ParentList`.
+
+            changefunc takes no arguments. It is called once the list has been
+            modified, eg: to drop information derived from the list's contents.
         """
         self.items = list()
         if items:
@@ -188,6 +232,9 @@ class ParentList(object):
         self.removefunc = removefunc or (lambda i: True)
         """ a function to call before removing an item """
 
+        self.changefunc = changefunc or (lambda: None)
+        """ a function to call after adding or removing an item """
+
     def __iter__(self):
         return iter(self.items)
 
@@ -213,6 +260,7 @@ class ParentList(object):
 
         self.appendfunc(y)
         self.items.append(y)
+        self.changefunc()
 
     def remove(self, y):
         """ Remove an item from the list after running a callback. """
@@ -221,3 +269,4 @@ class ParentList(object):
 
         self.removefunc(y)
         self.items.remove(y)
+        self.changefunc()
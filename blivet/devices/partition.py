@@ -305,6 +305,7 @@ class PartitionDevice(StorageDevice):
             disk.setPartitionGeometry(partition=self.parted_partition,
                                       constraint=constraint,
                                       start=geometry.start, end=geometry.end)
+            self.disk.format.partitions_changed()
 
     @property
     def path(self):
@@ -716,6 +717,7 @@ class PartitionDevice(StorageDevice):
                                          constraint=constraint,
                                          start=geometry.start,
                                          end=geometry.end)
+        self.disk.format.partitions_changed()
 
         self.disk.format.commit()
         self.update_size()
@@ -38,7 +38,7 @@ log = logging.getLogger("blivet")
 
 from .device import Device
 from .network import NetworkStorageDevice
-from .lib import LINUX_SECTOR_SIZE
+from .lib import LINUX_SECTOR_SIZE, notify_lookup_keys_changed
 from ..devicelibs.crypto import LUKS_METADATA_SIZE
 
 
@@ -301,6 +301,26 @@ class StorageDevice(Device):
         """ Device node representing this device. """
         return "%s/%s" % (self._dev_dir, self.name)
 
+    @property
+    def sysfs_path(self):
+        """ This device's sysfs path """
+        return self._sysfs_path
+
+    @sysfs_path.setter
+    def sysfs_path(self, value):
+        self._sysfs_path = value  # pylint: disable=attribute-defined-outside-init
+        notify_lookup_keys_changed(self)
+
+    @property
+    def uuid(self):
+        """ This device's UUID """
+        return self._uuid
+
+    @uuid.setter
+    def uuid(self, value):
+        self._uuid = value  # pylint: disable=attribute-defined-outside-init
+        notify_lookup_keys_changed(self)
+
     def update_sysfs_path(self):
         """ Update this device's sysfs path. """
         # We're using os.path.exists as a stand-in for status. We can't use
@@ -769,6 +789,7 @@ class StorageDevice(Device):
             self._format.device = self.path
             self._update_netdev_mount_option()
             callbacks.format_added(device=self, fmt=self._format)
+            notify_lookup_keys_changed(self)
 
     def _update_netdev_mount_option(self):
         """ Fix mount options to include or exclude _netdev as appropriate. """
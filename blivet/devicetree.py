@@ -20,6 +20,7 @@
 # Red Hat Author(s): Dave Lehman <dlehman@redhat.com>
 #
 
+import itertools
 import os
 import pprint
 import re
@@ -36,7 +37,7 @@ from .errors import DeviceError, DeviceTreeError, StorageError, DuplicateUUIDErr
 from .deviceaction import ActionDestroyDevice, ActionDestroyFormat
 from .devices import BTRFSDevice, NoDevice, PartitionDevice
 from .devices import LVMLogicalVolumeDevice, LVMVolumeGroupDevice
-from .devices.lib import Tags
+from .devices.lib import Tags, add_lookup_key_watcher, remove_lookup_key_watcher
 from . import formats
 from .devicelibs import lvm
 from .events.handler import EventHandlerMixin
@@ -51,6 +52,179 @@ log = logging.getLogger("blivet")
 
 _LVM_DEVICE_CLASSES = (LVMLogicalVolumeDevice, LVMVolumeGroupDevice)
 
+_LOOKUP_KEY_FUNCS = {"name": lambda d: d.name,
+                     "path": lambda d: d.path,
+                     "uuid": lambda d: d.uuid,
+                     "format_uuid": lambda d: d.format.uuid,
+                     "label": lambda d: getattr(d.format, "label", None),
+                     "sysfs_path": lambda d: d.sysfs_path,
+                     "id": lambda d: d.id}
+
+
+_generations = itertools.count()
+
+
+def _lookup_key(device, attr):
+    try:
+        return _LOOKUP_KEY_FUNCS[attr](device)
+    except AttributeError:
+        return None
+
+
+class _DeviceIndex(object):
+    """ Hash indexes backing the get_device_by_* lookups.
+
+        Every device in the tree, hidden or not, is filed under the current
+        value of each of its lookup keys (see :data:`_LOOKUP_KEY_FUNCS`). The
+        tree updates the index as it adds, removes, hides and unhides devices.
+        The index registers itself with the devices it holds and with their
+        formats, which report changes to their names, sysfs paths, UUIDs,
+        formats and labels through
+        :func:`~.devices.lib.notify_lookup_keys_changed`, so a key that is not
+        in the index belongs to no device in the tree.
+
+        The index also remembers which device lists it was built from so that
+        it can tell when those lists were modified behind its back, in which
+        case the tree rebuilds it.
+
+        :attr:`generation` changes whenever a device is filed, unfiled or
+        re-filed, so values derived from the indexed keys can be cached
+        against it. Generations are unique across indexes.
+    """
+
+    def __init__(self):
+        self._devices = None
+        self._hidden = None
+        self._keys = dict()
+        self._format_owners = dict()
+        self.clear()
+
+    def __deepcopy__(self, memo):
+        # the copy gets rebuilt from the copied device lists on first use
+        return _DeviceIndex()
+
+    def clear(self):
+        for obj in list(self._keys.keys()) + list(self._format_owners.keys()):
+            remove_lookup_key_watcher(obj, self)
+
+        self._maps = dict((attr, dict()) for attr in _LOOKUP_KEY_FUNCS)
+        self._keys = dict()
+        self._formats = dict()
+        self._format_owners = dict()
+        self._order = dict()
+        self._seq = 0
+        self._n_devices = 0
+        self._n_hidden = 0
+        self.generation = next(_generations)
+
+    def in_sync(self, devices, hidden):
+        """ Is the index consistent with the given device lists? """
+        return (devices is self._devices and hidden is self._hidden and
+                len(devices) == self._n_devices and len(hidden) == self._n_hidden)
+
+    def rebuild(self, devices, hidden):
+        """ Rebuild the index from scratch. """
+        self.clear()
+        self._devices = devices
+        self._hidden = hidden
+        for device in devices:
+            self.add(device)
+
+        for device in hidden:
+            self.add(device, hidden=True)
+
+    def _file(self, device):
+        keys = dict((attr, _lookup_key(device, attr)) for attr in _LOOKUP_KEY_FUNCS)
+        for (attr, key) in keys.items():
+            if key not in (None, ""):
+                self._maps[attr].setdefault(key, []).append(device)
+
+        self._keys[device] = keys
+
+        fmt = getattr(device, "format", None)
+        if fmt is not None:
+            self._formats[device] = fmt
+            owners = self._format_owners.setdefault(fmt, set())
+            if not owners:
+                add_lookup_key_watcher(fmt, self)
+            owners.add(device)
+
+        self.generation = next(_generations)
+
+    def _unfile(self, device):
+        for (attr, key) in self._keys.pop(device).items():
+            if key in (None, ""):
+                continue
+
+            bucket = self._maps[attr][key]
+            bucket.remove(device)
+            if not bucket:
+                del self._maps[attr][key]
+
+        fmt = self._formats.pop(device, None)
+        if fmt is not None:
+            owners = self._format_owners[fmt]
+            owners.discard(device)
+            if not owners:
+                del self._format_owners[fmt]
+                remove_lookup_key_watcher(fmt, self)
+
+        self.generation = next(_generations)
+
+    def add(self, device, hidden=False):
+        """ Add a device that was just appended to the device or hidden list. """
+        self._file(device)
+        add_lookup_key_watcher(device, self)
+        self._seq += 1
+        self._order[device] = (hidden, self._seq)
+        if hidden:
+            self._n_hidden += 1
+        else:
+            self._n_devices += 1
+
+    def remove(self, device):
+        """ Remove a device that was just removed from its list. """
+        if device not in self._keys:
+            return
+
+        self._unfile(device)
+        remove_lookup_key_watcher(device, self)
+        (hidden, _seq) = self._order.pop(device)
+        if hidden:
+            self._n_hidden -= 1
+        else:
+            self._n_devices -= 1
+
+    def update(self, device, recursive=False):
+        """ Re-file a device, and optionally its descendants, under their current keys.
+
+            :param device: the device or the format whose keys changed
+        """
+        if device in self._format_owners:
+            for owner in list(self._format_owners[device]):
+                self.update(owner)
+            return
+
+        if device not in self._keys:
+            return
+
+        self._unfile(device)
+        self._file(device)
+        if recursive:
+            for child in device.children:
+                self.update(child, recursive=True)
+
+    def is_hidden(self, device):
+        return self._order[device][0]
+
+    def position(self, device):
+        """ Sort key matching the order of the device list followed by the hidden list. """
+        return self._order[device]
+
+    def get(self, attr, key):
+        """ Return the devices filed under key for attribute attr. """
+        return self._maps[attr].get(key, [])
+
 
 @six.add_metaclass(SynchronizedMeta)
 class DeviceTreeBase(object):
@@ -95,6 +269,8 @@ class DeviceTreeBase(object):
                                    removefunc=self._cancel_action)
 
         self._hidden = []
+        self._index = _DeviceIndex()
+        self._names_cache = None
 
         lvm.lvm_devices_reset()
 
@@ -129,39 +305,46 @@ class DeviceTreeBase(object):
     @property
     def devices(self):
         """ List of devices currently in the tree """
-        devices = []
-        for device in self._devices:
-            if not getattr(device, "complete", True):
-                continue
-
-            if device.uuid and device.uuid in [d.uuid for d in devices] and \
-               not isinstance(device, NoDevice):
-                raise DeviceTreeError("duplicate uuids in device tree")
-
-            devices.append(device)
-
-        return devices
+        # UUID uniqueness is enforced by _add_device, so there is no need to
+        # check for duplicates here
+        return [d for d in self._devices if getattr(d, "complete", True)]
 
     @property
     def names(self):
         """ List of devices names """
         lv_info = list(lvs_info.cache.keys())
 
-        names = []
-        for dev in self._devices + self._hidden:
-            # don't include "req%d" partition names
-            if (dev.type != "partition" or not dev.name.startswith("req")) and \
-               dev.type != "btrfs volume" and \
-               dev.name not in names:
-                names.append(dev.name)
+        names = list(self._device_names())
+        seen = set(names)
 
         # include LVs that are not in the devicetree and not scheduled for removal
-        removed_names = [ac.device.name for ac in self.actions.find(action_type="destroy",
-                                                                    object_type="device")]
-        names.extend(n for n in lv_info if n not in names and n not in removed_names)
+        seen.update(ac.device.name for ac in self.actions.find(action_type="destroy",
+                                                               object_type="device"))
+        for name in lv_info:
+            if name not in seen:
+                seen.add(name)
+                names.append(name)
 
         return names
 
+    def _device_names(self):
+        """ Names of the devices in the tree, cached until the index changes. """
+        self._sync_index()
+        if self._names_cache is None or self._names_cache[0] != self._index.generation:
+            names = []
+            seen = set()
+            for dev in self._devices + self._hidden:
+                # don't include "req%d" partition names
+                if (dev.type != "partition" or not dev.name.startswith("req")) and \
+                   dev.type != "btrfs volume" and \
+                   dev.name not in seen:
+                    seen.add(dev.name)
+                    names.append(dev.name)
+
+            self._names_cache = (self._index.generation, tuple(names))
+
+        return self._names_cache[1]
+
     def _add_device(self, newdev, new=True):
         """ Add a device to the tree.
 
@@ -171,10 +354,14 @@ class DeviceTreeBase(object):
             Raise DeviceTreeError if the device's identifier is already
             in the list.
         """
-        if newdev.uuid and newdev.uuid in [d.uuid for d in self._devices] and \
-           not isinstance(newdev, NoDevice):
+        self._sync_index()
+        dev = None
+        if newdev.uuid and not isinstance(newdev, NoDevice):
+            dev = six.next((d for d in self._index.get("uuid", newdev.uuid)
+                            if not self._index.is_hidden(d) and d.uuid == newdev.uuid), None)
+
+        if dev is not None:
             # Just found a device with already existing UUID. Is it the same device?
-            dev = self.get_device_by_uuid(newdev.uuid, incomplete=True, hidden=True)
             if dev.name == newdev.name:
                 raise DeviceTreeError("Trying to add already existing device.")
             else:
@@ -187,7 +374,9 @@ class DeviceTreeBase(object):
                 raise DeviceTreeError("parent device not in tree")
 
         newdev.add_hook(new=new)
+        self._sync_index()
         self._devices.append(newdev)
+        self._index.add(newdev)
 
         callbacks.device_added(device=newdev)
         log.info("added %s %s (id %d) to device tree", newdev.type,
@@ -227,7 +416,9 @@ class DeviceTreeBase(object):
                        device.disk == dev.disk:
                         device.update_name()
 
+        self._sync_index()
         self._devices.remove(dev)
+        self._index.remove(dev)
         callbacks.device_removed(device=dev)
         log.info("removed %s %s (id %d) from device tree", dev.type,
                  dev.name,
@@ -470,6 +661,40 @@ class DeviceTreeBase(object):
     #
     # Device search by property
     #
+    def _sync_index(self):
+        """ Rebuild the lookup index if the device lists were changed directly. """
+        if not self._index.in_sync(self._devices, self._hidden):
+            self._index.rebuild(self._devices, self._hidden)
+
+    def _lookup_devices(self, attr, keys, incomplete=False, hidden=False, reverse=False):
+        """ Return indexed devices with a matching key.
+
+            :param str attr: the indexed attribute (see :data:`_LOOKUP_KEY_FUNCS`)
+            :param keys: the keys to look up
+            :type keys: iterable of str or int
+            :param bool incomplete: include incomplete devices in result
+            :param bool hidden: include hidden devices in result
+            :param bool reverse: return devices in reverse order
+            :returns: candidate devices in the order :meth:`_filter_devices` uses
+            :rtype: list of :class:`~.devices.Device`
+
+            Keys that are not in the index belong to no device in the tree.
+            The caller is expected to check the returned devices' current
+            attribute values since the candidates for different keys are
+            merged.
+        """
+        self._sync_index()
+        devices = set()
+        for key in keys:
+            devices.update(self._index.get(attr, key))
+
+        if not hidden:
+            devices = (d for d in devices if not self._index.is_hidden(d))
+        if not incomplete:
+            devices = (d for d in devices if getattr(d, "complete", True))
+
+        return sorted(devices, key=self._index.position, reverse=reverse)
+
     def _filter_devices(self, incomplete=False, hidden=False):
         """ Return list of devices modified according to parameters.
 
@@ -500,7 +725,7 @@ class DeviceTreeBase(object):
         log_method_call(self, path=path, incomplete=incomplete, hidden=hidden)
         result = None
         if path:
-            devices = self._filter_devices(incomplete=incomplete, hidden=hidden)
+            devices = self._lookup_devices("sysfs_path", [path], incomplete=incomplete, hidden=hidden)
             result = six.next((d for d in devices if d.sysfs_path == path), None)
         log_method_return(self, result)
         return result
@@ -517,7 +742,9 @@ class DeviceTreeBase(object):
         log_method_call(self, uuid=uuid, incomplete=incomplete, hidden=hidden)
         result = None
         if uuid:
-            devices = self._filter_devices(incomplete=incomplete, hidden=hidden)
+            devices = self._lookup_devices("uuid", [uuid], incomplete=incomplete, hidden=hidden)
+            devices += self._lookup_devices("format_uuid", [uuid], incomplete=incomplete, hidden=hidden)
+            devices.sort(key=self._index.position)
             result = six.next((d for d in devices if d.uuid == uuid or d.format.uuid == uuid), None)
         log_method_return(self, result)
         return result
@@ -534,7 +761,7 @@ class DeviceTreeBase(object):
         log_method_call(self, label=label, incomplete=incomplete, hidden=hidden)
         result = None
         if label:
-            devices = self._filter_devices(incomplete=incomplete, hidden=hidden)
+            devices = self._lookup_devices("label", [label], incomplete=incomplete, hidden=hidden)
             result = six.next((d for d in devices if getattr(d.format, "label", None) == label), None)
         log_method_return(self, result)
         return result
@@ -551,7 +778,8 @@ class DeviceTreeBase(object):
         log_method_call(self, name=name, incomplete=incomplete, hidden=hidden)
         result = None
         if name:
-            devices = self._filter_devices(incomplete=incomplete, hidden=hidden)
+            devices = self._lookup_devices("name", set([name, name.replace("--", "-")]),
+                                           incomplete=incomplete, hidden=hidden)
             result = six.next((d for d in devices if d.name == name or
                                (isinstance(d, _LVM_DEVICE_CLASSES) and d.name == name.replace("--", "-"))),
                               None)
@@ -573,12 +801,12 @@ class DeviceTreeBase(object):
         log_method_call(self, path=path, incomplete=incomplete, hidden=hidden)
         result = None
         if path:
-            devices = self._filter_devices(incomplete=incomplete, hidden=hidden)
-
             # The usual order of the devices list is one where leaves are at
             # the end. So that the search can prefer leaves to interior nodes
             # the list that is searched is the reverse of the devices list.
-            result = six.next((d for d in reversed(list(devices)) if d.path == path or
+            devices = self._lookup_devices("path", set([path, path.replace("--", "-")]),
+                                           incomplete=incomplete, hidden=hidden, reverse=True)
+            result = six.next((d for d in devices if d.path == path or
                                (isinstance(d, _LVM_DEVICE_CLASSES) and d.path == path.replace("--", "-"))),
                               None)
 
@@ -595,7 +823,7 @@ class DeviceTreeBase(object):
             :rtype: :class:`~.devices.Device`
         """
         log_method_call(self, id_num=id_num, incomplete=incomplete, hidden=hidden)
-        devices = self._filter_devices(incomplete=incomplete, hidden=hidden)
+        devices = self._lookup_devices("id", [id_num], incomplete=incomplete, hidden=hidden)
         result = six.next((d for d in devices if d.id == id_num), None)
         log_method_return(self, result)
         return result
@@ -878,7 +1106,9 @@ class DeviceTreeBase(object):
 
         self._remove_device(device, force=True, modparent=False)
 
+        self._sync_index()
         self._hidden.append(device)
+        self._index.add(device, hidden=True)
         if device.format.type == "lvmpv":
             lvm.lvm_devices_remove(device.path)
 
@@ -903,8 +1133,11 @@ class DeviceTreeBase(object):
                 log.info("unhiding device %s %s (id %d)", hidden.type,
                          hidden.name,
                          hidden.id)
+                self._sync_index()
                 self._hidden.remove(hidden)
                 self._devices.append(hidden)
+                self._index.remove(hidden)
+                self._index.add(hidden)
                 hidden.add_hook(new=False)
                 if hidden.format.type == "lvmpv":
                     lvm.lvm_devices_add(hidden.path)
@@ -25,6 +25,7 @@ import inspect
 from threading import current_thread, RLock, Thread
 import pyudev
 import six
+from six.moves import queue
 import sys
 import time
 import traceback
@@ -35,6 +36,7 @@ from .. import util
 from ..errors import EventManagerError, EventParamError
 from ..flags import flags
 
+from .changes import data as event_data
 from .changes import disable_callbacks, enable_callbacks
 
 import logging
@@ -123,6 +125,33 @@ class EventMask(util.ObjectID):
         return self._device_match(event) and self._action_match(event)
 
 
+def coalesce_events(events):
+    """ Return the events that remain after dropping redundant ones.
+
+        :param events: events in the order they arrived
+        :type events: list of :class:`Event`
+        :returns: the events that still need handling, in arrival order
+        :rtype: list of :class:`Event`
+
+        An event is redundant if the next event on the same device has the
+        same action, or if it is a change event that is followed by a remove
+        event on the same device. Add and remove events are never merged
+        with each other since a device can go away and come back again
+        within a single batch.
+    """
+    latest = dict()
+    dropped = set()
+    for event in events:
+        prev = latest.get(event.device)
+        if prev is not None and (prev.action == event.action or
+                                 (prev.action == "change" and event.action == "remove")):
+            dropped.add(prev.id)
+
+        latest[event.device] = event
+
+    return [e for e in events if e.id not in dropped]
+
+
 #
 # EventManager
 #
@@ -151,7 +180,17 @@ class EventManager(object):
         """List of masks specifying events that should be ignored."""
 
         self._lock = RLock()
-        """Re-entrant lock to serialize access to mask list."""
+        """Re-entrant lock to serialize access to mask list and stats."""
+
+        self._queue = queue.Queue()
+        """Events waiting to be handled by the consumer thread."""
+
+        self._consumer = None
+        """Thread that handles queued events in batches."""
+
+        self._stats = dict.fromkeys(["received", "masked", "coalesced", "handled",
+                                     "batches", "max_depth"], 0)
+        self._stats.update(latency_total=0.0, latency_max=0.0)
 
     @property
     def handler_cb(self):
@@ -239,6 +278,27 @@ class EventManager(object):
         except ValueError:
             pass
 
+    @property
+    def queue_depth(self):
+        """ number of events waiting to be handled """
+        return self._queue.qsize()
+
+    @property
+    def stats(self):
+        """ A dict of event queue metrics.
+
+            Keys are the number of events received, masked, coalesced away
+            and handled, the number of batches, the current and maximum
+            queue depth, and the mean and maximum latency in seconds between
+            an event's creation and the start of its handler.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+
+        stats["depth"] = self.queue_depth
+        stats["latency_mean"] = stats["latency_total"] / max(stats["handled"], 1)
+        return stats
+
     @abc.abstractmethod
     def _create_event(self, *args, **kwargs):
         pass
@@ -246,9 +306,14 @@ class EventManager(object):
     def handle_event(self, *args, **kwargs):
         """ Handle an event by running the registered handler.
 
-            Currently the handler is run in a separate thread. This removes any
-            threading-related expectations about the behavior of whatever is
-            telling us about the events.
+            Events are queued and handled in batches by a single consumer
+            thread. This removes any threading-related expectations about
+            the behavior of whatever is telling us about the events. After
+            the first event of a batch arrives the consumer waits for
+            :attr:`~.flags.Flags.uevent_batch_window` seconds, drops
+            redundant events (see :func:`coalesce_events`) and runs the
+            handler on the rest while holding the blivet lock, so that the
+            whole batch is applied as one devicetree update.
 
             Unhandled exceptions in event handler threads present a bit of a
             challenge. Generally, an unhandled exception in an event handler
@@ -267,19 +332,66 @@ class EventManager(object):
 
         if self._mask_event(event):
             event_log.debug("ignoring masked event %s", event)
+            with self._lock:
+                self._stats["masked"] += 1
             return
 
-        t = Thread(target=self._run_event_handler,
-                   name="event%d" % event.id,
-                   kwargs={"event": event})
-        t.daemon = True  # py2 compat
-        t.start()
+        with self._lock:
+            self._queue.put(event)
+            self._stats["received"] += 1
+            self._stats["max_depth"] = max(self._stats["max_depth"], self._queue.qsize())
+            if self._consumer is None or not self._consumer.is_alive():
+                self._consumer = Thread(target=self._consume_events, name="event-queue")
+                self._consumer.daemon = True  # py2 compat
+                self._consumer.start()
+
+    def _consume_events(self):
+        """ Collect queued events into batches and handle them. """
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.time() + flags.uevent_batch_window
+            while True:
+                timeout = deadline - time.time()
+                if timeout <= 0:
+                    break
+
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            try:
+                self._run_event_batch(batch)
+            finally:
+                for _event in batch:
+                    self._queue.task_done()
+
+    def _run_event_batch(self, batch):
+        """ Run the event handler on the non-redundant events of a batch. """
+        events = coalesce_events(batch)
+        event_log.debug("handling %d of %d queued events", len(events), len(batch))
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["coalesced"] += len(batch) - len(events)
+
+        with threads.blivet_lock:
+            for event in events:
+                latency = time.time() - event.initialized
+                with self._lock:
+                    self._stats["handled"] += 1
+                    self._stats["latency_total"] += latency
+                    self._stats["latency_max"] = max(self._stats["latency_max"], latency)
+
+                self._run_event_handler(event)
 
     def _run_event_handler(self, event):
         """ Run the event handler and account for unhandled exceptions. """
         if self.handler_cb is None:
             return
 
+        # the consumer thread handles one event after another, so only the
+        # changes made while handling this one must be passed on
+        event_data.changes = list()
         try:
             # Pass the notify callback to the handler so it can run the
             # callback and pass thread-local data to it.
@@ -323,10 +435,17 @@ class UdevEventManager(EventManager):
         self._pyudev_observer = None
         with threads.blivet_lock:
             flags.uevents = False
+            # nothing keeps the snapshot up to date anymore
+            udev.drop_snapshot()
 
     def __call__(self, *args, **kwargs):
         return self
 
+    def handle_event(self, *args, **kwargs):
+        # keep the shared udev snapshot current, even for masked events
+        udev.update_snapshot(args[0])
+        super(UdevEventManager, self).handle_event(*args, **kwargs)
+
     def _create_event(self, *args, **kwargs):
         return Event(args[0].action, udev.device_get_name(args[0]), args[0])
 
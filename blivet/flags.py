@@ -91,6 +91,33 @@ class Flags(object):
 
         self.debug_threads = False
 
+        # log only one in this many method calls and returns when debug is
+        # set (1 means every call and return is logged)
+        self.debug_sample_rate = 1
+
+        # number of threads used to probe devices and to open LUKS devices
+        # concurrently while populating the devicetree (1 means devices are
+        # probed and opened serially)
+        self.populate_workers = 1
+
+        # number of external programs that may run at the same time (1 means
+        # programs run one at a time, holding program_log_lock while they run)
+        self.program_workers = 1
+
+        # time in seconds the uevent consumer waits for more events after
+        # the first one arrives, so that redundant events on a device can be
+        # coalesced and the batch handled in one devicetree update
+        self.uevent_batch_window = 0.1
+
+        # file used to keep the results of expensive device probes across
+        # runs (see :class:`~.static_data.probe_cache.ProbeCache`), None
+        # disables the cache
+        self.probe_cache_path = None
+
+        # file used to keep the results of application version checks across
+        # processes (see :mod:`~.tasks.availability`), None disables the cache
+        self.availability_cache_path = None
+
     def get_boot_cmdline(self):
         with open("/proc/cmdline") as f:
             buf = f.read().strip()
@@ -166,6 +166,10 @@ class DeviceFormat(ObjectID):
     _info_class = fsinfo.UnimplementedFSInfo
     _minsize_class = fsminsize.UnimplementedFSMinSize
 
+    # device indexes to tell about changes to the UUID and label
+    # (see :func:`~.devices.lib.add_lookup_key_watcher`)
+    _lookup_key_watchers = frozenset()
+
     def __init__(self, **kwargs):
         """
             :keyword device: The path to the device node.
@@ -185,6 +189,7 @@ class DeviceFormat(ObjectID):
         """
         ObjectID.__init__(self)
         self._label = None
+        self._uuid = None
         self._options = None
         self._device = None
 
@@ -296,6 +301,7 @@ class DeviceFormat(ObjectID):
            This method is not intended to be overridden.
         """
         self._label = label
+        self._notify_lookup_keys_changed()
 
     def _get_label(self):
         """The label for this filesystem.
@@ -307,6 +313,25 @@ class DeviceFormat(ObjectID):
         """
         return self._label
 
+    def _notify_lookup_keys_changed(self):
+        if self._lookup_key_watchers:
+            # import locally to avoid a cycle with devices importing formats
+            from ..devices.lib import notify_lookup_keys_changed
+            notify_lookup_keys_changed(self)
+
+    def _set_uuid(self, uuid):
+        self._uuid = uuid
+        self._notify_lookup_keys_changed()
+
+    def _get_uuid(self):
+        return self._uuid
+
+    uuid = property(
+        lambda s: s._get_uuid(),
+        lambda s, v: s._set_uuid(v),
+        doc="this format's UUID"
+    )
+
     def _set_options(self, options):
         self._options = options
 
@@ -73,11 +73,16 @@ class DiskLabel(DeviceFormat):
         self._parted_device = None
         self._parted_disk = None
         self._orig_parted_disk = None
+        self._orig_parted_disk_shared = False
         self._supported = True
 
         self._disk_label_alignment = None
         self._minimal_alignment = None
         self._optimal_alignment = None
+        self._end_alignments = {}
+
+        self._layout_cache = {}
+        self._layout_cache_disk = None
 
         if self.parted_device:
             # set up the parted objects and raise exception on failure
@@ -92,11 +97,27 @@ class DiskLabel(DeviceFormat):
         """ Create a deep copy of a Disklabel instance.
 
             We can't do copy.deepcopy on parted objects, which is okay.
+
+            The original parted disk is only ever replaced, never modified,
+            until :meth:`reset_parted_disk` makes it the working disk. The
+            copy therefore shares it with this instance and whichever of the
+            two resets its parted disk first duplicates it.
         """
-        return util.variable_copy(self, memo,
-                                  shallow=('_parted_device', '_optimal_alignment', '_minimal_alignment',
-                                           '_disk_label_alignment'),
-                                  duplicate=('_parted_disk', '_orig_parted_disk'))
+        shallow = ('_parted_device', '_optimal_alignment', '_minimal_alignment',
+                   '_disk_label_alignment', '_end_alignments')
+        omit = ('_layout_cache', '_layout_cache_disk')
+        if self._orig_parted_disk is None or self._orig_parted_disk is self._parted_disk:
+            new = util.variable_copy(self, memo, omit=omit, shallow=shallow,
+                                     duplicate=('_parted_disk', '_orig_parted_disk'))
+        else:
+            new = util.variable_copy(self, memo, shallow=shallow,
+                                     omit=omit + ('_orig_parted_disk',),
+                                     duplicate=('_parted_disk',))
+            self._orig_parted_disk_shared = True
+            new._orig_parted_disk_shared = True
+
+        new.partitions_changed()
+        return new
 
     def __repr__(self):
         s = DeviceFormat.__repr__(self)
@@ -147,10 +168,16 @@ class DiskLabel(DeviceFormat):
 
     def update_orig_parted_disk(self):
         self._orig_parted_disk = self.parted_disk.duplicate()
+        self._orig_parted_disk_shared = False
 
     def reset_parted_disk(self):
         """ Set this instance's parted_disk to reflect the disk's contents. """
         log_method_call(self, device=self.device)
+        if self._orig_parted_disk_shared:
+            # the working disk gets modified, so stop sharing it with copies
+            self._orig_parted_disk = self._orig_parted_disk.duplicate()
+            self._orig_parted_disk_shared = False
+
         self._parted_disk = self._orig_parted_disk
 
     def fresh_parted_disk(self):
@@ -411,6 +438,8 @@ class DiskLabel(DeviceFormat):
         self.parted_disk.addPartition(partition=new_partition,
                                       constraint=constraint)
 
+        self.partitions_changed()
+
     def remove_partition(self, partition):
         """ Remove a partition from the disklabel.
 
@@ -418,6 +447,49 @@ class DiskLabel(DeviceFormat):
             :type partition: :class:`parted.Partition`
         """
         self.parted_disk.removePartition(partition)
+        self.partitions_changed()
+
+    def partitions_changed(self):
+        """ Drop cached layout information after the partitions changed.
+
+            This must be called after adding, removing or resizing
+            partitions on :attr:`parted_disk` directly. :meth:`add_partition`
+            and :meth:`remove_partition` call it themselves. Replacing the
+            parted disk, eg: via :meth:`reset_parted_disk`, needs no call.
+        """
+        self._layout_cache = {}
+        self._layout_cache_disk = None
+
+    def get_layout_info(self, key, func):
+        """ Return information about the partition layout, computing it once.
+
+            :param key: a hashable key identifying the information
+            :param callable func: function to compute the information
+            :returns: the value func returned for the current layout
+
+            The value is cached until the partitions change (see
+            :meth:`partitions_changed`) or the parted disk is replaced.
+        """
+        parted_disk = self.parted_disk
+        if self._layout_cache_disk is not parted_disk:
+            self._layout_cache = {}
+            self._layout_cache_disk = parted_disk
+
+        try:
+            return self._layout_cache[key]
+        except KeyError:
+            value = self._layout_cache[key] = func()
+            return value
+
+    @property
+    def free_regions(self):
+        """ The parted disk's free regions, as a tuple of :class:`parted.Geometry`.
+
+            The geometries are shared until the layout changes, so they must
+            not be modified.
+        """
+        return self.get_layout_info("free_regions",
+                                    lambda: tuple(self.parted_disk.getFreeSpaceRegions()))
 
     @property
     def extended_partition(self):
@@ -566,8 +638,12 @@ class DiskLabel(DeviceFormat):
         if alignment is None:
             alignment = self.get_alignment(size=size)
 
-        return parted.Alignment(offset=alignment.offset - 1,
-                                grainSize=alignment.grainSize)
+        key = (alignment.offset, alignment.grainSize)
+        if key not in self._end_alignments:
+            self._end_alignments[key] = parted.Alignment(offset=alignment.offset - 1,
+                                                         grainSize=alignment.grainSize)
+
+        return self._end_alignments[key]
 
     @property
     def alignment(self):
@@ -579,11 +655,13 @@ class DiskLabel(DeviceFormat):
 
     @property
     def free(self):
-        if self.parted_disk is not None:
-            free_areas = self.parted_disk.getFreeSpacePartitions()
-        else:
-            free_areas = []
+        if self.parted_disk is None:
+            return Size(0)
+
+        return self.get_layout_info("free", self._get_free)
 
+    def _get_free(self):
+        free_areas = self.parted_disk.getFreeSpacePartitions()
         return sum((Size(f.getLength(unit="B")) for f in free_areas), Size(0))
 
     @property
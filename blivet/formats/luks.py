@@ -276,7 +276,7 @@ class LUKS(DeviceFormat):
         log.debug("unmapping %s", self.map_name)
         blockdev.crypto.luks_close(self.map_name)
 
-        udev.settle()
+        udev.wait_for_device(device_node="/dev/mapper/%s" % self.map_name, exists=False)
 
     def _pre_resize(self):
         if self.luks_version == "luks2" and not self.has_key:
@@ -490,7 +490,7 @@ class Integrity(DeviceFormat):
         # for all devices supported by cryptsetup
         blockdev.crypto.luks_close(self.map_name)
 
-        udev.settle()
+        udev.wait_for_device(device_node="/dev/mapper/%s" % self.map_name, exists=False)
 
 
 register_device_format(Integrity)
@@ -21,8 +21,9 @@
 #
 
 from operator import gt, lt
-from decimal import Decimal
+from decimal import Decimal, getcontext
 import functools
+import six
 
 import gi
 gi.require_version("BlockDev", "2.0")
@@ -40,6 +41,10 @@ from .util import stringize, unicodeize, compare
 import logging
 log = logging.getLogger("blivet")
 
+# limit on base * pool below which the rounding error of the decimal share
+# computation is too small to carry a non-integer share past the next integer
+_EXACT_SHARE_LIMIT = 10 ** (getcontext().prec - 2)
+
 
 def partition_compare(part1, part2):
     """ More specifically defined partitions come first.
@@ -116,6 +121,13 @@ def partition_compare(part1, part2):
 _partition_compare_key = functools.cmp_to_key(partition_compare)
 
 
+def _get_next_partition_type(disklabel, no_primary=None):
+    """ Return :func:`get_next_partition_type` for a disklabel, cached per layout. """
+    return disklabel.get_layout_info(("next_partition_type", no_primary),
+                                     lambda: get_next_partition_type(disklabel.parted_disk,
+                                                                     no_primary=no_primary))
+
+
 def get_next_partition_type(disk, no_primary=None):
     """ Return the type of partition to create next on a disk.
 
@@ -171,7 +183,7 @@ def get_next_partition_type(disk, no_primary=None):
 
 def get_best_free_space_region(disk, part_type, req_size, start=None,
                                boot=None, best_free=None, grow=None,
-                               alignment=None):
+                               alignment=None, free_regions=None):
     """ Return the "best" free region on the specified disk.
 
         For non-boot partitions, we return the largest free region on the
@@ -202,6 +214,8 @@ def get_best_free_space_region(disk, part_type, req_size, start=None,
         :type grow: bool
         :keyword alignment: disk alignment requirements
         :type alignment: :class:`parted.Alignment`
+        :keyword free_regions: the disk's free regions, if already known
+        :type free_regions: list of :class:`parted.Geometry`
 
     """
     log.debug("get_best_free_space_region: disk=%s part_type=%d req_size=%s "
@@ -211,7 +225,10 @@ def get_best_free_space_region(disk, part_type, req_size, start=None,
     extended = disk.getExtendedPartition()
     alignment = alignment or parted.Alignment(offset=0, grainSize=1)
 
-    for free_geom in disk.getFreeSpaceRegions():
+    if free_regions is None:
+        free_regions = disk.getFreeSpaceRegions()
+
+    for free_geom in free_regions:
         # align the start sector of the free region since we will be aligning
         # the start sector of the partition
         if start is not None and \
@@ -344,7 +361,7 @@ def remove_new_partitions(disks, remove, all_partitions):
 
             if part.is_logical:
                 removed_logical.append(part)
-            part.disk.format.parted_disk.removePartition(part.parted_partition)
+            part.disk.format.remove_partition(part.parted_partition)
             part.parted_partition = None
             part.disk = None
 
@@ -374,7 +391,7 @@ def remove_new_partitions(disks, remove, all_partitions):
         extended = disk.format.extended_partition
         if _remove_extended(disk, extended):
             log.debug("removing empty extended partition from %s", disk.name)
-            disk.format.parted_disk.removePartition(extended)
+            disk.format.remove_partition(extended)
 
 
 def add_partition(disklabel, free, part_type, size, start=None, end=None):
@@ -473,6 +490,8 @@ def add_partition(disklabel, free, part_type, size, start=None, end=None):
                                            constraint=constraint)
     except _ped.PartitionException as e:
         raise PartitioningError(_("failed to add partition to disk: %s") % str(e))
+    finally:
+        disklabel.partitions_changed()
 
     return partition
 
@@ -794,7 +813,7 @@ def allocate_partitions(storage, disks, partitions, freespace, boot_disk=None):
                 log.debug("size %s rounded up to %s for disk %s",
                           _part.req_size, req_size, _disk.name)
 
-            new_part_type = get_next_partition_type(disklabel.parted_disk)
+            new_part_type = _get_next_partition_type(disklabel)
             if new_part_type is None:
                 # can't allocate any more partitions on this disk
                 log.debug("no free partition slots on %s", _disk.name)
@@ -821,14 +840,14 @@ def allocate_partitions(storage, disks, partitions, freespace, boot_disk=None):
                                               best_free=current_free,
                                               boot=boot,
                                               grow=_part.req_grow,
-                                              alignment=alignment)
+                                              alignment=alignment,
+                                              free_regions=disklabel.free_regions)
 
             if best == free and not _part.req_primary and \
                new_part_type == parted.PARTITION_NORMAL:
                 # see if we can do better with a logical partition
                 log.debug("not enough free space for primary -- trying logical")
-                new_part_type = get_next_partition_type(disklabel.parted_disk,
-                                                        no_primary=True)
+                new_part_type = _get_next_partition_type(disklabel, no_primary=True)
                 if new_part_type:
                     best = get_best_free_space_region(disklabel.parted_disk,
                                                       new_part_type,
@@ -837,7 +856,8 @@ def allocate_partitions(storage, disks, partitions, freespace, boot_disk=None):
                                                       best_free=current_free,
                                                       boot=boot,
                                                       grow=_part.req_grow,
-                                                      alignment=alignment)
+                                                      alignment=alignment,
+                                                      free_regions=disklabel.free_regions)
 
             if best and free != best:
                 update = True
@@ -880,7 +900,7 @@ def allocate_partitions(storage, disks, partitions, freespace, boot_disk=None):
                                              "extended partition for growth test")
                                     if new_part_type == parted.PARTITION_EXTENDED:
                                         e = disklabel.extended_partition
-                                        disklabel.parted_disk.removePartition(e)
+                                        disklabel.remove_partition(e)
 
                                     continue
 
@@ -928,13 +948,13 @@ def allocate_partitions(storage, disks, partitions, freespace, boot_disk=None):
                                                   disk_sector_size))
 
                     if temp_part:
-                        disklabel.parted_disk.removePartition(temp_part)
+                        disklabel.remove_partition(temp_part)
                     _part.parted_partition = None
                     _part.disk = None
 
                     if new_part_type == parted.PARTITION_EXTENDED:
                         e = disklabel.extended_partition
-                        disklabel.parted_disk.removePartition(e)
+                        disklabel.remove_partition(e)
 
                     log.debug("total growth: %d sectors", new_growth)
 
@@ -1137,6 +1157,27 @@ class LVRequest(Request):
         return reserve
 
 
+def _proportional_growth(base, total, pool):
+    """ Return a request's share of a pool, proportional to its base.
+
+        :param int base: the request's base
+        :param int total: the combined base of all growing requests
+        :param int pool: the number of units to distribute
+        :rtype: int
+
+        The result is the same as ``int(Decimal(base) / Decimal(total) * pool)``.
+        Exact integer division is used unless the quotient is itself an
+        integer, which the decimal computation can fall one short of, or the
+        operands are large enough for the decimal rounding to matter.
+    """
+    if 0 <= base and 0 < total and 0 <= pool and base * pool < _EXACT_SHARE_LIMIT:
+        (growth, remainder) = divmod(base * pool, total)
+        if remainder:
+            return growth
+
+    return int(Decimal(base) / Decimal(total) * pool)
+
+
 class Chunk(object):
 
     """ A free region from which devices will be allocated """
@@ -1253,17 +1294,20 @@ class Chunk(object):
     def size_to_length(self, size):
         return size
 
-    def trim_over_grown_request(self, req, base=None):
+    def trim_over_grown_request(self, req, base=None, max_growth=None):
         """ Enforce max growth and return extra units to the pool.
 
             :param req: the request to trim
             :type req: :class:`Request`
             :keyword base: base unit count to adjust if req is done growing
             :type base: int
+            :keyword max_growth: the request's maximum growth, if already known
+            :type max_growth: int
             :returns: the new base or None if no base was given
             :rtype: int or None
         """
-        max_growth = self.max_growth(req)
+        if max_growth is None:
+            max_growth = self.max_growth(req)
         if max_growth and req.growth >= max_growth:
             if req.growth > max_growth:
                 # we've grown beyond the maximum. put some back.
@@ -1299,6 +1343,10 @@ class Chunk(object):
 
             Under uniform growth, all requests receive an equal portion of the
             free units.
+
+            Chunks whose units are integers are grown with integer arithmetic
+            (see :meth:`_grow_requests_fast`), which yields the same growth as
+            the generic :meth:`_grow_requests_iterative`.
         """
         log.debug("Chunk.grow_requests: %r", self)
 
@@ -1306,6 +1354,26 @@ class Chunk(object):
         for req in self.requests:
             log.debug("req: %r", req)
 
+        integral = (isinstance(self.pool, six.integer_types) and
+                    all(isinstance(r.base, six.integer_types) for r in self.requests))
+        if integral:
+            self._grow_requests_fast(uniform)
+        else:
+            self._grow_requests_iterative(uniform)
+
+        if self.pool:
+            self._grow_leftovers()
+
+        # requests that were skipped over this time through are back on the
+        # table next time
+        self.skip_list = []
+
+    def _grow_requests_iterative(self, uniform):
+        """ Distribute the pool among the growable requests.
+
+            :param uniform: grow requests uniformly instead of proportionally
+            :type uniform: bool
+        """
         # we use this to hold the base for the next loop through the
         # chunk's requests since we want the base to be the same for
         # all requests in any given growth iteration
@@ -1342,32 +1410,98 @@ class Chunk(object):
                           p.device.id, p.device.name, p.growth,
                           self.length_to_size(p.growth))
 
-        if self.pool:
-            # allocate any leftovers in pool to the first partition
-            # that can still grow
-            for p in self.requests:
-                if p.done or p in self.skip_list:
-                    continue
+    def _grow_requests_fast(self, uniform):
+        """ Distribute the pool among the growable requests using integers.
 
-                growth = self.pool
-                p.growth += growth
-                self.pool = 0
-                log.debug("adding %s (%s) to %d (%s)",
-                          growth, self.length_to_size(growth),
-                          p.device.id, p.device.name)
+            :param uniform: grow requests uniformly instead of proportionally
+            :type uniform: bool
 
-                self.trim_over_grown_request(p)
-                log.debug("new grow amount for request %d (%s) is %s "
-                          "units, or %s",
-                          p.device.id, p.device.name, p.growth,
-                          self.length_to_size(p.growth))
+            This is :meth:`_grow_requests_iterative` without the per-request
+            rescans: the count of unfinished requests and, for chunks whose
+            requests are ordered by position, the growth of the requests
+            preceding each request are maintained as the requests are
+            visited instead of being recomputed for every request.
+        """
+        debug = log.isEnabledFor(logging.DEBUG)
+        skip = set(id(r) for r in self.skip_list)
+        starts = self._request_starts()
+        remaining = self.remaining
 
-                if self.pool == 0:
-                    break
+        new_base = self.base
+        last_pool = 0
+        while remaining and self.pool and last_pool != self.pool:
+            last_pool = self.pool
+            self.base = new_base
+            if uniform:
+                growth = int(last_pool / remaining)
+
+            if debug:
+                log.debug("%d requests and %s (%s) left in chunk",
+                          remaining, self.pool, self.length_to_size(self.pool))
+
+            preceding = 0       # growth of requests before the current start
+            group_start = None
+            group_growth = 0    # growth of requests at the current start
+            for (i, p) in enumerate(self.requests):
+                if starts is not None and starts[i] != group_start:
+                    preceding += group_growth
+                    group_start = starts[i]
+                    group_growth = 0
+
+                if not p.done and id(p) not in skip:
+                    if not uniform:
+                        growth = _proportional_growth(p.base, self.base, last_pool)
+
+                    p.growth += growth
+                    self.pool -= growth
+                    if starts is None:
+                        max_growth = self.max_growth(p)
+                    else:
+                        max_growth = self.max_growth(p, growth_before=preceding)
 
-        # requests that were skipped over this time through are back on the
-        # table next time
-        self.skip_list = []
+                    new_base = self.trim_over_grown_request(p, base=new_base,
+                                                            max_growth=max_growth)
+                    if p.done:
+                        remaining -= 1
+
+                    if debug:
+                        log.debug("new grow amount for request %d (%s) is %s "
+                                  "units, or %s (added %s)",
+                                  p.device.id, p.device.name, p.growth,
+                                  self.length_to_size(p.growth), growth)
+
+                group_growth += p.growth
+
+    def _grow_leftovers(self):
+        """ Allocate what is left in the pool to the first growable requests. """
+        for p in self.requests:
+            if p.done or p in self.skip_list:
+                continue
+
+            growth = self.pool
+            p.growth += growth
+            self.pool = 0
+            log.debug("adding %s (%s) to %d (%s)",
+                      growth, self.length_to_size(growth),
+                      p.device.id, p.device.name)
+
+            self.trim_over_grown_request(p)
+            log.debug("new grow amount for request %d (%s) is %s "
+                      "units, or %s",
+                      p.device.id, p.device.name, p.growth,
+                      self.length_to_size(p.growth))
+
+            if self.pool == 0:
+                break
+
+    def _request_starts(self):
+        """ Return the start of each request, in order, or None.
+
+            Chunks whose requests' maximum growth depends on the growth of
+            the requests that precede them return the position that
+            :meth:`max_growth` orders requests by.
+        """
+        return None
 
 
 class DiskChunk(Chunk):
@@ -1448,11 +1582,13 @@ class DiskChunk(Chunk):
 
         super(DiskChunk, self).add_request(req)
 
-    def max_growth(self, req):
+    def max_growth(self, req, growth_before=None):
         """ Return the maximum possible growth for a request.
 
             :param req: the request
             :type req: :class:`PartitionRequest`
+            :keyword growth_before: growth of the requests preceding req
+            :type growth_before: int
         """
         req_end = req.device.parted_partition.geometry.end
         req_start = req.device.parted_partition.geometry.start
@@ -1463,11 +1599,12 @@ class DiskChunk(Chunk):
         # request, including growth of earlier requests but not including
         # growth of this request. Maximum growth values are obtained using
         # this end sector and various values for maximum end sector.
-        growth = 0
-        for request in self.requests:
-            if request.device.parted_partition.geometry.start < req_start:
-                growth += request.growth
-        req_end += growth
+        if growth_before is None:
+            growth_before = 0
+            for request in self.requests:
+                if request.device.parted_partition.geometry.start < req_start:
+                    growth_before += request.growth
+        req_end += growth_before
 
         # obtain the set of possible maximum sectors-of-growth values for this
         # request and use the smallest
@@ -1499,6 +1636,9 @@ class DiskChunk(Chunk):
         # sort the partitions by start sector
         self.requests.sort(key=lambda r: r.device.parted_partition.geometry.start)
 
+    def _request_starts(self):
+        return [r.device.parted_partition.geometry.start for r in self.requests]
+
 
 class VGChunk(Chunk):
 
@@ -1933,6 +2073,7 @@ def grow_partitions(disks, partitions, free, size_sets=None):
                 constraint = parted.Constraint(exactGeom=partition.geometry)
                 disklabel.parted_disk.addPartition(partition=partition,
                                                    constraint=constraint)
+                disklabel.partitions_changed()
                 path = partition.path
                 if device:
                     # set the device's name
@@ -1,8 +1,10 @@
 import inspect as _inspect
 import six as _six
 
+from ... import udev as _udev
 from .devicepopulator import DevicePopulator
 from .formatpopulator import FormatPopulator
+from .populatorhelper import PopulatorHelper
 
 from .btrfs import BTRFSFormatPopulator
 from .boot import AppleBootFormatPopulator, EFIFormatPopulator, MacEFIFormatPopulator
@@ -19,7 +21,7 @@ from .optical import OpticalDevicePopulator
 from .partition import PartitionDevicePopulator
 from .stratis import StratisFormatPopulator, StratisXFSFormatPopulator
 
-__all__ = ["get_device_helper", "get_format_helper"]
+__all__ = ["get_device_helper", "get_format_helper", "get_probe_helpers"]
 
 _device_helpers = []
 _format_helpers = []
@@ -62,3 +64,28 @@ def get_format_helper(data, device):
         class. This function returns the first matching class.
     """
     return _six.next((h for h in _format_helpers if h.match(data, device=device)), None)
+
+
+def _has_probe(helper):
+    return helper.probe.__func__ is not PopulatorHelper.probe.__func__
+
+
+def get_probe_helpers(data):
+    """ Return the helper classes with probes to run for the specified data.
+
+        This includes the device helper that matches the data and the format
+        helpers for the format type reported by udev. Format helpers cannot be
+        matched exactly without a device instance, but probing a few devices
+        needlessly is harmless.
+    """
+    helpers = []
+    device_helper = get_device_helper(data)
+    if device_helper is not None and _has_probe(device_helper):
+        helpers.append(device_helper)
+
+    fmt = _udev.device_get_format(data)
+    if fmt:
+        helpers.extend(h for h in _format_helpers
+                       if h._type_specifier == fmt and _has_probe(h))
+
+    return helpers
@@ -27,7 +27,7 @@ gi.require_version("GLib", "2.0")
 from gi.repository import BlockDev as blockdev
 from gi.repository import GLib
 
-from ... import udev
+from ... import load_plugins, udev
 from ... import util
 from ...devices import DASDDevice, DiskDevice, FcoeDiskDevice, iScsiDiskDevice
 from ...devices import MDBiosRaidArrayDevice, ZFCPDiskDevice, NVDIMMNamespaceDevice
@@ -275,6 +275,7 @@ class NVMeNamespaceDevicePopulator(DiskDevicePopulator):
             # the nvme plugin is not generally available
             return kwargs
 
+        load_plugins(["nvme"])
         path = udev.device_get_devname(self.data)
         try:
             ninfo = blockdev.nvme_get_namespace_info(path)
@@ -309,6 +310,7 @@ class NVMeFabricsNamespaceDevicePopulator(DiskDevicePopulator):
             # the nvme plugin is not generally available
             return kwargs
 
+        load_plugins(["nvme"])
         path = udev.device_get_devname(self.data)
         try:
             ninfo = blockdev.nvme_get_namespace_info(path)
@@ -37,6 +37,60 @@ import logging
 log = logging.getLogger("blivet")
 
 
+def setup_luks_format(device, passphrases=None):
+    """ Set up the LUKS format of a device.
+
+        :param device: the device with the LUKS format
+        :type device: :class:`~.devices.StorageDevice`
+        :keyword passphrases: passphrases to try if the format has no key yet
+        :type passphrases: list of str
+
+        The passphrase that opened the device before is tried first (see
+        :meth:`~.static_data.luks_data.LUKS_Data.sort_passphrases`).
+    """
+    uuid = device.format.uuid
+    for passphrase in luks_data.sort_passphrases(uuid, passphrases or []):
+        device.format.passphrase = passphrase
+        try:
+            device.format.setup()
+        except (LUKSError, blockdev.BlockDevError):
+            device.format.passphrase = None
+        else:
+            luks_data.remember_passphrase(uuid, passphrase)
+            break
+
+    # try only to setup the luks format -- the luks device will be
+    # discovered and added later by the LUKSDevicePopulator
+    try:
+        device.format.setup()
+    except (LUKSError, blockdev.CryptoError, DeviceError) as e:
+        log.info("setup of %s failed: %s", device.format.map_name, e)
+
+
+def open_luks_format(path, map_name, passphrases):
+    """ Try to open a LUKS format with each of the given passphrases.
+
+        :param str path: path to the device with the LUKS format
+        :param str map_name: name of the mapped device to create
+        :param passphrases: passphrases to try, in order
+        :type passphrases: list of str
+        :returns: the passphrase that opened the format or None
+        :rtype: str or NoneType
+
+        This only calls libblockdev and touches no blivet objects, so it can
+        run in worker threads. The caller is expected to update the format.
+    """
+    for passphrase in passphrases:
+        try:
+            blockdev.crypto.luks_open(path, map_name, passphrase=passphrase)
+        except blockdev.BlockDevError:
+            continue
+        else:
+            return passphrase
+
+    return None
+
+
 class LUKSDevicePopulator(DevicePopulator):
     @classmethod
     def match(cls, data):
@@ -122,6 +176,7 @@ class LUKSFormatPopulator(FormatPopulator):
 
         # look up or create the mapped device
         if not self._devicetree.get_device_by_name(self.device.format.map_name):
+            passphrases = None
             passphrase = luks_data.luks_devs.get(self.device.format.uuid)
             if self.device.format.configured:
                 pass
@@ -142,21 +197,10 @@ class LUKSFormatPopulator(FormatPopulator):
                 # reset/populate, in which case the new passphrase would not be
                 # in luks_data.passphrases.
                 passphrases = luks_data.passphrases + list(luks_data.luks_devs.values())
-                for passphrase in passphrases:
-                    self.device.format.passphrase = passphrase
-                    try:
-                        self.device.format.setup()
-                    except blockdev.BlockDevError:
-                        self.device.format.passphrase = None
-                    else:
-                        break
-
-            # try only to setup the luks format -- the luks device will be
-            # discovered and added later by the LUKSDevicePopulator
-            try:
-                self.device.format.setup()
-            except (LUKSError, blockdev.CryptoError, DeviceError) as e:
-                log.info("setup of %s failed: %s", self.device.format.map_name, e)
+
+            # the populator may set up the format together with other LUKS
+            # formats found at the same time
+            self._devicetree.setup_luks_format(self.device, passphrases)
         else:
             log.warning("luks device %s already in the tree",
                         self.device.format.map_name)
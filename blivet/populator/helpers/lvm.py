@@ -37,7 +37,7 @@ from ...tasks.availability import BLOCKDEV_LVM_PLUGIN_VDO
 from .devicepopulator import DevicePopulator
 from .formatpopulator import FormatPopulator
 
-from ...static_data import lvs_info, pvs_info, vgs_info
+from ...static_data import lvs_info, pvs_info, vgs_info, drop_vg_cache
 
 import logging
 log = logging.getLogger("blivet")
@@ -88,13 +88,10 @@ class LVMFormatPopulator(FormatPopulator):
     def _get_kwargs(self):
         kwargs = super(LVMFormatPopulator, self)._get_kwargs()
 
-        # new PV, add it to the LVM devices list and re-run pvs/lvs/vgs
+        # new PV, add it to the LVM devices list and re-read the information
+        # about it and its VG
         lvm.lvm_devices_add(self.device.path)
-        pvs_info.drop_cache()
-        vgs_info.drop_cache()
-        lvs_info.drop_cache()
-
-        pv_info = pvs_info.cache.get(self.device.path, None)
+        pv_info = self._drop_lvm_cache()
 
         name = udev.device_get_name(self.data)
         if pv_info:
@@ -115,6 +112,23 @@ class LVMFormatPopulator(FormatPopulator):
 
         return kwargs
 
+    def _drop_lvm_cache(self):
+        """ Drop cached lvm information about this PV and its VG.
+
+            :returns: the updated information about this PV (if any)
+        """
+        fmt = self.device.format
+        if getattr(fmt, "vg_name", None):
+            drop_vg_cache(fmt.vg_name, fmt.vg_uuid)
+
+        pvs_info.drop_pv_cache(self.device.path)
+        pv_info = pvs_info.cache.get(self.device.path, None)
+        if pv_info and pv_info.vg_name:
+            lvs_info.drop_vg_cache(pv_info.vg_name)
+            vgs_info.drop_vg_cache(pv_info.vg_name, pv_info.vg_uuid)
+
+        return pv_info
+
     def _get_vg_device(self):
         return self._devicetree.get_device_by_uuid(self.device.format.container_uuid, incomplete=True)
 
@@ -455,7 +469,7 @@ class LVMFormatPopulator(FormatPopulator):
         self.device.format.pe_free = Size(pv_info.pv_free)
 
     def update(self):
-        self._devicetree.drop_lvm_cache()
+        self._drop_lvm_cache()
         self._update_pv_format()
         pv_info = pvs_info.cache.get(self.device.path, None)
         vg_device = self._get_vg_device()
@@ -95,6 +95,7 @@ class MDDevicePopulator(DevicePopulator):
 class MDFormatPopulator(FormatPopulator):
     priority = 100
     _type_specifier = "mdmember"
+    probe_cacheable = True
 
     def _get_kwargs(self):
         kwargs = super(MDFormatPopulator, self)._get_kwargs()
@@ -111,17 +112,34 @@ class MDFormatPopulator(FormatPopulator):
         kwargs["biosraid"] = udev.device_is_biosraid_member(self.data)
         return kwargs
 
+    @staticmethod
+    def _examine(path):
+        """ Return the parts of the member's mdadm examine data used here. """
+        md_info = blockdev.md.examine(path)
+        return dict((attr, getattr(md_info, attr))
+                    for attr in ("uuid", "level", "num_devices", "metadata", "device"))
+
+    @classmethod
+    def probe(cls, data):
+        try:
+            return cls._examine(udev.device_get_devname(data))
+        except blockdev.MDRaidError:
+            # run() will try again and log the error
+            return None
+
     def run(self):
         super(MDFormatPopulator, self).run()
-        try:
-            md_info = blockdev.md.examine(self.device.path)
-        except blockdev.MDRaidError as e:
-            # This could just mean the member is not part of any array.
-            log.debug("blockdev.md.examine error: %s", str(e))
-            return
+        md_info = self.probe_result
+        if md_info is None:
+            try:
+                md_info = self._examine(self.device.path)
+            except blockdev.MDRaidError as e:
+                # This could just mean the member is not part of any array.
+                log.debug("blockdev.md.examine error: %s", str(e))
+                return
 
         # Use mdadm info if udev info is missing
-        md_uuid = md_info.uuid
+        md_uuid = md_info["uuid"]
         self.device.format.md_uuid = self.device.format.md_uuid or md_uuid
         md_array = self._devicetree.get_device_by_uuid(self.device.format.md_uuid, incomplete=True)
 
@@ -130,8 +148,8 @@ class MDFormatPopulator(FormatPopulator):
         else:
             # create the array with just this one member
             # level is reported as, eg: "raid1"
-            md_level = md_info.level
-            md_devices = md_info.num_devices
+            md_level = md_info["level"]
+            md_devices = md_info["num_devices"]
 
             if md_level is None:
                 log.warning("invalid data for %s: no RAID level", self.device.name)
@@ -139,7 +157,7 @@ class MDFormatPopulator(FormatPopulator):
 
             # md_examine yields metadata (MD_METADATA) only for metadata version > 0.90
             # if MD_METADATA is missing, assume metadata version is 0.90
-            md_metadata = md_info.metadata or "0.90"
+            md_metadata = md_info["metadata"] or "0.90"
             md_name = None
 
             # check the list of devices udev knows about to see if the array
@@ -163,7 +181,7 @@ class MDFormatPopulator(FormatPopulator):
                     md_name = udev.device_get_md_name(dev)
                     break
 
-            md_path = md_info.device or ""
+            md_path = md_info["device"] or ""
             if md_path and not md_name:
                 md_name = device_path_to_name(md_path)
                 if re.match(r'md\d+$', md_name):
@@ -27,6 +27,13 @@ class PopulatorHelper(object):
     priority = 100
     """ Higher priority value gets checked for match first. """
 
+    probe_cacheable = False
+    """ whether the results of :meth:`probe` can be kept across runs
+
+        The results of such helpers must be JSON-serializable and depend only
+        on the device's metadata (see :class:`~.static_data.probe_cache.ProbeCache`).
+    """
+
     def __init__(self, devicetree, data, device=None):
         """
             :param :class:`~.DeviceTree` devicetree: the calling devicetree
@@ -38,6 +45,9 @@ class PopulatorHelper(object):
         self.data = data
         self.device = device
 
+        self.probe_result = None
+        """ result of :meth:`probe` for this device, if it was run """
+
     @classmethod
     def match(cls, data):
         """ Return True if this helper is appropriate for the given device.
@@ -48,6 +58,27 @@ class PopulatorHelper(object):
         """
         raise NotImplementedError()
 
+    @classmethod
+    def probe(cls, data):
+        """ Gather type-specific information that is expensive to obtain.
+
+            :param :class:`pyudev.Device` data: udev data describing a device
+            :returns: information for :meth:`run` or None
+
+            When concurrent probing is enabled (see
+            :attr:`~.flags.Flags.populate_workers`), this is called for the
+            device ahead of :meth:`run`, concurrently with the probes of other
+            devices. It must therefore not modify anything or use the device
+            tree. The return value is available in :attr:`probe_result` and
+            :meth:`run` has to do the probing itself if that is None.
+
+            Only :class:`~.mdraid.MDFormatPopulator` has a probe so far.
+            Disklabels are still read in :meth:`run` because libparted keeps
+            a global list of devices that is not safe to use from several
+            threads. The other formats are detected from the udev data.
+        """
+        return None
+
     def run(self):
         """ Run type-specific processing.
 
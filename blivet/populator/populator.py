@@ -32,11 +32,13 @@ gi.require_version("BlockDev", "2.0")
 from gi.repository import BlockDev as blockdev
 
 from ..errors import DeviceError, DeviceTreeError, NoParentsError
+from ..events.manager import Event
 from ..devices import DMLinearDevice, DMRaidArrayDevice
 from ..devices import FileDevice, LoopDevice
 from ..devices import MDRaidArrayDevice
 from ..devices import MultipathDevice
 from ..devices import NoDevice
+from ..devicelibs import crypto
 from ..devicelibs import disk as disklib
 from ..devicelibs import lvm
 from .. import formats
@@ -45,14 +47,21 @@ from .. import util
 from ..flags import flags
 from ..storage_log import log_method_call
 from ..tasks import availability
-from ..threads import SynchronizedMeta
-from .helpers import get_device_helper, get_format_helper
+from ..threads import SynchronizedMeta, run_concurrently
+from .helpers import get_device_helper, get_format_helper, get_probe_helpers
+from .helpers import luks as luks_helper
 from ..static_data import lvs_info, pvs_info, vgs_info, luks_data, mpath_members, stratis_info
+from ..static_data import probe_cache, request_fullreport
 from ..callbacks import callbacks
 
 import logging
 log = logging.getLogger("blivet")
 
+# udev properties that, together with the size, identify the state of a device
+# for DeviceTree.refresh
+_FINGERPRINT_PROPERTIES = ("ID_FS_TYPE", "ID_FS_UUID", "ID_FS_UUID_SUB", "ID_FS_LABEL",
+                           "ID_PART_TABLE_TYPE", "ID_PART_TABLE_UUID", "DM_UUID", "MD_UUID")
+
 
 def parted_exn_handler(exn_type, exn_options, exn_msg):
     """ Answer any of parted's yes/no questions in the affirmative.
@@ -91,6 +100,9 @@ class PopulatorMixin(object):
         self.drop_device_info_cache()
 
         self._cleanup = False
+        self._probe_results = {}
+        self._fingerprints = {}
+        self._luks_setups = None
 
     def _add_parent_devices(self, info):
         """ Add all parents of a device, raising DeviceTreeError on failure.
@@ -253,6 +265,7 @@ class PopulatorMixin(object):
             return
 
         log.info("scanning %s (%s)...", name, sysfs_path)
+        self._fingerprints[sysfs_path] = self._get_fingerprint(info)
         if udev.device_is_hidden(info):
             log.info("device %s is marked as hidden in sysfs, ignoring", name)
             return
@@ -294,7 +307,9 @@ class PopulatorMixin(object):
             helper_class = self._get_device_helper(info)
 
         if helper_class is not None:
-            device = helper_class(self, info).run()
+            helper = helper_class(self, info)
+            helper.probe_result = self._pop_probe_result(helper_class, info)
+            device = helper.run()
 
         if not device:
             log.debug("no device obtained for %s", name)
@@ -334,7 +349,9 @@ class PopulatorMixin(object):
 
         helper_class = self._get_format_helper(info, device=device)
         if helper_class is not None:
-            helper_class(self, info, device).run()
+            helper = helper_class(self, info, device)
+            helper.probe_result = self._pop_probe_result(helper_class, info)
+            helper.run()
 
         log.info("got format: %s", device.format)
 
@@ -443,7 +460,9 @@ class PopulatorMixin(object):
 
         parted.register_exn_handler(parted_exn_handler)
         try:
-            self._populate()
+            # one udev snapshot serves all the lookups made while populating
+            with udev.snapshot_kept():
+                self._populate()
         finally:
             parted.clear_exn_handler()
             self._hide_ignored_disks()
@@ -454,15 +473,105 @@ class PopulatorMixin(object):
 
         disklib.update_volume_info()
         self.drop_device_info_cache()
+        # get information about all LVM objects at once when it's first needed
+        request_fullreport()
 
         if flags.auto_dev_updates and availability.BLOCKDEV_MPATH_PLUGIN.available:
             blockdev.mpath.set_friendly_names(flags.multipath_friendly_names)
 
         self.setup_disk_images()
+        probe_cache.reset()
+        self._scan_new_devices(set(), report=True)
+        probe_cache.save()
+
+        # After having the complete tree we make sure that the system
+        # inconsistencies are ignored or resolved.
+        self._handle_inconsistencies()
+
+    def refresh(self, devices=None):
+        """ Update the tree to reflect changes to the system's devices.
 
-        old_devices = {}
+            :keyword devices: devices to re-probe even if they seem unchanged
+            :type devices: list of :class:`~.devices.StorageDevice`
+
+            Unlike :meth:`populate` on a freshly reset tree, this only scans
+            the devices that have appeared, disappeared or changed since they
+            were last scanned (and their descendants). Changes are handled the
+            same way as the corresponding uevents.
+        """
+        log_method_call(self, devices=[d.name for d in devices or []])
+        parted.register_exn_handler(parted_exn_handler)
+        try:
+            with udev.snapshot_kept():
+                self._refresh(devices or [])
+        finally:
+            parted.clear_exn_handler()
+            self._hide_ignored_disks()
+
+    def _refresh(self, requested):
+        disklib.update_volume_info()
+        self.drop_device_info_cache()
+        request_fullreport()
+
+        udev_devices = dict((udev.device_get_sysfs_path(info), info)
+                            for info in udev.get_devices())
+
+        # devices that are gone: disks have been removed, anything else has
+        # been deactivated
+        stale = set()
+        for device in self.devices:
+            if not device.exists or not device.sysfs_path or device.sysfs_path in udev_devices:
+                continue
+
+            self._fingerprints.pop(device.sysfs_path, None)
+            if device.is_disk:
+                log.info("disk %s was removed", device.name)
+                stale.update(p for d in self.get_dependent_devices(device) for p in d.parents)
+                self.cancel_disk_actions([device])
+                self.recursive_remove(device, actions=False)
+                self._remove_device(device)
+            else:
+                log.info("device %s was deactivated", device.name)
+                old_sysfs_path = device.sysfs_path
+                device.sysfs_path = ''
+                callbacks.attribute_changed(device=device, attr="sysfs_path",
+                                            old=old_sysfs_path, new='')
+
+        # devices that changed, have lost some of their dependents or were
+        # explicitly requested
+        changed = [d for d in self.devices
+                   if d.exists and d.sysfs_path in udev_devices and
+                   (d in stale or d in requested or
+                    self._fingerprints.get(d.sysfs_path) != self._get_fingerprint(udev_devices[d.sysfs_path]))]
+        for device in changed:
+            info = udev_devices[device.sysfs_path]
+            if device not in self.devices:
+                # removed while handling a change to one of its ancestors
+                continue
+
+            log.info("re-scanning %s", device.name)
+            self._fingerprints[device.sysfs_path] = self._get_fingerprint(info)
+            self._handle_change_event(Event("change", device.name, info))  # pylint: disable=no-member
+
+        # devices that are new or were removed while handling the changes
+        old_devices = set(udev.device_get_name(info) for info in udev_devices.values()
+                          if self.get_device_by_name(udev.device_get_name(info), hidden=True))
+        self._scan_new_devices(old_devices)
+        probe_cache.save()
+        self._handle_inconsistencies()
+
+    def _get_fingerprint(self, info):
+        """ Return a summary of the udev data of a device that changes with it. """
+        size = util.get_sysfs_attr(udev.device_get_sysfs_path(info), "size")
+        return tuple(info.get(prop) for prop in _FINGERPRINT_PROPERTIES) + (size,)
+
+    def _scan_new_devices(self, old_devices, report=False):
+        """ Handle devices until no new ones appear.
+
+            :param set old_devices: names of the devices that need no scanning
+            :keyword bool report: whether to report the start of the scan
+        """
         n_devices = 0
-        report = True
 
         # Now, loop and scan for devices that have appeared since the two above
         # blocks or since previous iterations.
@@ -473,7 +582,7 @@ class PopulatorMixin(object):
             for new_device in new_devices:
                 new_name = udev.device_get_name(new_device)
                 if new_name not in old_devices:
-                    old_devices[new_name] = new_device
+                    old_devices.add(new_name)
                     n_devices += 1
                     devices.append(new_device)
 
@@ -486,12 +595,118 @@ class PopulatorMixin(object):
                 report = False
 
             log.info("devices to scan: %s", [udev.device_get_name(d) for d in devices])
-            for dev in devices:
-                self.handle_device(dev)
+            self._probe_devices(devices)
+            self._luks_setups = []
+            try:
+                for dev in devices:
+                    self.handle_device(dev)
+            finally:
+                self._probe_results.clear()
+                (luks_setups, self._luks_setups) = (self._luks_setups, None)
 
-        # After having the complete tree we make sure that the system
-        # inconsistencies are ignored or resolved.
-        self._handle_inconsistencies()
+            self._run_luks_setups(luks_setups)
+
+    def _probe_devices(self, devices):
+        """ Run the helpers' probes for the given devices concurrently.
+
+            :param devices: udev data of the devices about to be handled
+            :type devices: list of :class:`pyudev.Device`
+
+            The probes only gather information, so they can run in parallel
+            (see :attr:`~.flags.Flags.populate_workers`). Adding the devices
+            to the tree remains serial and uses the results in the order the
+            devices are handled. Results kept in the persistent probe cache
+            are reused (see :attr:`~.flags.Flags.probe_cache_path`).
+        """
+        if flags.populate_workers <= 1 and not probe_cache.enabled:
+            return
+
+        jobs = [(helper_class, info) for info in devices
+                for helper_class in get_probe_helpers(info)]
+        if not jobs:
+            return
+
+        # udev data is fetched lazily, which must not happen in the workers
+        for (_helper_class, info) in jobs:
+            freeze = getattr(info, "freeze", None)
+            if freeze is not None:
+                freeze()
+
+        log.debug("running %d probes using %d workers", len(jobs), flags.populate_workers)
+        results = run_concurrently(lambda job: probe_cache.probe(*job), jobs,
+                                   flags.populate_workers)
+        for (helper_class, info), result in zip(jobs, results):
+            if result is not None:
+                key = (helper_class, udev.device_get_sysfs_path(info))
+                self._probe_results[key] = result
+
+    def setup_luks_format(self, device, passphrases=None):
+        """ Set up a LUKS format found while handling a device.
+
+            :param device: the device with the LUKS format
+            :type device: :class:`~.devices.StorageDevice`
+            :keyword passphrases: passphrases to try if the format has no key yet
+            :type passphrases: list of str
+
+            While a batch of new devices is being handled, the setup is
+            postponed until the whole batch has been handled (see
+            :meth:`_run_luks_setups`). This is called by the LUKS format
+            populator helper.
+        """
+        if self._luks_setups is not None:
+            self._luks_setups.append((device, passphrases))
+        else:
+            luks_helper.setup_luks_format(device, passphrases)
+
+    def _run_luks_setups(self, setups):
+        """ Set up the LUKS formats found in a batch of new devices concurrently.
+
+            Trying a passphrase takes a key derivation that is expensive in
+            both CPU time and memory, so the number of devices being opened
+            at the same time is limited by the available memory as well as by
+            :attr:`~.flags.Flags.populate_workers`. The mapped devices are
+            found in the next batch.
+
+            Only the attempts to open the formats run in the worker threads,
+            the formats and the remembered passphrases are updated here.
+        """
+        if not setups:
+            return
+
+        n_workers = 1
+        if len(setups) > 1 and flags.populate_workers > 1:
+            n_workers = crypto.calculate_luks_open_workers(flags.populate_workers)
+
+        log.debug("setting up %d LUKS formats using %d workers", len(setups), n_workers)
+        if n_workers == 1:
+            for (device, passphrases) in setups:
+                luks_helper.setup_luks_format(device, passphrases)
+            return
+
+        jobs = []
+        for (device, passphrases) in setups:
+            if device.format.status:
+                passphrases = []
+            else:
+                passphrases = luks_data.sort_passphrases(device.format.uuid, passphrases or [])
+            jobs.append((device.format.device, device.format.map_name, passphrases))
+
+        results = run_concurrently(lambda job: luks_helper.open_luks_format(*job), jobs, n_workers)
+        for ((device, _passphrases), passphrase) in zip(setups, results):
+            if passphrase is not None:
+                device.format.passphrase = passphrase
+                luks_data.remember_passphrase(device.format.uuid, passphrase)
+
+            # formats not opened above get set up with the key they have, if
+            # any, and failures get logged
+            luks_helper.setup_luks_format(device)
+
+    def _pop_probe_result(self, helper_class, info):
+        """ Return (and forget) the probe result for a helper and device. """
+        if not self._probe_results:
+            return None
+        key = (helper_class, udev.device_get_sysfs_path(info))
+        return self._probe_results.pop(key, None)
 
     def drop_device_info_cache(self):
         """ Drop cached device information. """
@@ -502,6 +717,13 @@ class PopulatorMixin(object):
         stratis_info.drop_cache()
 
     def handle_nodev_filesystems(self):
+        """ Add devices for the mounted nodev filesystems.
+
+            Devices added by a previous call are kept for the filesystems
+            that are still mounted and removed for the others, so this also
+            updates a populated tree.
+        """
+        mounted = dict()
         for line in open("/proc/mounts").readlines():
             try:
                 (_devspec, mountpoint, fstype, _options, _rest) = line.split(None, 4)
@@ -512,6 +734,11 @@ class PopulatorMixin(object):
                 if not flags.include_nodev:
                     continue
 
+                n = mounted.get(fstype, 0)
+                mounted[fstype] = n + 1
+                if self.get_device_by_name("%s.%d" % (fstype, n)):
+                    continue
+
                 log.info("found nodev %s filesystem mounted at %s",
                          fstype, mountpoint)
                 # nodev filesystems require some special handling.
@@ -526,6 +753,11 @@ class PopulatorMixin(object):
                 # NoDevice also needs some special works since they don't have
                 # per-instance names in the kernel.
                 device = NoDevice(fmt=fmt)
-                n = len([d for d in self.devices if d.format.type == fstype])
                 device._name += ".%d" % n
                 self._add_device(device)
+
+        for device in [d for d in self.devices if isinstance(d, NoDevice)]:
+            (fstype, _sep, n) = device.name.rpartition(".")
+            if n.isdigit() and int(n) >= mounted.get(fstype, 0):
+                log.info("nodev %s filesystem is no longer mounted", fstype)
+                self._remove_device(device)
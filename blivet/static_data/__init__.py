@@ -1,5 +1,6 @@
-from .lvm_info import lvs_info, pvs_info, vgs_info
+from .lvm_info import lvs_info, pvs_info, vgs_info, drop_vg_cache, get_cache_stats, request_fullreport
 from .luks_data import luks_data
 from .mpath_info import mpath_members
 from .nvdimm import nvdimm
+from .probe_cache import probe_cache
 from .stratis_info import stratis_info
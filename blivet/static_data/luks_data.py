@@ -20,6 +20,12 @@
 # Red Hat Author(s): Jan Pokorny <japokorn@redhat.com>
 #
 
+import hashlib
+import hmac
+import os
+
+import six
+
 
 class LUKS_Data(object):
     """ Class to be used as a singleton.
@@ -37,6 +43,10 @@ class LUKS_Data(object):
         self.__luks_devs = {}
         # default pbkdf parameters for LUKS2 format creation
         self._pbkdf_args = None
+        # {uuid: digest of the passphrase that opened the device}; kept across
+        # resets so that the right passphrase can be tried first next time
+        self._passphrase_hints = {}
+        self._hint_key = os.urandom(32)
 
     @property
     def encryption_passphrase(self):
@@ -90,6 +100,35 @@ class LUKS_Data(object):
             luks_data.luks_devs[device.format.uuid] = passphrase
             self.add_passphrase(passphrase)
 
+    def _passphrase_digest(self, uuid, passphrase):
+        msg = "%s:%s" % (uuid, passphrase)
+        if isinstance(msg, six.text_type):
+            msg = msg.encode("utf-8")
+        return hmac.new(self._hint_key, msg, hashlib.sha256).digest()
+
+    def remember_passphrase(self, uuid, passphrase):
+        """ Remember which passphrase opened the LUKS device with the given UUID.
+
+            Only a keyed digest of the passphrase is kept.
+        """
+        self._passphrase_hints[uuid] = self._passphrase_digest(uuid, passphrase)
+
+    def sort_passphrases(self, uuid, passphrases):
+        """ Return the passphrases to try for the LUKS device with the given UUID.
+
+            Empty and repeated passphrases are left out. The passphrase that
+            opened the device before, if any, comes first.
+        """
+        result = []
+        for passphrase in passphrases:
+            if passphrase and passphrase not in result:
+                result.append(passphrase)
+
+        digest = self._passphrase_hints.get(uuid)
+        if digest:
+            result.sort(key=lambda p: not hmac.compare_digest(self._passphrase_digest(uuid, p), digest))
+        return result
+
     def reset(self, passphrase=None, luks_dict=None):
         self.clear_passphrases()
         self.add_passphrase(passphrase)
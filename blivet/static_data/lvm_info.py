@@ -20,85 +20,399 @@
 # Red Hat Author(s): Jan Pokorny <japokorn@redhat.com>
 #
 
+import json
+
 import gi
 gi.require_version("BlockDev", "2.0")
 
 from gi.repository import BlockDev as blockdev
 
+from .. import util
+
 import logging
 log = logging.getLogger("blivet")
 
 
+class _ReportData(object):
+    """ Information about an LVM object obtained from 'lvm fullreport'.
+
+        Instances provide the same attributes as libblockdev's
+        BDLVMPVdata, BDLVMVGdata and BDLVMLVdata structures.
+    """
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+    def __repr__(self):
+        return "%s(%s)" % (self.__class__.__name__,
+                           ", ".join("%s=%r" % i for i in sorted(self.__dict__.items())))
+
+
+def _int(value):
+    return int(value) if value else 0
+
+
+def _float(value):
+    return float(value) if value else 0.0
+
+
+def _bool(value):
+    # binary fields are reported as "0" and "1" with --binary
+    return value not in ("", "0", None)
+
+
+def _tags(value):
+    return [t for t in value.split(",") if t] if value else []
+
+
+def _vg_data(vg):
+    return _ReportData(name=vg["vg_name"], uuid=vg["vg_uuid"],
+                       size=_int(vg["vg_size"]), free=_int(vg["vg_free"]),
+                       extent_size=_int(vg["vg_extent_size"]),
+                       extent_count=_int(vg["vg_extent_count"]),
+                       free_count=_int(vg["vg_free_count"]),
+                       pv_count=_int(vg["pv_count"]),
+                       exported=_bool(vg["vg_exported"]),
+                       vg_tags=_tags(vg["vg_tags"]))
+
+
+def _pv_data(pv, vg):
+    return _ReportData(pv_name=pv["pv_name"], pv_uuid=pv["pv_uuid"],
+                       pv_free=_int(pv["pv_free"]), pv_size=_int(pv["pv_size"]),
+                       pe_start=_int(pv["pe_start"]),
+                       pv_tags=_tags(pv["pv_tags"]),
+                       missing=_bool(pv["pv_missing"]),
+                       vg_name=vg.name if vg else "", vg_uuid=vg.uuid if vg else "",
+                       vg_size=vg.size if vg else 0, vg_free=vg.free if vg else 0,
+                       vg_extent_size=vg.extent_size if vg else 0,
+                       vg_extent_count=vg.extent_count if vg else 0,
+                       vg_free_count=vg.free_count if vg else 0,
+                       vg_pv_count=vg.pv_count if vg else 0)
+
+
+def _lv_data(lv, vg):
+    return _ReportData(lv_name=lv["lv_name"], vg_name=vg.name, uuid=lv["lv_uuid"],
+                       size=_int(lv["lv_size"]), attr=lv["lv_attr"],
+                       segtype=lv["segtype"], origin=lv["origin"],
+                       pool_lv=lv["pool_lv"], data_lv=lv["data_lv"],
+                       metadata_lv=lv["metadata_lv"], roles=lv["lv_role"],
+                       move_pv=lv["move_pv"],
+                       data_percent=_float(lv["data_percent"]),
+                       metadata_percent=_float(lv["metadata_percent"]),
+                       copy_percent=_float(lv["copy_percent"]),
+                       lv_tags=_tags(lv["lv_tags"]))
+
+
+_FULLREPORT_FIELDS = {"vg": ["vg_name", "vg_uuid", "vg_size", "vg_free", "vg_extent_size",
+                             "vg_extent_count", "vg_free_count", "pv_count", "vg_exported",
+                             "vg_tags"],
+                      "pv": ["pv_name", "pv_uuid", "pv_free", "pv_size", "pe_start", "pv_tags",
+                             "pv_missing"],
+                      "lv": ["lv_name", "lv_uuid", "lv_size", "lv_attr", "segtype", "origin",
+                             "pool_lv", "data_lv", "metadata_lv", "lv_role", "move_pv",
+                             "data_percent", "metadata_percent", "copy_percent", "lv_tags"]}
+
+# set to False once 'lvm fullreport' fails so we don't keep trying
+_fullreport_usable = True
+
+# whether the next cache to be filled should fill all of them using 'lvm fullreport'
+_fullreport_requested = False
+
+
+def _fullreport_argv():
+    # --all includes the internal LVs, like 'lvs -a' run by libblockdev,
+    # with their names in brackets (e.g. "[pool_tdata]")
+    argv = ["lvm", "fullreport", "--all", "--reportformat", "json", "--units", "b", "--nosuffix",
+            "--binary"]
+    for (report, fields) in _FULLREPORT_FIELDS.items():
+        argv.extend(["--configreport", report, "-o", ",".join(fields)])
+
+    # use the same configuration and devices as the libblockdev lvm plugin
+    config = blockdev.lvm.get_global_config()
+    if config and config.strip():
+        argv.extend(["--config", config])
+
+    if hasattr(blockdev.lvm, "get_devices_filter"):
+        devices = blockdev.lvm.get_devices_filter()
+        if devices:
+            argv.append("--devices=%s" % ",".join(devices))
+
+    return argv
+
+
+def _get_fullreport():
+    """ Get information about all PVs, VGs and LVs using a single LVM call.
+
+        :returns: lists of PVs, VGs and LVs or None if the report failed
+        :rtype: tuple of lists or NoneType
+
+        The objects in the lists provide the same attributes as those
+        returned by blockdev.lvm.pvs(), vgs() and lvs().
+    """
+    global _fullreport_usable  # pylint: disable=global-statement
+    if not _fullreport_usable:
+        return None
+
+    try:
+        (ret, out) = util.run_program_and_capture_output(_fullreport_argv())
+        if ret != 0:
+            raise ValueError("lvm fullreport returned %d" % ret)
+
+        pvs = []
+        vgs = []
+        lvs = []
+        for report in json.loads(out)["report"]:
+            vg = _vg_data(report["vg"][0]) if report.get("vg") else None
+            if vg is not None:
+                vgs.append(vg)
+                lvs.extend(_lv_data(lv, vg) for lv in report.get("lv", []))
+            pvs.extend(_pv_data(pv, vg) for pv in report.get("pv", []))
+    except (OSError, ValueError, KeyError, IndexError, TypeError, AttributeError,
+            NotImplementedError, blockdev.LVMError) as e:
+        log.info("failed to get lvm fullreport, falling back to separate reports: %s", e)
+        _fullreport_usable = False
+        return None
+
+    return (pvs, vgs, lvs)
+
+
+def request_fullreport():
+    """ Fill the LVM caches using a single 'lvm fullreport' call.
+
+        The caches are not filled right away but once the first of them is
+        needed. All of the caches that are empty at that point are filled.
+        If the fullreport fails, the caches are filled separately using
+        libblockdev as usual.
+    """
+    global _fullreport_requested  # pylint: disable=global-statement
+    _fullreport_requested = True
+
+
+def _load_caches():
+    """ Fill all empty LVM caches from a single 'lvm fullreport' call if requested.
+
+        :returns: whether the caches were filled
+        :rtype: bool
+    """
+    global _fullreport_requested  # pylint: disable=global-statement
+    if not _fullreport_requested:
+        return False
+
+    _fullreport_requested = False
+    report = _get_fullreport()
+    if report is None:
+        return False
+
+    (pvs, vgs, lvs) = report
+    if pvs_info._pvs_cache is None:
+        pvs_info._set_pvs(pvs)
+    if vgs_info._vgs_cache is None:
+        vgs_info._set_vgs(vgs)
+    if lvs_info._lvs_cache is None:
+        lvs_info._set_lvs(lvs)
+
+    return True
+
+
 class LVsInfo(object):
     """ Class to be used as a singleton.
         Maintains the LVs cache.
+
+        Information about a single VG's LVs can be invalidated using
+        :meth:`drop_vg_cache`. It is then re-read with a report limited to
+        that VG the next time the cache is used.
     """
 
     def __init__(self):
         self._lvs_cache = None
+        self._stale_vgs = set()
+
+        self.hits = 0
+        """ number of times the cache was used without running lvs """
+
+        self.misses = 0
+        """ number of times lvs had to be run """
 
     @property
     def cache(self):
         if self._lvs_cache is None:
+            self.misses += 1
+            if _load_caches():
+                return self._lvs_cache
+
             try:
                 lvs = blockdev.lvm.lvs()
             except NotImplementedError:
                 log.error("libblockdev lvm plugin is missing")
-                self._lvs_cache = dict()
+                self._set_lvs([])
                 return self._lvs_cache
 
-            self._lvs_cache = dict(("%s-%s" % (lv.vg_name, lv.lv_name), lv) for lv in lvs)
+            self._set_lvs(lvs)
+        elif self._stale_vgs:
+            for vg_name in self._stale_vgs:
+                self.misses += 1
+                self._update_vg(vg_name)
+            self._stale_vgs.clear()
+        else:
+            self.hits += 1
 
         return self._lvs_cache
 
+    def _set_lvs(self, lvs):
+        self._stale_vgs.clear()
+        self._lvs_cache = dict(("%s-%s" % (lv.vg_name, lv.lv_name), lv) for lv in lvs)
+
+    def _update_vg(self, vg_name):
+        try:
+            lvs = blockdev.lvm.lvs(vg_name)
+        except blockdev.LVMError as e:
+            # most likely the VG doesn't exist (anymore)
+            log.debug("failed to get information about LVs in %s: %s", vg_name, e)
+            lvs = []
+
+        for key in [k for (k, lv) in self._lvs_cache.items() if lv.vg_name == vg_name]:
+            del self._lvs_cache[key]
+
+        self._lvs_cache.update(("%s-%s" % (lv.vg_name, lv.lv_name), lv) for lv in lvs)
+
+    @property
+    def stats(self):
+        """ Cache hit/miss counters """
+        return {"hits": self.hits, "misses": self.misses}
+
     def drop_cache(self):
         self._lvs_cache = None
 
+    def drop_vg_cache(self, vg_name):
+        """ Drop cached information about the LVs in a single VG.
+
+            :param str vg_name: name of the VG
+        """
+        if self._lvs_cache is not None:
+            self._stale_vgs.add(vg_name)
+
 
 lvs_info = LVsInfo()
 
 
+def _pv_aliases(pv_name):
+    """ Return the names other than pv_name a PV can be looked up by. """
+    # TODO: add get_all_device_symlinks() and resolve_device_symlink() functions to
+    #       libblockdev and use them here
+    if pv_name.startswith("/dev/md/"):
+        try:
+            md_node = blockdev.md.node_from_name(pv_name[len("/dev/md/"):])
+            return ["/dev/" + md_node]
+        except blockdev.MDRaidError:
+            pass
+    elif pv_name.startswith("/dev/md"):
+        try:
+            md_named_dev = blockdev.md.name_from_node(pv_name[len("/dev/"):])
+            return ["/dev/md/" + md_named_dev]
+        except blockdev.MDRaidError:
+            pass
+
+    return []
+
+
 class PVsInfo(object):
     """ Class to be used as a singleton.
         Maintains the PVs cache.
+
+        Information about single PVs (or all PVs of a VG) can be invalidated
+        using :meth:`drop_pv_cache` (:meth:`drop_vg_cache`). It is then re-read
+        for just those PVs the next time the cache is used.
     """
 
     def __init__(self):
         self._pvs_cache = None
+        self._stale_pvs = set()
+
+        self.hits = 0
+        """ number of times the cache was used without running pvs """
+
+        self.misses = 0
+        """ number of times pvs had to be run """
 
     @property
     def cache(self):
         if self._pvs_cache is None:
-            self._pvs_cache = dict()
+            self.misses += 1
+            if _load_caches():
+                return self._pvs_cache
 
             try:
                 pvs = blockdev.lvm.pvs()
             except NotImplementedError:
                 log.error("libblockdev lvm plugin is missing")
+                self._set_pvs([])
                 return self._pvs_cache
 
-            for pv in pvs:
-                self._pvs_cache[pv.pv_name] = pv
-                # TODO: add get_all_device_symlinks() and resolve_device_symlink() functions to
-                #       libblockdev and use them here
-                if pv.pv_name.startswith("/dev/md/"):
-                    try:
-                        md_node = blockdev.md.node_from_name(pv.pv_name[len("/dev/md/"):])
-                        self._pvs_cache["/dev/" + md_node] = pv
-                    except blockdev.MDRaidError:
-                        pass
-                elif pv.pv_name.startswith("/dev/md"):
-                    try:
-                        md_named_dev = blockdev.md.name_from_node(pv.pv_name[len("/dev/"):])
-                        self._pvs_cache["/dev/md/" + md_named_dev] = pv
-                    except blockdev.MDRaidError:
-                        pass
+            self._set_pvs(pvs)
+        elif self._stale_pvs:
+            for path in self._stale_pvs:
+                self.misses += 1
+                self._update_pv(path)
+            self._stale_pvs.clear()
+        else:
+            self.hits += 1
 
         return self._pvs_cache
 
+    def _set_pvs(self, pvs):
+        self._stale_pvs.clear()
+        self._pvs_cache = dict()
+        for pv in pvs:
+            self._add_pv(pv)
+
+    def _add_pv(self, pv):
+        self._pvs_cache[pv.pv_name] = pv
+        for alias in _pv_aliases(pv.pv_name):
+            self._pvs_cache[alias] = pv
+
+    def _update_pv(self, path):
+        old_pv = self._pvs_cache.get(path)
+        if old_pv is not None:
+            for key in [k for (k, pv) in self._pvs_cache.items() if pv is old_pv]:
+                del self._pvs_cache[key]
+
+        try:
+            pv = blockdev.lvm.pvinfo(path)
+        except blockdev.LVMError as e:
+            # most likely not a PV (anymore)
+            log.debug("failed to get information about PV %s: %s", path, e)
+            return
+
+        if pv is not None:
+            self._add_pv(pv)
+            if path not in self._pvs_cache:
+                self._pvs_cache[path] = pv
+
+    @property
+    def stats(self):
+        """ Cache hit/miss counters """
+        return {"hits": self.hits, "misses": self.misses}
+
     def drop_cache(self):
         self._pvs_cache = None
 
+    def drop_pv_cache(self, path):
+        """ Drop cached information about a single PV.
+
+            :param str path: path of the PV
+        """
+        if self._pvs_cache is not None:
+            self._stale_pvs.add(path)
+
+    def drop_vg_cache(self, vg_uuid):
+        """ Drop cached information about the PVs of a single VG.
+
+            :param str vg_uuid: UUID of the VG
+        """
+        if self._pvs_cache is not None and vg_uuid:
+            self._stale_pvs.update(pv.pv_name for pv in self._pvs_cache.values()
+                                   if pv.vg_uuid == vg_uuid)
+
 
 pvs_info = PVsInfo()
 
@@ -106,27 +420,104 @@ pvs_info = PVsInfo()
 class VGsInfo(object):
     """ Class to be used as a singleton.
         Maintains the VGs cache.
+
+        Information about a single VG can be invalidated using
+        :meth:`drop_vg_cache`. It is then re-read for just that VG the next
+        time the cache is used.
     """
 
     def __init__(self):
         self._vgs_cache = None
+        self._stale_vgs = dict()
+
+        self.hits = 0
+        """ number of times the cache was used without running vgs """
+
+        self.misses = 0
+        """ number of times vgs had to be run """
 
     @property
     def cache(self):
         if self._vgs_cache is None:
+            self.misses += 1
+            if _load_caches():
+                return self._vgs_cache
+
             try:
                 vgs = blockdev.lvm.vgs()
             except NotImplementedError:
                 log.error("libblockdev lvm plugin is missing")
-                self._vgs_cache = dict()
+                self._set_vgs([])
                 return self._vgs_cache
 
-            self._vgs_cache = dict(("%s" % (vg.uuid), vg) for vg in vgs)
+            self._set_vgs(vgs)
+        elif self._stale_vgs:
+            for (vg_uuid, vg_name) in self._stale_vgs.items():
+                self.misses += 1
+                self._update_vg(vg_uuid, vg_name)
+            self._stale_vgs.clear()
+        else:
+            self.hits += 1
 
         return self._vgs_cache
 
+    def _set_vgs(self, vgs):
+        self._stale_vgs.clear()
+        self._vgs_cache = dict(("%s" % (vg.uuid), vg) for vg in vgs)
+
+    def _update_vg(self, vg_uuid, vg_name):
+        self._vgs_cache.pop(vg_uuid, None)
+        try:
+            vg = blockdev.lvm.vginfo(vg_name)
+        except blockdev.LVMError as e:
+            # most likely the VG doesn't exist (anymore)
+            log.debug("failed to get information about VG %s: %s", vg_name, e)
+            return
+
+        if vg is not None:
+            self._vgs_cache["%s" % (vg.uuid)] = vg
+
+    @property
+    def stats(self):
+        """ Cache hit/miss counters """
+        return {"hits": self.hits, "misses": self.misses}
+
     def drop_cache(self):
         self._vgs_cache = None
 
+    def drop_vg_cache(self, vg_name, vg_uuid):
+        """ Drop cached information about a single VG.
+
+            :param str vg_name: name of the VG
+            :param str vg_uuid: UUID of the VG
+        """
+        if self._vgs_cache is not None:
+            self._stale_vgs[vg_uuid] = vg_name
+
 
 vgs_info = VGsInfo()
+
+
+def drop_vg_cache(vg_name, vg_uuid):
+    """ Drop all cached information about a single VG, its PVs and LVs.
+
+        :param str vg_name: name of the VG
+        :param str vg_uuid: UUID of the VG
+    """
+    # the LVs of a renamed VG are cached under the name it had when the VG
+    # cache was filled
+    old_vg = vgs_info._vgs_cache.get(vg_uuid) if vgs_info._vgs_cache and vg_uuid else None
+    if old_vg is not None and old_vg.name != vg_name:
+        lvs_info.drop_vg_cache(old_vg.name)
+
+    lvs_info.drop_vg_cache(vg_name)
+    pvs_info.drop_vg_cache(vg_uuid)
+    vgs_info.drop_vg_cache(vg_name, vg_uuid)
+
+
+def get_cache_stats():
+    """ Return the hit/miss counters of the LVM caches.
+
+        :rtype: dict
+    """
+    return {"lvs": lvs_info.stats, "pvs": pvs_info.stats, "vgs": vgs_info.stats}
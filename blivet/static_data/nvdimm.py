@@ -23,7 +23,7 @@ gi.require_version("GLib", "2.0")
 from gi.repository import BlockDev
 from gi.repository import GLib
 
-from .. import util
+from .. import load_plugins, util
 
 import logging
 log = logging.getLogger("blivet")
@@ -33,6 +33,7 @@ class NVDIMMDependencyGuard(util.DependencyGuard):
     error_msg = "libblockdev NVDIMM functionality not available"
 
     def _check_avail(self):
+        load_plugins(["nvdimm"])
         try:
             BlockDev.nvdimm_is_tech_avail(BlockDev.NVDIMMTech.NVDIMM_TECH_NAMESPACE,
                                           BlockDev.NVDIMMTechMode.RECONFIGURE |
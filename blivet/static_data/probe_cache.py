@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+import threading
+
+from .. import udev
+from ..flags import flags
+
+import logging
+log = logging.getLogger("blivet")
+
+CACHE_VERSION = 1
+
+# amount of data read from the start and from the end of a device to detect
+# changes, this covers the metadata of all the formats whose probes are
+# cached, i.e. the MD superblocks (v1.1 at the start, v1.2 at 4 KiB, v1.0 at
+# 8 KiB and v0.90 at 64-128 KiB before the end of the device)
+FINGERPRINT_HEAD_SIZE = 8 * 1024
+FINGERPRINT_TAIL_SIZE = 128 * 1024
+
+
+def device_identity(info):
+    """ Return a string identifying a device across reboots and renames.
+
+        :param info: udev data of the device
+        :type info: :class:`pyudev.Device`
+        :rtype: str
+    """
+    ident = (udev.device_get_wwn(info) or udev.device_get_serial(info) or
+             info.get("DM_UUID") or udev.device_get_sysfs_path(info))
+    part = info.get("ID_PART_ENTRY_UUID") or info.get("ID_PART_ENTRY_NUMBER")
+    if part:
+        ident = "%s/%s" % (ident, part)
+    return ident
+
+
+def device_fingerprint(path):
+    """ Return a checksum of the device's size and of the data at its ends.
+
+        :param str path: path to the device node
+        :returns: the checksum or None if the device cannot be read
+        :rtype: str or NoneType
+    """
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            checksum = hashlib.sha1(str(size).encode("ascii"))
+            f.seek(0)
+            checksum.update(f.read(FINGERPRINT_HEAD_SIZE))
+            f.seek(max(size - FINGERPRINT_TAIL_SIZE, 0))
+            checksum.update(f.read(FINGERPRINT_TAIL_SIZE))
+    except (IOError, OSError) as e:
+        log.debug("probe cache: failed to read %s: %s", path, e)
+        return None
+
+    return checksum.hexdigest()
+
+
+class ProbeCache(object):
+    """ Class to be used as a singleton.
+        Keeps the results of :meth:`~.populator.helpers.PopulatorHelper.probe`
+        in the file :attr:`~.flags.Flags.probe_cache_path` across runs.
+
+        Only the helpers with :attr:`probe_cacheable` set take part, which
+        currently means only the MD member examination. A result is reused if
+        the device has the same identity (WWN, serial or path), size and data
+        at both its ends as when the result was stored. Only the entries used
+        since the last :meth:`reset` are saved.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._path = None
+        self._entries = {}
+        self._used = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return bool(flags.probe_cache_path)
+
+    def _load(self):
+        """ Load the cache file if it was not loaded yet. """
+        path = flags.probe_cache_path
+        if path == self._path:
+            return
+
+        self._path = path
+        self._entries = {}
+        self._used = {}
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError) as e:
+            log.debug("probe cache: failed to load %s: %s", path, e)
+            return
+
+        if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+            log.debug("probe cache: ignoring %s with unsupported format", path)
+            return
+
+        self._entries = data.get("entries", {})
+
+    def reset(self):
+        """ Forget which entries have been used, e.g. before a full scan. """
+        with self._lock:
+            self._load()
+            self._used = {}
+
+    def probe(self, helper_class, info):
+        """ Return the helper's probe result for a device, from the cache if possible.
+
+            :param helper_class: the populator helper class
+            :param info: udev data of the device
+            :type info: :class:`pyudev.Device`
+        """
+        if not (self.enabled and getattr(helper_class, "probe_cacheable", False)):
+            return helper_class.probe(info)
+
+        path = udev.device_get_devname(info)
+        fingerprint = device_fingerprint(path) if path else None
+        if fingerprint is None:
+            return helper_class.probe(info)
+
+        key = "%s:%s" % (helper_class.__name__, device_identity(info))
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            if entry and entry.get("fingerprint") == fingerprint:
+                self.hits += 1
+                self._used[key] = entry
+                return entry["result"]
+
+        result = helper_class.probe(info)
+        with self._lock:
+            self.misses += 1
+            if result is not None:
+                entry = {"fingerprint": fingerprint, "result": result}
+                self._entries[key] = entry
+                self._used[key] = entry
+
+        return result
+
+    def save(self):
+        """ Write the entries used since the last reset to the cache file. """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._load()
+            data = {"version": CACHE_VERSION, "entries": self._used}
+            tmp_path = "%s.%d.tmp" % (self._path, os.getpid())
+            try:
+                with open(tmp_path, "w") as f:
+                    json.dump(data, f)
+                os.rename(tmp_path, self._path)
+            except (IOError, OSError, TypeError, ValueError) as e:
+                log.warning("probe cache: failed to save %s: %s", self._path, e)
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+            else:
+                self._entries = dict(self._used)
+
+            log.debug("probe cache: %d hits, %d misses, %d entries saved",
+                      self.hits, self.misses, len(self._used))
+            self.hits = 0
+            self.misses = 0
+
+
+probe_cache = ProbeCache()
@@ -28,6 +28,12 @@ from collections import namedtuple
 from .. import safe_dbus
 from ..size import Size
 
+import gi
+gi.require_version("GLib", "2.0")
+gi.require_version("Gio", "2.0")
+
+from gi.repository import GLib, Gio
+
 import logging
 log = logging.getLogger("blivet")
 
@@ -40,6 +46,9 @@ STRATIS_FILESYSTEM_INTF = STRATIS_SERVICE + ".filesystem.r0"
 STRATIS_BLOCKDEV_INTF = STRATIS_SERVICE + ".blockdev.r0"
 STRATIS_MANAGER_INTF = STRATIS_SERVICE + ".Manager.r0"
 
+OBJECT_MANAGER_INTF = "org.freedesktop.DBus.ObjectManager"
+PROPERTIES_INTF = "org.freedesktop.DBus.Properties"
+
 
 StratisPoolInfo = namedtuple("StratisPoolInfo", ["name", "uuid", "physical_size", "physical_used", "object_path", "encrypted"])
 StratisFilesystemInfo = namedtuple("StratisFilesystemInfo", ["name", "uuid", "used_size", "pool_name",
@@ -51,24 +60,38 @@ StratisLockedPoolInfo = namedtuple("StratisLockedPoolInfo", ["uuid", "key_desc",
 class StratisInfo(object):
     """ Class to be used as a singleton.
         Maintains the Stratis devices info cache.
+
+        The cache is filled from a single GetManagedObjects call. Once it is
+        filled, the InterfacesAdded, InterfacesRemoved and PropertiesChanged
+        signals of the Stratis objects are used to keep it up to date.
     """
 
     def __init__(self):
         self._info_cache = None
+        self._objects = None
+        self._locked_pools = None
+
+        self._watch_context = None
+        self._watch_connection = None
 
-    def _get_pool_info(self, pool_path):
+    @staticmethod
+    def _get_properties(path, interface):
+        properties = None
         try:
             properties = safe_dbus.get_properties_sync(STRATIS_SERVICE,
-                                                       pool_path,
-                                                       STRATIS_POOL_INTF)[0]
+                                                       path,
+                                                       interface)[0]
         except safe_dbus.DBusPropertyError as e:
             log.error("Error when getting DBus properties of '%s': %s",
-                      pool_path, str(e))
+                      path, str(e))
 
         if not properties:
-            log.error("Failed to get DBus properties of '%s'", pool_path)
+            log.error("Failed to get DBus properties of '%s'", path)
             return None
 
+        return properties
+
+    def _pool_info_from_properties(self, pool_path, properties):
         pool_size = properties.get("TotalPhysicalSize", 0)
 
         valid, pool_used = properties.get("TotalPhysicalUsed",
@@ -82,20 +105,21 @@ class StratisInfo(object):
                                physical_size=Size(pool_size), physical_used=Size(pool_used),
                                object_path=pool_path, encrypted=properties["Encrypted"])
 
-    def _get_filesystem_info(self, filesystem_path):
-        try:
-            properties = safe_dbus.get_properties_sync(STRATIS_SERVICE,
-                                                       filesystem_path,
-                                                       STRATIS_FILESYSTEM_INTF)[0]
-        except safe_dbus.DBusPropertyError as e:
-            log.error("Error when getting DBus properties of '%s': %s",
-                      filesystem_path, str(e))
+    def _get_pool_info(self, pool_path, pools=None):
+        """ Return info about the pool, from pools (a dict of the already known
+            pools by object path) if possible.
+        """
+        if pools and pool_path in pools:
+            return pools[pool_path]
 
+        properties = self._get_properties(pool_path, STRATIS_POOL_INTF)
         if not properties:
-            log.error("Failed to get DBus properties of '%s'", filesystem_path)
             return None
 
-        pool_info = self._get_pool_info(properties["Pool"])
+        return self._pool_info_from_properties(pool_path, properties)
+
+    def _filesystem_info_from_properties(self, filesystem_path, properties, pools=None):
+        pool_info = self._get_pool_info(properties["Pool"], pools)
         if not pool_info:
             return None
 
@@ -111,36 +135,36 @@ class StratisInfo(object):
                                      pool_name=pool_info.name, pool_uuid=pool_info.uuid,
                                      object_path=filesystem_path)
 
-    def _get_blockdev_info(self, blockdev_path):
-        try:
-            properties = safe_dbus.get_properties_sync(STRATIS_SERVICE,
-                                                       blockdev_path,
-                                                       STRATIS_BLOCKDEV_INTF)[0]
-        except safe_dbus.DBusPropertyError as e:
-            log.error("Error when getting DBus properties of '%s': %s",
-                      blockdev_path, str(e))
-
+    def _get_filesystem_info(self, filesystem_path, pools=None):
+        properties = self._get_properties(filesystem_path, STRATIS_FILESYSTEM_INTF)
         if not properties:
-            log.error("Failed to get DBus properties of '%s'", blockdev_path)
             return None
 
+        return self._filesystem_info_from_properties(filesystem_path, properties, pools)
+
+    def _blockdev_info_from_properties(self, blockdev_path, properties, pools=None):
         blockdev_uuid = str(uuid.UUID(properties["Uuid"]))
 
         pool_path = properties["Pool"]
         if pool_path == "/":
-            pool_name = ""
             return StratisBlockdevInfo(path=properties["Devnode"], uuid=blockdev_uuid,
                                        pool_name="", pool_uuid="", object_path=blockdev_path)
         else:
-            pool_info = self._get_pool_info(properties["Pool"])
+            pool_info = self._get_pool_info(pool_path, pools)
             if not pool_info:
                 return None
-            pool_name = pool_info.name
 
             return StratisBlockdevInfo(path=properties["Devnode"], uuid=blockdev_uuid,
-                                       pool_name=pool_name, pool_uuid=pool_info.uuid,
+                                       pool_name=pool_info.name, pool_uuid=pool_info.uuid,
                                        object_path=blockdev_path)
 
+    def _get_blockdev_info(self, blockdev_path, pools=None):
+        properties = self._get_properties(blockdev_path, STRATIS_BLOCKDEV_INTF)
+        if not properties:
+            return None
+
+        return self._blockdev_info_from_properties(blockdev_path, properties, pools)
+
     def _get_locked_pools_info(self):
         locked_pools = []
 
@@ -165,6 +189,63 @@ class StratisInfo(object):
 
         return locked_pools
 
+    def _parse_object(self, path, interface, properties, pools=None):
+        if interface == STRATIS_POOL_INTF:
+            return self._pool_info_from_properties(path, properties)
+        elif interface == STRATIS_FILESYSTEM_INTF:
+            return self._filesystem_info_from_properties(path, properties, pools)
+        else:
+            return self._blockdev_info_from_properties(path, properties, pools)
+
+    def _object_info(self, path, interface, pools=None):
+        """ Return info about the object from its known properties.
+
+            If the properties are incomplete, they are requested again.
+        """
+        try:
+            return self._parse_object(path, interface, self._objects[path][interface], pools)
+        except KeyError as e:
+            log.debug("Incomplete DBus properties of '%s' (missing %s), getting them again", path, e)
+
+        properties = self._get_properties(path, interface)
+        if not properties:
+            return None
+
+        self._objects[path][interface] = properties
+        return self._parse_object(path, interface, properties, pools)
+
+    def _update_info_cache(self):
+        """ Update the info cache from the known Stratis objects. """
+        info_cache = dict()
+        info_cache["pools"] = dict()
+        info_cache["blockdevs"] = dict()
+        info_cache["filesystems"] = dict()
+
+        pools = dict()
+        for path, interfaces in self._objects.items():
+            if STRATIS_POOL_INTF in interfaces:
+                pool_info = self._object_info(path, STRATIS_POOL_INTF)
+                if pool_info:
+                    info_cache["pools"][pool_info.uuid] = pool_info
+                    pools[path] = pool_info
+
+        for path, interfaces in self._objects.items():
+            if STRATIS_FILESYSTEM_INTF in interfaces:
+                fs_info = self._object_info(path, STRATIS_FILESYSTEM_INTF, pools)
+                if fs_info:
+                    info_cache["filesystems"][fs_info.uuid] = fs_info
+
+            if STRATIS_BLOCKDEV_INTF in interfaces:
+                bd_info = self._object_info(path, STRATIS_BLOCKDEV_INTF, pools)
+                if bd_info:
+                    info_cache["blockdevs"][bd_info.uuid] = bd_info
+
+        if self._locked_pools is None:
+            self._locked_pools = self._get_locked_pools_info()
+        info_cache["locked_pools"] = self._locked_pools
+
+        self._info_cache = info_cache
+
     def _get_stratis_info(self):
         self._info_cache = dict()
         self._info_cache["pools"] = dict()
@@ -181,60 +262,202 @@ class StratisInfo(object):
             if not ret:
                 log.warning("Stratis DBus service is not available")
 
-        objects = safe_dbus.call_sync(STRATIS_SERVICE,
-                                      STRATIS_PATH,
-                                      "org.freedesktop.DBus.ObjectManager",
-                                      "GetManagedObjects",
-                                      None)[0]
+        # watch for changes first so that none made after the call is missed
+        self._watch()
 
-        for path, interfaces in objects.items():
-            if STRATIS_POOL_INTF in interfaces.keys():
-                pool_info = self._get_pool_info(path)
-                if pool_info:
-                    self._info_cache["pools"][pool_info.uuid] = pool_info
+        self._objects = safe_dbus.call_sync(STRATIS_SERVICE,
+                                            STRATIS_PATH,
+                                            OBJECT_MANAGER_INTF,
+                                            "GetManagedObjects",
+                                            None)[0]
+        self._locked_pools = None
+        self._update_info_cache()
 
-            if STRATIS_FILESYSTEM_INTF in interfaces.keys():
-                fs_info = self._get_filesystem_info(path)
-                if fs_info:
-                    self._info_cache["filesystems"][fs_info.uuid] = fs_info
+    def _watch(self):
+        """ Subscribe to the signals about changes of the Stratis objects. """
+        if self._watch_connection is not None:
+            return
 
-            if STRATIS_BLOCKDEV_INTF in interfaces.keys():
-                bd_info = self._get_blockdev_info(path)
-                if bd_info:
-                    self._info_cache["blockdevs"][bd_info.uuid] = bd_info
+        context = GLib.MainContext.new()
+        context.push_thread_default()
+        try:
+            connection = safe_dbus.get_new_system_connection()
+            for (interface, member, path) in ((OBJECT_MANAGER_INTF, "InterfacesAdded", STRATIS_PATH),
+                                              (OBJECT_MANAGER_INTF, "InterfacesRemoved", STRATIS_PATH),
+                                              (PROPERTIES_INTF, "PropertiesChanged", None)):
+                connection.signal_subscribe(STRATIS_SERVICE, interface, member, path, None,
+                                            Gio.DBusSignalFlags.NONE, self._on_signal, None)
+        except (GLib.GError, safe_dbus.DBusCallError) as e:
+            log.debug("Failed to watch for changes of Stratis objects: %s", str(e))
+            return
+        finally:
+            context.pop_thread_default()
 
-        self._info_cache["locked_pools"] = self._get_locked_pools_info()
+        self._watch_context = context
+        self._watch_connection = connection
+
+    def _on_signal(self, _connection, _sender, object_path, _interface, signal, parameters, _data):
+        if self._objects is None:
+            # the cache is going to be filled from scratch anyway
+            return
+
+        args = parameters.unpack()
+        if signal == "InterfacesAdded":
+            (path, interfaces) = args
+            self.interfaces_added(path, interfaces)
+        elif signal == "InterfacesRemoved":
+            (path, interfaces) = args
+            self.interfaces_removed(path, interfaces)
+        elif signal == "PropertiesChanged":
+            (interface, changed, invalidated) = args
+            self.properties_changed(object_path, interface, changed, invalidated)
+
+    def interfaces_added(self, path, interfaces):
+        """ Add a new object or new interfaces of an object to the cache.
+
+            :param str path: object path
+            :param dict interfaces: properties of the added interfaces by interface name
+        """
+        if self._objects is None:
+            return
+
+        self._objects.setdefault(path, dict()).update(interfaces)
+        if STRATIS_POOL_INTF in interfaces:
+            # a pool might have been unlocked
+            self._locked_pools = None
+        self._info_cache = None
+
+    def interfaces_removed(self, path, interfaces):
+        """ Remove interfaces of an object from the cache.
+
+            :param str path: object path
+            :param list interfaces: names of the removed interfaces
+        """
+        if self._objects is None:
+            # the cache was filled without stratisd's objects (e.g. while the
+            # service was not running), it has to be filled from scratch
+            self.drop_cache()
+            return
+
+        if path not in self._objects:
+            return
+
+        for interface in interfaces:
+            self._objects[path].pop(interface, None)
+        if not self._objects[path]:
+            del self._objects[path]
+        if STRATIS_POOL_INTF in interfaces:
+            self._locked_pools = None
+        self._info_cache = None
+
+    def properties_changed(self, path, interface, changed, invalidated):
+        """ Update the cached properties of an object.
+
+            :param str path: object path
+            :param str interface: interface the properties belong to
+            :param dict changed: new values of the changed properties
+            :param list invalidated: names of the properties with unknown new values
+        """
+        if self._objects is None or interface not in self._objects.get(path, {}):
+            return
+
+        properties = self._objects[path][interface]
+        properties.update(changed)
+        for name in invalidated:
+            # _object_info gets all the properties again if they are needed
+            properties.pop(name, None)
+        self._info_cache = None
+
+    def _dispatch_signals(self):
+        """ Apply the changes announced by the signals received so far. """
+        if self._watch_context is None:
+            return
+
+        while self._watch_context.pending():
+            self._watch_context.iteration(False)
+
+    def _get_info_cache(self):
+        if self._objects is not None:
+            self._dispatch_signals()
 
-    @property
-    def pools(self):
         if self._info_cache is None:
-            self._get_stratis_info()
+            if self._objects is None:
+                self._get_stratis_info()
+            else:
+                self._update_info_cache()
+
+        return self._info_cache
+
+    def refresh(self, pools=None, filesystems=None):
+        """ Make sure the cache reflects the current state.
+
+            :keyword pools: UUIDs of pools that are expected to exist
+            :type pools: list of str
+            :keyword filesystems: UUIDs of filesystems that are expected to exist
+            :type filesystems: list of str
+
+            Without the signals to rely on, the cache is just dropped.
+            Otherwise only the signals received so far are applied, so changes
+            made outside of blivet whose signals have not arrived yet are
+            not seen. If any of the expected pools or filesystems is missing
+            after that, the cache is dropped to get them from stratisd.
+        """
+        if self._watch_connection is None:
+            self.drop_cache()
+            return
 
-        return self._info_cache["pools"]
+        self._dispatch_signals()
+        if self._objects is None:
+            self.drop_cache()
+            return
+
+        if any(uuid not in self.pools for uuid in pools or []) or \
+           any(uuid not in self.filesystems for uuid in filesystems or []):
+            log.debug("Stratis objects missing from the cache, getting them again")
+            self.drop_cache()
+
+    def update_objects(self, objects):
+        """ Get the current properties of the given objects.
+
+            :param objects: object paths and interfaces of the objects
+            :type objects: list of (str, str)
+
+            This is meant to be used for objects created or changed by blivet,
+            which need to be known right away, even if the signals about them
+            have not arrived yet.
+        """
+        if self._objects is None:
+            # see interfaces_removed
+            self.drop_cache()
+            return
+
+        for (path, interface) in objects:
+            properties = self._get_properties(path, interface)
+            if properties is not None:
+                self.interfaces_added(path, {interface: properties})
 
     @property
-    def filesystems(self):
-        if self._info_cache is None:
-            self._get_stratis_info()
+    def pools(self):
+        return self._get_info_cache()["pools"]
 
-        return self._info_cache["filesystems"]
+    @property
+    def filesystems(self):
+        return self._get_info_cache()["filesystems"]
 
     @property
     def blockdevs(self):
-        if self._info_cache is None:
-            self._get_stratis_info()
-
-        return self._info_cache["blockdevs"]
+        return self._get_info_cache()["blockdevs"]
 
     @property
     def locked_pools(self):
-        if self._info_cache is None:
-            self._get_stratis_info()
-
-        return self._info_cache["locked_pools"]
+        return self._get_info_cache()["locked_pools"]
 
     def drop_cache(self):
         self._info_cache = None
+        self._objects = None
+        self._locked_pools = None
+        # discard the signals about the changes the next full update includes
+        self._dispatch_signals()
 
     def get_pool_info(self, pool_name):
         for pool in self.pools.values():
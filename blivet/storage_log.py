@@ -1,4 +1,4 @@
-import inspect
+import itertools
 import logging
 import sys
 import traceback
@@ -8,23 +8,83 @@ from .flags import flags
 log = logging.getLogger("blivet")
 log.addHandler(logging.NullHandler())
 
+_IGNORED_FUNCS = frozenset(["function_name_and_depth",
+                            "_caller_frame",
+                            "log_method_call",
+                            "log_method_return"])
+
+_call_counter = itertools.count()
+
+# code objects of the sampled method calls whose return is yet to be logged,
+# by the id of the calling frame
+_sampled_calls = dict()
+
 
 def function_name_and_depth():
-    IGNORED_FUNCS = ["function_name_and_depth",
-                     "log_method_call",
-                     "log_method_return"]
-    stack = inspect.stack()
+    # walk the frame objects directly, inspect.stack() reads source context
+    # for every frame on the stack
+    frame = sys._getframe(1)  # pylint: disable=protected-access
+    while frame is not None and frame.f_code.co_name in _IGNORED_FUNCS:
+        frame = frame.f_back
+
+    if frame is None:
+        return ("unknown function?", 0)
+
+    methodname = frame.f_code.co_name
+    depth = 0
+    while frame is not None:
+        depth += 1
+        frame = frame.f_back
+
+    return (methodname, depth)
 
-    for i, frame in enumerate(stack):
-        methodname = frame[3]
-        if methodname not in IGNORED_FUNCS:
-            return (methodname, len(stack) - i)
 
-    return ("unknown function?", 0)
+def _caller_frame():
+    frame = sys._getframe(1)  # pylint: disable=protected-access
+    while frame is not None and frame.f_code.co_name in _IGNORED_FUNCS:
+        frame = frame.f_back
+    return frame
+
+
+def _should_log():
+    """ Should method calls and returns be logged at all?
+
+        Nothing is logged unless :attr:`~.flags.Flags.debug` is set and the
+        logger emits debug messages.
+    """
+    return flags.debug and log.isEnabledFor(logging.DEBUG)
+
+
+def _sample_call(frame):
+    """ Should the method call made from the given frame be logged?
+
+        Only one in :attr:`~.flags.Flags.debug_sample_rate` calls is logged.
+        The decision is remembered for the frame so that the return of the
+        same call is logged if and only if the call was.
+    """
+    rate = flags.debug_sample_rate
+    if rate <= 1 or frame is None:
+        return True
+
+    if next(_call_counter) % rate == 0:
+        _sampled_calls[id(frame)] = frame.f_code
+        return True
+
+    _sampled_calls.pop(id(frame), None)
+    return False
+
+
+def _sample_return(frame):
+    """ Should the method return made from the given frame be logged? """
+    rate = flags.debug_sample_rate
+    if rate <= 1 or frame is None:
+        return True
+
+    return _sampled_calls.pop(id(frame), None) is frame.f_code
 
 
 def log_method_call(d, *args, **kwargs):
-    if not flags.debug:
+    if not _should_log() or not _sample_call(_caller_frame()):
         return
 
     classname = d.__class__.__name__
@@ -47,6 +107,9 @@ def log_method_call(d, *args, **kwargs):
 
 
 def log_method_return(d, retval):
+    if not _should_log() or not _sample_return(_caller_frame()):
+        return
+
     classname = d.__class__.__name__
     (methodname, depth) = function_name_and_depth()
     spaces = depth * ' '
@@ -20,12 +20,18 @@
 # Red Hat Author(s): Anne Mulhern <amulhern@redhat.com>
 
 import abc
+import json
+import os
 import shutil
+import threading
+from contextlib import contextmanager
 
 from six import add_metaclass
 
-from .. import safe_dbus
+from .. import load_plugins, safe_dbus
 from ..devicelibs.stratis import STRATIS_SERVICE, STRATIS_PATH
+from ..flags import flags
+from ..threads import run_concurrently
 
 import gi
 gi.require_version("BlockDev", "2.0")
@@ -40,6 +46,148 @@ log = logging.getLogger("blivet")
 
 CACHE_AVAILABILITY = True
 
+# number of threads used by prefetch_availability
+PREFETCH_WORKERS = 8
+
+VERSION_CACHE_FORMAT = 1
+
+
+class _VersionCache(object):
+
+    """ Results of application version checks kept in a file across processes.
+
+        See :attr:`~.flags.Flags.availability_cache_path`. The results are
+        keyed by the application's path and the version requirement, and
+        are only valid as long as the application's inode, size and mtime
+        don't change. The file is not used if :const:`CACHE_AVAILABILITY`
+        is False.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._path = None
+        self._entries = {}
+        self._dirty = set()
+        self._defer_save = 0
+
+    @staticmethod
+    def _enabled():
+        return CACHE_AVAILABILITY and bool(flags.availability_cache_path)
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError) as e:
+            log.debug("availability cache: failed to load %s: %s", path, e)
+            return {}
+
+        if isinstance(data, dict) and data.get("version") == VERSION_CACHE_FORMAT:
+            return data.get("entries", {})
+
+        return {}
+
+    def _load(self):
+        path = flags.availability_cache_path
+        if path == self._path:
+            return
+
+        self._path = path
+        self._entries = self._read(path)
+        self._dirty = set()
+
+    def _save(self):
+        if not self._dirty:
+            return
+
+        # other processes may have saved their results since the file was
+        # read, keep them unless this process has a newer one
+        entries = self._read(self._path)
+        entries.update((key, self._entries[key]) for key in self._dirty)
+        self._entries = entries
+        self._dirty = set()
+
+        data = {"version": VERSION_CACHE_FORMAT, "entries": entries}
+        tmp_path = "%s.%d.tmp" % (self._path, os.getpid())
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.rename(tmp_path, self._path)
+        except (IOError, OSError) as e:
+            log.warning("availability cache: failed to save %s: %s", self._path, e)
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _key(version_info):
+        """ Return the cache key and the application's stat info or None. """
+        path = shutil.which(version_info.app_name)
+        if not path:
+            return (None, None)
+
+        try:
+            st = os.stat(path)
+        except OSError:
+            return (None, None)
+
+        key = "%s:%s:%s:%s" % (path, version_info.required_version,
+                               version_info.version_opt, version_info.version_regex)
+        return (key, [st.st_ino, st.st_size, st.st_mtime])
+
+    def get(self, version_info):
+        """ Return the cached errors of the version check or None. """
+        if not self._enabled():
+            return None
+
+        (key, stat) = self._key(version_info)
+        if key is None:
+            return None
+
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+
+        if entry and entry.get("stat") == stat:
+            return entry["errors"][:]
+
+        return None
+
+    def set(self, version_info, errors):
+        """ Store the errors of the version check and save the cache. """
+        if not self._enabled():
+            return
+
+        (key, stat) = self._key(version_info)
+        if key is None:
+            return
+
+        with self._lock:
+            self._load()
+            self._entries[key] = {"stat": stat, "errors": errors[:]}
+            self._dirty.add(key)
+            if not self._defer_save:
+                self._save()
+
+    @contextmanager
+    def save_deferred(self):
+        """ Save the results stored within the block only once it is left. """
+        with self._lock:
+            self._defer_save += 1
+
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._defer_save -= 1
+                if not self._defer_save and self._path is not None:
+                    self._save()
+
+
+_version_cache = _VersionCache()
+
 
 class ExternalResource(object):
 
@@ -166,16 +314,28 @@ class VersionMethod(Method):
         """
         self.version_info = version_info
         self._availability_errors = None
+        self._lock = threading.Lock()
 
     def availability_errors(self, resource):
-        if self._availability_errors is not None and CACHE_AVAILABILITY:
-            return self._availability_errors[:]
+        with self._lock:
+            if self._availability_errors is not None and CACHE_AVAILABILITY:
+                return self._availability_errors[:]
+
+            errors = Path.availability_errors(resource)
+
+            if self.version_info.required_version is not None:
+                errors.extend(self._version_errors())
 
-        self._availability_errors = Path.availability_errors(resource)
+            self._availability_errors = errors
+            return errors[:]
 
-        if self.version_info.required_version is None:
-            return self._availability_errors[:]
+    def _version_errors(self):
+        """ Check the version of the application, running it if necessary. """
+        errors = _version_cache.get(self.version_info)
+        if errors is not None:
+            return errors
 
+        errors = []
         try:
             ret = blockdev.utils.check_util_version(self.version_info.app_name,
                                                     self.version_info.required_version,
@@ -185,12 +345,13 @@ class VersionMethod(Method):
                 err = "installed version of %s is less than " \
                       "required version %s" % (self.version_info.app_name,
                                                self.version_info.required_version)
-                self._availability_errors.append(err)
+                errors.append(err)
         except blockdev.UtilsError as e:
             err = "failed to get installed version of %s: %s" % (self.version_info.app_name, e)
-            self._availability_errors.append(err)
+            errors.append(err)
 
-        return self._availability_errors[:]
+        _version_cache.set(self.version_info, errors)
+        return errors
 
 
 class BlockDevTechInfo(object):
@@ -240,6 +401,7 @@ class BlockDevMethod(Method):
             :returns: [] if the name of the plugin is loaded
             :rtype: list of str
         """
+        load_plugins([self._tech_info.plugin_name])
         if self._tech_info.plugin_name not in blockdev.get_available_plugin_names():  # pylint: disable=no-value-for-parameter
             return ["libblockdev plugin %s not loaded" % self._tech_info.plugin_name]
         else:
@@ -349,6 +511,28 @@ def available_resource(name):
     return ExternalResource(AvailableMethod, name)
 
 
+def prefetch_availability(resources=None, max_workers=PREFETCH_WORKERS):
+    """ Check the availability of external resources concurrently.
+
+        :param resources: the resources to check, all the resources defined
+                          in this module by default
+        :type resources: list of :class:`ExternalResource` or NoneType
+        :param int max_workers: maximum number of concurrent checks
+
+        This is meant to be called once at startup, so that checking the
+        availability later on doesn't have to wait for the applications to
+        run one after another.
+    """
+    if resources is None:
+        resources = [r for r in globals().values() if isinstance(r, ExternalResource)]
+
+    # resources may appear in the list more than once
+    resources = list(dict((id(r), r) for r in resources).values())
+    # the results of the version checks are saved all at once
+    with _version_cache.save_deferred():
+        run_concurrently(lambda r: r.availability_errors, resources, max_workers)
+
+
 # libblockdev btrfs plugin required technologies and modes
 BLOCKDEV_BTRFS_ALL_MODES = (blockdev.BtrfsTechMode.CREATE |
                             blockdev.BtrfsTechMode.DELETE |
@@ -23,8 +23,10 @@
 import threading
 from types import FunctionType
 from abc import ABCMeta
-from six import raise_from, wraps, PY3
+from six import raise_from, wraps, PY3, reraise
+from six.moves import queue
 import functools
+import sys
 
 from .errors import ThreadError
 from .flags import flags
@@ -86,6 +88,63 @@ class SynchronizedABCMeta(SynchronizedMeta, ABCMeta):
     pass
 
 
+def run_concurrently(func, items, max_workers):
+    """ Call func for each item using a bounded number of worker threads.
+
+        :param callable func: function taking a single item
+        :param items: the items to process
+        :type items: iterable
+        :param int max_workers: maximum number of concurrent calls
+        :returns: the return values of func, in the order of items
+        :rtype: list
+
+        If any of the calls raises an exception, the first such exception
+        (in the order of items) is re-raised once all calls have finished.
+
+        .. note::
+
+            The calls run in separate threads while the calling thread,
+            which may well hold :data:`blivet_lock`, waits for them. func must
+            not call anything that needs the lock.
+    """
+    items = list(items)
+    results = [None] * len(items)
+    errors = [None] * len(items)
+    n_workers = min(max_workers, len(items))
+    if n_workers <= 1:
+        return [func(item) for item in items]
+
+    work = queue.Queue()
+    for idx in range(len(items)):
+        work.put(idx)
+
+    def worker():
+        while True:
+            try:
+                idx = work.get_nowait()
+            except queue.Empty:
+                return
+
+            try:
+                results[idx] = func(items[idx])
+            except Exception:  # pylint: disable=broad-except
+                errors[idx] = sys.exc_info()
+
+    workers = [threading.Thread(target=worker, name="worker%d" % i) for i in range(n_workers)]
+    for t in workers:
+        t.daemon = True  # py2 compat
+        t.start()
+
+    for t in workers:
+        t.join()
+
+    for exc_info in errors:
+        if exc_info is not None:
+            reraise(*exc_info)
+
+    return results
+
+
 #
 # Facilities for storing/retrieving information about an unhandled exception in a thread.
 #
@@ -26,68 +26,138 @@ class CyclicGraphError(Exception):
 
 
 def tsort(graph):
+    """ Sort the items of a graph created by :func:`create_graph`.
+
+        This is Kahn's algorithm using the graph's adjacency lists. Root nodes
+        are kept on a stack and a node's children are visited in the order of
+        its outgoing edges, so the result only depends on the order of the
+        items and edges.
+
+        If the graph has ranks, every ranked item implicitly precedes all
+        ranked items of a lower rank. Those edges are never materialized: an
+        item becomes available once no unsorted item of a higher rank is left.
+        Children of a node are visited in item order in that case, which is
+        what you get from an explicit edge list ordered by child position.
+    """
     order = []  # sorted list of items
 
     if not graph or not graph['items']:
         return order
 
+    items = graph['items']
+    children = graph['children']
+    ranks = graph['ranks']
+    incoming = dict(graph['incoming'])
+
+    # number of unsorted items of each rank
+    remaining = dict()
+    for rank in ranks.values():
+        remaining[rank] = remaining.get(rank, 0) + 1
+
+    top = max(remaining) if remaining else None
+
+    def is_free(item):
+        rank = ranks.get(item)
+        return rank is None or rank == top
+
     # determine which nodes have no incoming edges
-    roots = [n for n in graph['items'] if graph['incoming'][n] == 0]
+    roots = [n for n in items if incoming[n] == 0 and is_free(n)]
     if not roots:
         raise CyclicGraphError("no root nodes")
 
-    visited = []    # list of nodes visited, for cycle detection
+    position = dict((item, idx) for (idx, item) in enumerate(items)) if ranks else None
+    visited = set()     # nodes visited, for cycle detection
     while roots:
         # remove a root, add it to the order
         root = roots.pop()
         if root in visited:
             raise CyclicGraphError("graph contains cycles")
 
-        visited.append(root)
+        visited.add(root)
         order.append(root)
-        # remove each edge from the root to another node
-        for (parent, child) in [e for e in graph['edges'] if e[0] == root]:
-            graph['incoming'][child] -= 1
-            graph['edges'].remove((parent, child))
-            # if destination node is now a root, add it to roots
-            if graph['incoming'][child] == 0:
-                roots.append(child)
-
-    if len(graph['items']) != len(visited):
+
+        released = []
+        rank = ranks.get(root)
+        if rank is not None:
+            remaining[rank] -= 1
+            if remaining[rank] == 0:
+                del remaining[rank]
+                top = max(remaining) if remaining else None
+                if top is not None:
+                    # the last item of the highest rank is gone, so the items
+                    # of the next rank lose all of their implicit edges
+                    released = [n for n in graph['ranked'][top]]
+
+        if released:
+            edges = children[root]
+            visit = sorted(set(edges).union(released), key=position.get)
+            for child in visit:
+                incoming[child] -= edges.count(child)
+                if incoming[child] == 0 and is_free(child):
+                    roots.append(child)
+        else:
+            # remove each edge from the root to another node
+            for child in children[root]:
+                incoming[child] -= 1
+                # if destination node is now a root, add it to roots
+                if incoming[child] == 0 and is_free(child):
+                    roots.append(child)
+
+    if len(items) != len(visited):
         raise CyclicGraphError("graph contains cycles")
 
     return order
 
 
-def create_graph(items, edges):
+def create_graph(items, edges, ranks=None):
     """ Create a graph based on a list of items and a list of edges.
 
         Arguments:
 
             items   -   an iterable containing (hashable) items to sort
             edges   -   an iterable containing (parent, child) edge pair tuples
+            ranks   -   an optional dict of item ranks (see :func:`tsort`)
 
         Return Value:
 
             The return value is a dictionary representing the directed graph.
-            It has three keys:
+            It has the following keys:
 
                 items is the same as the input argument of the same name
                 edges is the same as the input argument of the same name
                 incoming is a dict of incoming edge count hashed by item
+                children is a dict of child lists hashed by item (in edge
+                    order, or in item order if there are ranks)
+                ranks is a dict of item ranks hashed by item
+                ranked is a dict of item lists (in item order) hashed by rank
 
+            Incoming edge counts do not include implicit edges between ranks.
     """
     graph = {'items': [],       # the items to sort
              'edges': [],       # partial order info: (parent, child) pairs
-             'incoming': {}}    # incoming edge count for each item
+             'incoming': {},    # incoming edge count for each item
+             'children': {},    # adjacency list for each item
+             'ranks': {},       # rank of each ranked item
+             'ranked': {}}      # ranked items by rank
 
     graph['items'] = items
     graph['edges'] = edges
+    graph['ranks'] = dict((i, r) for (i, r) in (ranks or {}).items() if r is not None)
     for item in items:
         graph['incoming'][item] = 0
+        graph['children'][item] = []
+        if item in graph['ranks']:
+            graph['ranked'].setdefault(graph['ranks'][item], []).append(item)
 
-    for (_parent, child) in edges:
+    for (parent, child) in edges:
         graph['incoming'][child] += 1
+        graph['children'][parent].append(child)
+
+    if graph['ranks']:
+        # implicit and explicit edges are visited in item order
+        position = dict((item, idx) for (idx, item) in enumerate(items))
+        for child_list in graph['children'].values():
+            child_list.sort(key=position.get)
 
     return graph
 
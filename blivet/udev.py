@@ -26,9 +26,13 @@ import re
 import subprocess
 import logging
 import pyudev
+import threading
 import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from six.moves.collections_abc import MutableMapping  # pylint: disable=import-error
 
-from . import util
+from . import load_plugins, util
 from .size import Size
 from .flags import flags
 
@@ -67,17 +71,87 @@ def running_in_chroot():
         return False
 
 
+class UdevInfo(MutableMapping):
+    """ A dictionary of a udev device's properties, fetched on first use.
+
+        Besides the device's properties the mapping contains the "SYS_NAME"
+        and "SYS_PATH" keys. Single properties are fetched from the udev
+        device as they are looked up, while iterating over the mapping or
+        taking its length fetches all of them (see :meth:`freeze`).
+    """
+
+    def __init__(self, device):
+        """
+            :param device: the udev device
+            :type device: :class:`pyudev.Device`
+        """
+        self._device = device
+        self._properties = {"SYS_NAME": device.sys_name,
+                            "SYS_PATH": device.sys_path}
+        self._missing = set()
+
+    @property
+    def frozen(self):
+        """ Whether all of the properties have been fetched. """
+        return self._device is None
+
+    def freeze(self):
+        """ Fetch all of the properties and let go of the udev device.
+
+            :returns: this instance
+            :rtype: :class:`UdevInfo`
+        """
+        if self._device is not None:
+            for (key, value) in self._device.properties.items():
+                if key not in self._missing:
+                    self._properties.setdefault(key, value)
+
+            self._device = None
+
+        return self
+
+    def __getitem__(self, key):
+        try:
+            return self._properties[key]
+        except KeyError:
+            if self._device is None or key in self._missing:
+                raise
+
+        value = self._device.properties.get(key)
+        if value is None:
+            self._missing.add(key)
+            raise KeyError(key)
+
+        self._properties[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        self._properties[key] = value
+        self._missing.discard(key)
+
+    def __delitem__(self, key):
+        self[key]  # pylint: disable=pointless-statement
+        del self._properties[key]
+        self._missing.add(key)
+
+    def __iter__(self):
+        return iter(self.freeze()._properties)
+
+    def __len__(self):
+        return len(self.freeze()._properties)
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, self.freeze()._properties)
+
+
 def device_to_dict(device):
     # Transform Device to dictionary
     # Originally it was possible to use directly Device where needed,
     # but it lead to unfixable excessive deprecation warnings from udev.
     # Sice blivet uses Device.properties only (with couple of exceptions)
     # this is a functional workaround. (japokorn May 2017)
-
-    result = dict(device.properties)
-    result["SYS_NAME"] = device.sys_name
-    result["SYS_PATH"] = device.sys_path
-    return result
+    # The properties are fetched as they are used, see UdevInfo.
+    return UdevInfo(device)
 
 
 def get_device(sysfs_path=None, device_node=None):
@@ -105,14 +179,186 @@ def get_devices(subsystem="block"):
             dev = device_to_dict(device)
             result.append(dev)
 
+    if subsystem == "block" and _keep_snapshot():
+        _set_snapshot(UdevSnapshot(result))
+
     return result
 
 
+class UdevSnapshot(object):
+    """ Block device information from the udev database, indexed for lookups.
+
+        One snapshot is shared by :func:`resolve_devspec`,
+        :func:`resolve_glob` and :func:`device_get_partition_disk` (see
+        :func:`get_snapshot`). Each enumeration of block devices by
+        :func:`get_devices` replaces it, :func:`settle` drops it and
+        uevents update the affected device's entry.
+
+        The snapshot is kept while uevents are handled and for the duration
+        of a :func:`snapshot_kept` block, e.g. while the devicetree is being
+        populated. Otherwise nothing would tell it about the changes made by
+        blivet's own external commands (e.g. a new label after mkfs), so each
+        lookup gets a fresh snapshot, which is searched instead of indexed.
+    """
+
+    _INDEX_KEYS = {"name": lambda info: [device_get_name(info)],
+                   "sys_name": lambda info: [info["SYS_NAME"]],
+                   "label": lambda info: [device_get_label(info)],
+                   "uuid": lambda info: [device_get_uuid(info)],
+                   "symlink": lambda info: device_get_symlinks(info),  # pylint: disable=unnecessary-lambda
+                   "devno": lambda info: [(info.get("MAJOR"), info.get("MINOR"))]}
+
+    def __init__(self, devices, indexed=True):
+        """
+            :param devices: udev info for each block device
+            :type devices: list of dict
+            :keyword bool indexed: whether to index the devices for lookups
+                                   or search them every time
+        """
+        self._devices = OrderedDict((device_get_sysfs_path(d), d) for d in devices)
+        self._indexed = indexed
+        self._indexes = dict()
+        self._lock = threading.Lock()
+
+    @property
+    def devices(self):
+        """ The udev info of all the devices in the snapshot. """
+        with self._lock:
+            return list(self._devices.values())
+
+    def update(self, info):
+        """ Add or replace a device's udev info. """
+        with self._lock:
+            self._devices[device_get_sysfs_path(info)] = info
+            self._indexes = dict()
+
+    def remove(self, sysfs_path):
+        """ Remove the device with the given sysfs path. """
+        with self._lock:
+            self._devices.pop(sysfs_path, None)
+            self._indexes = dict()
+
+    def _get_index(self, index):
+        """ Return the given index, building it when it is first needed. """
+        if index not in self._indexes:
+            get_keys = self._INDEX_KEYS[index]
+            keys = dict()
+            for (pos, info) in enumerate(self._devices.values()):
+                for key in get_keys(info):
+                    # the first device wins, as it would in a linear search
+                    keys.setdefault(key, (pos, info))
+            self._indexes[index] = keys
+
+        return self._indexes[index]
+
+    def _search(self, keys):
+        """ Return the first device matching any of the given keys. """
+        for info in self._devices.values():
+            if any(key in self._INDEX_KEYS[index](info) for (index, key) in keys):
+                return info
+
+        return None
+
+    def lookup(self, *keys):
+        """ Return the first device matching any of the given keys.
+
+            :param keys: (index, key) pairs, where index is one of "name",
+                         "sys_name", "label", "uuid", "symlink" or "devno"
+                         (whose keys are (major, minor) tuples of strings)
+            :returns: the udev info of the matching device that comes first
+                      in the snapshot, or None
+            :rtype: dict or NoneType
+        """
+        with self._lock:
+            if not self._indexed:
+                return self._search(keys)
+
+            matches = [self._get_index(index).get(key) for (index, key) in keys]
+
+        matches = [m for m in matches if m is not None]
+        return min(matches, key=lambda m: m[0])[1] if matches else None
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+_snapshot_holds = 0
+
+
+def _set_snapshot(snapshot):
+    global _snapshot  # pylint: disable=global-statement
+    _snapshot = snapshot
+
+
+def _keep_snapshot():
+    """ Should the shared :class:`UdevSnapshot` be kept once created? """
+    return flags.uevents or _snapshot_holds > 0
+
+
+@contextmanager
+def snapshot_kept():
+    """ Keep the shared :class:`UdevSnapshot` until the block is left.
+
+        This is meant for operations doing many lookups in a short time,
+        like populating the devicetree. If uevents are not handled, the
+        snapshot is dropped when the outermost block is left.
+    """
+    global _snapshot_holds  # pylint: disable=global-statement
+    with _snapshot_lock:
+        _snapshot_holds += 1
+
+    try:
+        yield
+    finally:
+        with _snapshot_lock:
+            _snapshot_holds -= 1
+            if not _keep_snapshot():
+                drop_snapshot()
+
+
+def get_snapshot():
+    """ Return the shared :class:`UdevSnapshot`, creating it if necessary.
+
+        If the snapshot is not to be kept (see :class:`UdevSnapshot`), a
+        fresh one is returned each time.
+    """
+    snapshot = _snapshot
+    if snapshot is None:
+        devices = get_devices()
+        snapshot = _snapshot or UdevSnapshot(devices, indexed=False)
+
+    return snapshot
+
+
+def drop_snapshot():
+    """ Drop the shared :class:`UdevSnapshot`. """
+    _set_snapshot(None)
+
+
+def update_snapshot(device):
+    """ Update the shared :class:`UdevSnapshot` for a uevent.
+
+        :param device: the device the uevent was generated for
+        :type device: :class:`pyudev.Device`
+    """
+    snapshot = _snapshot
+    if snapshot is None or __is_ignored_blockdev(device.sys_name):
+        return
+
+    if device.action == "remove":
+        snapshot.remove(device.sys_path)
+    else:
+        # the monitor's device objects are not ours to keep
+        snapshot.update(device_to_dict(device).freeze())
+
+
 def settle(quiet=False):
     """ Wait for the udev queue to settle.
 
         :keyword bool quiet: bypass :meth:`blivet.util.run_program`
     """
+    # whatever we are waiting for can change the udev database
+    drop_snapshot()
+
     # wait maximal 300 seconds for udev to be done running blkid, lvm,
     # mdadm etc. This large timeout is needed when running on machines with
     # lots of disks, or with slow disks
@@ -128,6 +374,73 @@ def settle(quiet=False):
         util.run_program(argv)
 
 
+def _device_in_state(sysfs_path, device_node, exists):
+    """ Does udev have an initialized entry for the device, or none if exists is False? """
+    try:
+        if sysfs_path:
+            device = pyudev.Devices.from_sys_path(global_udev, sysfs_path)
+        else:
+            device = pyudev.Devices.from_device_file(global_udev, device_node)
+    except (pyudev.DeviceNotFoundError, EnvironmentError):
+        found = False
+    else:
+        found = device.is_initialized
+
+    return found == exists
+
+
+def wait_for_device(sysfs_path=None, device_node=None, exists=True, timeout=10):
+    """ Wait for udev to finish handling a device's appearance or removal.
+
+        :keyword str sysfs_path: the device's sysfs path
+        :keyword str device_node: the device's node, or a symlink to it
+        :keyword bool exists: wait for the device to appear (True) or go away
+        :keyword int timeout: seconds to wait before falling back to :func:`settle`
+        :returns: whether the device got there without falling back
+        :rtype: bool
+
+        Unlike :func:`settle`, which waits until udev's whole event queue
+        has drained, this only waits for uevents until udev's database has
+        an initialized entry for the device, or no entry if exists is False.
+        Either sysfs_path or device_node must be given.
+
+        An existing entry says nothing about uevents still queued for the
+        device, e.g. the change event from setting up or creating it, so
+        only use this where the device is known to be new or going away and
+        :func:`settle` otherwise.
+    """
+    drop_snapshot()
+    if running_in_chroot():
+        # udev is not necessarily ours to watch in a chroot
+        settle()
+        return False
+
+    if _device_in_state(sysfs_path, device_node, exists):
+        return True
+
+    try:
+        monitor = pyudev.Monitor.from_netlink(global_udev)
+        monitor.filter_by("block")
+        monitor.start()
+    except EnvironmentError as e:
+        log.debug("cannot monitor uevents, settling instead: %s", e)
+        settle()
+        return False
+
+    deadline = time.time() + timeout
+    # the device may have got there before the monitor was started
+    while not _device_in_state(sysfs_path, device_node, exists):
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            log.debug("timed out waiting for %s, settling instead", sysfs_path or device_node)
+            settle()
+            return False
+
+        monitor.poll(timeout=remaining)
+
+    return True
+
+
 def trigger(subsystem=None, action="add", name=None):
     argv = ["trigger", "--action=%s" % action]
     if subsystem:
@@ -146,30 +459,18 @@ def resolve_devspec(devspec, sysname=False):
     # import devices locally to avoid cyclic import (devices <-> udev)
     from . import devices
 
-    devname = devices.device_path_to_name(devspec)
-
-    ret = None
-    for dev in get_devices():
-        if devspec.startswith("LABEL="):
-            if device_get_label(dev) == devspec[6:]:
-                ret = dev
-                break
-        elif devspec.startswith("UUID="):
-            if device_get_uuid(dev) == devspec[5:]:
-                ret = dev
-                break
-        elif device_get_name(dev) == devname or dev["SYS_NAME"] == devname:
-            ret = dev
-            break
-        else:
-            spec = devspec
-            if not spec.startswith("/dev/"):
-                spec = os.path.normpath("/dev/" + spec)
+    snapshot = get_snapshot()
+    if devspec.startswith("LABEL="):
+        ret = snapshot.lookup(("label", devspec[6:]))
+    elif devspec.startswith("UUID="):
+        ret = snapshot.lookup(("uuid", devspec[5:]))
+    else:
+        devname = devices.device_path_to_name(devspec)
+        spec = devspec
+        if not spec.startswith("/dev/"):
+            spec = os.path.normpath("/dev/" + spec)
 
-            for link in device_get_symlinks(dev):
-                if spec == link:
-                    ret = dev
-                    break
+        ret = snapshot.lookup(("name", devname), ("sys_name", devname), ("symlink", spec))
 
     if ret:
         return ret["SYS_NAME"] if sysname else device_get_name(ret)
@@ -189,7 +490,7 @@ def resolve_glob(glob):
     if not glob:
         return ret
 
-    for dev in get_devices():
+    for dev in get_snapshot().devices:
         name = device_get_name(dev)
         path = device_get_devname(dev)
 
@@ -774,10 +1075,14 @@ def device_get_partition_disk(info):
     parents_dir = "%s/slaves" % sysfs_path
     if majorminor:
         major, minor = majorminor.split(":")
-        for device in get_devices():
-            if device.get("MAJOR") == major and device.get("MINOR") == minor:
-                disk = device_get_name(device)
-                break
+        device = get_snapshot().lookup(("devno", (major, minor)))
+        if device is None:
+            # the disk should be known, so the snapshot may be out of date
+            drop_snapshot()
+            device = get_snapshot().lookup(("devno", (major, minor)))
+
+        if device is not None:
+            disk = device_get_name(device)
     elif device_is_dm_partition(info):
         if os.path.isdir(parents_dir):
             parents = os.listdir(parents_dir)
@@ -1042,7 +1347,7 @@ def device_is_nvdimm_namespace(info):
     if info.get("DEVTYPE") != "disk":
         return False
 
-    if not blockdev.is_plugin_available(blockdev.Plugin.NVDIMM):
+    if "nvdimm" not in load_plugins(["nvdimm"]):
         # nvdimm plugin is not available -- even if this is an nvdimm device we
         # don't have tools to work with it, so we should pretend it's just a disk
         return False
@@ -1072,7 +1377,7 @@ def device_is_nvme_fabrics(info):
     if not device_is_nvme_namespace(info):
         return False
 
-    if not hasattr(blockdev.Plugin, "NVME") or not blockdev.is_plugin_available(blockdev.Plugin.NVME):  # pylint: disable=no-member
+    if not hasattr(blockdev.Plugin, "NVME") or "nvme" not in load_plugins(["nvme"]):
         # nvme plugin is not available -- even if this is an nvme fabrics device we
         # don't have tools to work with it, so we should pretend it's just a normal nvme
         return False
@@ -18,6 +18,7 @@ from collections import namedtuple
 from enum import Enum
 
 from .errors import DependencyError
+from .flags import flags
 from . import safe_dbus
 
 import gi
@@ -33,7 +34,7 @@ program_log = logging.getLogger("program")
 testdata_log = logging.getLogger("testdata")
 console_log = logging.getLogger("blivet.console")
 
-from threading import Lock
+from threading import Condition, Lock
 # this will get set to anaconda's program_log_lock in enable_installer_mode
 program_log_lock = Lock()
 
@@ -172,7 +173,85 @@ class Path(str):
         return self._path.__hash__()
 
 
+class _ProgramLogBuffer(object):
+    """ Collects the log block of one external program run.
+
+        The messages are tagged with the invocation's id and written to the
+        program log all at once by :meth:`flush`, so that the output of
+        programs running concurrently does not get interleaved. The start of
+        the run is flushed right away so that a program that hangs still
+        shows up in the log.
+    """
+
+    def __init__(self, program_id):
+        self.program_id = program_id
+        self._records = []
+
+    def _add(self, level, msg, *args):
+        self._records.append((level, msg, args))
+
+    def info(self, msg, *args):
+        self._add(logging.INFO, msg, *args)
+
+    def debug(self, msg, *args):
+        self._add(logging.DEBUG, msg, *args)
+
+    def error(self, msg, *args):
+        self._add(logging.ERROR, msg, *args)
+
+    def flush(self):
+        """ Write the collected messages to the program log. """
+        with program_log_lock:  # pylint: disable=not-context-manager
+            for (level, msg, args) in self._records:
+                program_log.log(level, "[%d] " + msg, self.program_id, *args)
+
+        self._records = []
+
+
+_program_ids = itertools.count(1)
+_program_slots = Condition(Lock())
+_running_programs = 0
+
+
+@contextmanager
+def _program_slot():
+    """ Wait until fewer than flags.program_workers programs are running. """
+    global _running_programs  # pylint: disable=global-statement
+    with _program_slots:
+        while _running_programs >= flags.program_workers:
+            _program_slots.wait()
+        _running_programs += 1
+
+    try:
+        yield
+    finally:
+        with _program_slots:
+            _running_programs -= 1
+            _program_slots.notify()
+
+
 def _run_program(argv, root='/', stdin=None, env_prune=None, stderr_to_stdout=False, binary_output=False):
+    if flags.program_workers > 1:
+        # run concurrently with other programs and emit the log block at once
+        plog = _ProgramLogBuffer(next(_program_ids))
+        try:
+            with _program_slot():
+                plog.info("Running... %s", " ".join(argv))
+                plog.flush()
+                return _exec_program(plog, argv, root, stdin, env_prune, stderr_to_stdout, binary_output)
+        finally:
+            plog.flush()
+
+    with program_log_lock:  # pylint: disable=not-context-manager
+        program_log.info("Running... %s", " ".join(argv))
+        return _exec_program(program_log, argv, root, stdin, env_prune, stderr_to_stdout, binary_output)
+
+
+def _exec_program(plog, argv, root, stdin, env_prune, stderr_to_stdout, binary_output):
+    """ Run an external program, logging its output to plog.
+
+        The caller logs the start of the run.
+    """
     if env_prune is None:
         env_prune = []
 
@@ -180,46 +259,43 @@ def _run_program(argv, root='/', stdin=None, env_prune=None, stderr_to_stdout=Fa
         if root and root != '/':
             os.chroot(root)
 
-    with program_log_lock:  # pylint: disable=not-context-manager
-        program_log.info("Running... %s", " ".join(argv))
+    env = os.environ.copy()
+    env.update({"LC_ALL": "C",
+                "INSTALL_PATH": root})
+    for var in env_prune:
+        env.pop(var, None)
+
+    if stderr_to_stdout:
+        stderr_dir = subprocess.STDOUT
+    else:
+        stderr_dir = subprocess.PIPE
+    try:
+        proc = subprocess.Popen(argv,  # pylint: disable=subprocess-popen-preexec-fn
+                                stdin=stdin,
+                                stdout=subprocess.PIPE,
+                                stderr=stderr_dir,
+                                close_fds=True,
+                                preexec_fn=chroot, cwd=root, env=env)
+
+        out, err = proc.communicate()
+        if not binary_output and six.PY3:
+            out = out.decode("utf-8")
+        if out:
+            if not stderr_to_stdout:
+                plog.info("stdout:")
+            for line in out.splitlines():
+                plog.info("%s", line)
+
+        if not stderr_to_stdout and err:
+            plog.info("stderr:")
+            for line in err.splitlines():
+                plog.info("%s", line)
 
-        env = os.environ.copy()
-        env.update({"LC_ALL": "C",
-                    "INSTALL_PATH": root})
-        for var in env_prune:
-            env.pop(var, None)
+    except OSError as e:
+        plog.error("Error running %s: %s", argv[0], e.strerror)
+        raise
 
-        if stderr_to_stdout:
-            stderr_dir = subprocess.STDOUT
-        else:
-            stderr_dir = subprocess.PIPE
-        try:
-            proc = subprocess.Popen(argv,  # pylint: disable=subprocess-popen-preexec-fn
-                                    stdin=stdin,
-                                    stdout=subprocess.PIPE,
-                                    stderr=stderr_dir,
-                                    close_fds=True,
-                                    preexec_fn=chroot, cwd=root, env=env)
-
-            out, err = proc.communicate()
-            if not binary_output and six.PY3:
-                out = out.decode("utf-8")
-            if out:
-                if not stderr_to_stdout:
-                    program_log.info("stdout:")
-                for line in out.splitlines():
-                    program_log.info("%s", line)
-
-            if not stderr_to_stdout and err:
-                program_log.info("stderr:")
-                for line in err.splitlines():
-                    program_log.info("%s", line)
-
-        except OSError as e:
-            program_log.error("Error running %s: %s", argv[0], e.strerror)
-            raise
-
-        program_log.debug("Return code: %d", proc.returncode)
+    plog.debug("Return code: %d", proc.returncode)
 
     return (proc.returncode, out)
 
@@ -3,6 +3,7 @@ try:
 except ImportError:
     from mock import patch, Mock
 
+import random
 import six
 import unittest
 
@@ -358,6 +359,89 @@ class PartitioningTestCase(unittest.TestCase):
         self.assertEqual(req2.growth, 0)
         self.assertEqual(req3.growth, 35)
 
+    def _random_chunks(self, seed, disk):
+        """ Return two identical chunks of randomly sized requests. """
+        chunks = []
+        for _i in range(2):
+            rand = random.Random(seed)
+            # small multiples of a common unit make for shares that divide
+            # the pool exactly, which the decimal computation can get wrong
+            unit = 3 ** rand.randint(0, 12) if rand.random() < 0.5 else None
+            if unit:
+                length = unit * rand.randint(1, 100)
+            else:
+                length = rand.randint(1, 10 ** rand.randint(2, 12))
+            start = rand.randint(0, 1000)
+            requests = []
+            offset = start
+            for req_id in range(rand.randint(1, 12)):
+                if unit:
+                    base = unit * rand.randint(1, 6)
+                else:
+                    base = rand.randint(1, 10 ** rand.randint(1, 9))
+                dev = Mock()
+                dev.configure_mock(id=req_id, name="req%d" % req_id,
+                                   req_grow=rand.random() < 0.8,
+                                   req_bootable=rand.random() < 0.2)
+                if disk:
+                    dev.parted_partition.geometry.configure_mock(start=offset, end=offset + base - 1)
+                    dev.parted_partition.disk.maxPartitionStartSector = start + length + rand.randint(-length, length)
+                    offset += base
+                    req = PartitionRequest.__new__(PartitionRequest)
+                    Request.__init__(req, dev)
+                else:
+                    req = Request(dev)
+
+                req.base = base
+                if rand.random() < 0.5:
+                    req.max_growth = rand.randint(1, 10 ** rand.randint(1, 10))
+                requests.append(req)
+
+            if disk:
+                geometry = Mock(start=start, end=start + length - 1, length=length)
+                geometry.device.configure_mock(sectorSize=512, path="/dev/test")
+                chunk = DiskChunk(geometry, requests=requests)
+            else:
+                chunk = Chunk(length, requests=requests)
+            chunks.append(chunk)
+
+        return chunks
+
+    def test_chunk_fast_growth(self):
+        """ Verify that the integer fast path grows requests like the original loop. """
+        def grow_reference(chunk, uniform):
+            chunk.sort_requests()
+            chunk._grow_requests_iterative(uniform)
+            if chunk.pool:
+                chunk._grow_leftovers()
+            chunk.skip_list = []
+
+        for seed in range(400):
+            disk = seed % 2 == 1
+            uniform = seed % 4 > 1
+            (fast, reference) = self._random_chunks(seed, disk)
+            if fast.pool <= 0:
+                continue
+
+            fast.grow_requests(uniform=uniform)
+            grow_reference(reference, uniform)
+
+            # reclaim some growth and grow the remaining requests again
+            for chunk in (fast, reference):
+                grown = [r for r in chunk.requests if r.growth > 1]
+                if grown:
+                    chunk.reclaim(grown[0], grown[0].growth // 2)
+                    if not chunk.done:
+                        if chunk is fast:
+                            chunk.grow_requests(uniform=uniform)
+                        else:
+                            grow_reference(chunk, uniform)
+
+            self.assertEqual([(r.growth, r.done) for r in fast.requests],
+                             [(r.growth, r.done) for r in reference.requests],
+                             "growth differs for seed %d" % seed)
+            self.assertEqual((fast.pool, fast.base), (reference.pool, reference.base))
+
     def test_msdos_disk_chunk1(self):
         disk_size = Size("100 MiB")
         with sparsetmpfile("chunktest", disk_size) as disk_file:
@@ -7,6 +7,7 @@ from .dbus_test import *
 from .devicefactory_test import *
 from .devicetree_test import *
 from .events_test import *
+from .lvm_info_test import *
 from .misc_test import *
 from .parentlist_test import *
 from .populator_test import *
@@ -1,3 +1,5 @@
+import random
+import six
 import unittest
 
 try:
@@ -7,6 +9,7 @@ except ImportError:
 
 from .storagetestcase import StorageTestCase
 import blivet
+from blivet.actionlist import ActionList
 from blivet.formats import get_format
 from blivet.size import Size
 
@@ -39,6 +42,8 @@ from blivet.deviceaction import ActionAddMember
 from blivet.deviceaction import ActionRemoveMember
 from blivet.deviceaction import ActionConfigureFormat
 from blivet.deviceaction import ActionConfigureDevice
+from blivet.deviceaction import ACTION_TYPE_ADD, ACTION_TYPE_CREATE, ACTION_TYPE_DESTROY, ACTION_TYPE_REMOVE
+from blivet.deviceaction import ACTION_OBJECT_DEVICE, ACTION_OBJECT_FORMAT
 
 DEVICE_CLASSES = [
     DiskDevice,
@@ -1460,3 +1465,100 @@ class ConfigurationActionsTest(unittest.TestCase):
         ac.apply()
         ac.execute()
         mock_format.do_conf1.assert_called_once_with(dry_run=False)
+
+
+class FakeAction(object):
+    """ Action using the obsoletes method of an action class on fake devices. """
+
+    def __init__(self, action_id, action_class, device, container=None, format_exists=False):
+        self.id = action_id
+        self.action_class = action_class
+        self.type = action_class.type
+        self.obj = action_class.obj
+        self.device = device
+        self.container = container
+        self.format = Mock(exists=format_exists)
+
+    is_destroy = property(lambda self: self.type == ACTION_TYPE_DESTROY)
+    is_add = property(lambda self: self.type == ACTION_TYPE_ADD)
+    is_remove = property(lambda self: self.type == ACTION_TYPE_REMOVE)
+    is_format = property(lambda self: self.obj == ACTION_OBJECT_FORMAT)
+
+    def obsoletes(self, action):
+        return six.get_unbound_function(self.action_class.obsoletes)(self, action)
+
+
+class ActionListIndexTestCase(unittest.TestCase):
+
+    @staticmethod
+    def _pruned(actions):
+        """ The action list pruning of old, checking all pairs of actions. """
+        actions = actions[:]
+        for action in reversed(actions[:]):
+            if action not in actions:
+                continue
+
+            for obsolete in actions[:]:
+                if action.obsoletes(obsolete):
+                    actions.remove(obsolete)
+                    if obsolete.obsoletes(action) and action in actions:
+                        actions.remove(action)
+
+        return actions
+
+    def _random_actions(self, rand, count):
+        devices = [Mock(id=i, exists=rand.random() < 0.5) for i in range(8)]
+        classes = [ActionCreateDevice, ActionDestroyDevice, ActionCreateFormat,
+                   ActionDestroyFormat, ActionAddMember, ActionRemoveMember]
+        actions = []
+        for action_id in range(count):
+            action_class = rand.choice(classes)
+            device = rand.choice(devices)
+            container = None
+            if action_class in (ActionAddMember, ActionRemoveMember):
+                # members are added to the first few devices
+                device = rand.choice(devices[3:])
+                container = rand.choice(devices[:3])
+            actions.append(FakeAction(action_id, action_class, device,
+                                      container=container, format_exists=rand.random() < 0.5))
+        return devices, actions
+
+    def test_prune(self):
+        rand = random.Random(42)
+        for _i in range(200):
+            _devices, actions = self._random_actions(rand, rand.randint(1, 30))
+            action_list = ActionList()
+            action_list._actions = actions[:]
+            action_list.prune()
+            self.assertEqual(action_list._actions, self._pruned(actions))
+
+    def test_find(self):
+        rand = random.Random(42)
+        devices, actions = self._random_actions(rand, 50)
+        action_list = ActionList()
+        for action in actions[:40]:
+            action.apply = Mock()
+            action_list.add(action)
+
+        # actions appended directly and removed actions are taken into account
+        action_list._actions.extend(actions[40:])
+        for action in actions[::7]:
+            action.cancel = Mock()
+            action_list.remove(action)
+
+        remaining = [a for a in actions if a not in actions[::7]]
+        for device in devices:
+            for (action_type, _type) in ((None, None), ("create", ACTION_TYPE_CREATE),
+                                         ("destroy", ACTION_TYPE_DESTROY)):
+                for (object_type, obj) in ((None, None), ("device", ACTION_OBJECT_DEVICE),
+                                           ("format", ACTION_OBJECT_FORMAT)):
+                    expected = [a for a in remaining
+                                if _type in (None, a.type) and obj in (None, a.obj)]
+                    self.assertEqual(action_list.find(action_type=action_type, object_type=object_type),
+                                     expected)
+                    self.assertEqual(action_list.find(device=device, action_type=action_type,
+                                                      object_type=object_type),
+                                     [a for a in expected if a.device is device])
+                    self.assertEqual(action_list.find(devid=device.id, action_type=action_type),
+                                     [a for a in remaining if a.device.id == device.id and
+                                      _type in (None, a.type)])
@@ -7,6 +7,7 @@ import unittest
 import os
 import logging
 import copy
+import threading
 
 from blivet import arch
 from blivet.devicelibs import edd
@@ -196,7 +197,6 @@ class EddTestCase(unittest.TestCase):
              '/sys/firmware/edd/int13_dev81/'),
         ]
         infos = [
-            ("edd: MBR signature on %s is zero. new disk image?", "sda"),
             ("edd: collected mbr signatures: %s", {'sdb': '0x96a20d28'}),
             ("edd: matched 0x%x to %s using PCI dev", 0x80, "sda"),
             ("edd: matched 0x%x to %s using MBR sig", 0x81, "sdb"),
@@ -353,10 +353,7 @@ class EddTestCase(unittest.TestCase):
              '/sys/firmware/edd/int13_dev85/'),
         ]
         infos = [
-            ("edd: collected mbr signatures: %s", {'vda': '0x86531966',
-                                                   'sda': '0xe3bf124b',
-                                                   'sdb': '0x7dfff0db',
-                                                   'sdc': '0x63f1d7d8',
+            ("edd: collected mbr signatures: %s", {'sda': '0xe3bf124b',
                                                    'sdd': '0xee331b19',
                                                    'sde': '0xfa0a111d',
                                                    }),
@@ -506,11 +503,7 @@ class EddTestCase(unittest.TestCase):
              '/sys/firmware/edd/int13_dev83/'),
         ]
         infos = [
-            ("edd: MBR signature on %s is zero. new disk image?", "sda"),
-            ("edd: MBR signature on %s is zero. new disk image?", "sdb"),
-            ("edd: collected mbr signatures: %s", {'sdc': '0x00033091',
-                                                   'sdd': '0x91271645',
-                                                   }),
+            ("edd: collected mbr signatures: %s", {'sdd': '0x91271645'}),
             ("edd: matched 0x%x to %s using MBR sig", 0x80, "sdd"),
             ("edd: matched 0x%x to %s using PCI dev", 0x81, "sdc"),
             ("edd: matched 0x%x to %s using PCI dev", 0x82, "sdb"),
@@ -555,6 +548,39 @@ class EddTestCase(unittest.TestCase):
         self.check_logs(infos=infos)
         lib.assertVerboseEqual(fake_mbr_dict, mbr_dict)
 
+    def test_collect_mbrs_timeout_and_duplicates(self):
+        self._edd_logger.debug("starting test %s", self._testMethodName)
+        devices = (FakeDevice("sda"),
+                   FakeDevice("sdb"),
+                   FakeDevice("sdc"),
+                   )
+        stuck = threading.Event()
+        data = {"/dev/sda": b"\x4b\x12\xbf\xe3",
+                "/dev/sdb": b"\xdb\xf0\xff\x7d",
+                "/dev/sdc": b"\x4b\x12\xbf\xe3"}
+
+        def read_mbr_signature(path):
+            if path == "/dev/sdb":
+                stuck.wait()
+            return data[path]
+
+        # an unresponsive disk is skipped once the timeout expires
+        with mock.patch("blivet.devicelibs.edd._read_mbr_signature", side_effect=read_mbr_signature):
+            mbr_dict = edd.collect_mbrs(devices[:2], timeout=0.5)
+        stuck.set()
+        lib.assertVerboseEqual(mbr_dict, {'sda': '0xe3bf124b'})
+        self.check_logs(infos=[("edd: collected mbr signatures: %s", {'sda': '0xe3bf124b'})],
+                        errors=[("edd: timed out reading mbrsig from disk %s", "sdb")])
+
+        # a duplicate signature makes all of the signatures useless
+        edd.log.info.reset_mock()
+        edd.log.error.reset_mock()
+        with mock.patch("blivet.devicelibs.edd._read_mbr_signature", side_effect=read_mbr_signature):
+            mbr_dict = edd.collect_mbrs(devices)
+        lib.assertVerboseEqual(mbr_dict, {})
+        self.check_logs(errors=[("edd: dupicite MBR signature %s for %s and %s",
+                                 "0xe3bf124b", "sda", "sdc")])
+
     def test_collect_edd_data_bad_sata_virt(self):
         self._edd_logger.debug("starting test %s", self._testMethodName)
         edd.testdata_log.debug("starting test %s", self._testMethodName)
@@ -772,11 +798,7 @@ class EddTestCase(unittest.TestCase):
         infos = [
             ('edd: Could not find Virtio device for pci dev %s channel %s', '00:03.0', 255),
             ('edd: Could not find Virtio device for pci dev %s channel %s', '00:0c.0', 255),
-            ('edd: collected mbr signatures: %s', {'vda': '0x86531966',
-                                                   'sda': '0xe3bf124b',
-                                                   'sdb': '0x7dfff0db',
-                                                   'sdc': '0x648873aa',
-                                                   }),
+            ('edd: collected mbr signatures: %s', {'sdc': '0x648873aa'}),
             ('edd: matched 0x%x to %s using PCI dev', 0x80, 'vda'),
             ('edd: matched 0x%x to %s using PCI dev', 0x81, 'sda'),
             ('edd: matched 0x%x to %s using PCI dev', 0x82, 'sdb'),
@@ -1,7 +1,7 @@
 try:
-    from unittest.mock import patch, Mock, PropertyMock, sentinel
+    from unittest.mock import patch, mock_open, Mock, PropertyMock, sentinel
 except ImportError:
-    from mock import patch, Mock, PropertyMock, sentinel
+    from mock import patch, mock_open, Mock, PropertyMock, sentinel
 
 import six
 import unittest
@@ -256,6 +256,163 @@ class DeviceTreeTestCase(unittest.TestCase):
         self.assertIsNone(dt.get_device_by_name("dev3"))
         self.assertEqual(dt.get_device_by_name("dev3", hidden=True), dev3)
 
+    def test_lookup_index(self):
+        dt = DeviceTree()
+
+        dev1 = StorageDevice("dev1", exists=True, parents=[], sysfs_path="/devices/dev1")
+        dev2 = StorageDevice("dev2", exists=False, parents=[dev1], size=Size("1 GiB"))
+        dt._add_device(dev1)
+        dt._add_device(dev2)
+
+        self.assertEqual(dt.get_device_by_sysfs_path("/devices/dev1"), dev1)
+        self.assertEqual(dt.get_device_by_path("/dev/dev2"), dev2)
+        self.assertEqual(dt.get_device_by_id(dev2.id), dev2)
+
+        # renames are picked up by the name and path indexes
+        dev2.name = "dev22"
+        self.assertIsNone(dt.get_device_by_name("dev2"))
+        self.assertIsNone(dt.get_device_by_path("/dev/dev2"))
+        self.assertEqual(dt.get_device_by_name("dev22"), dev2)
+        self.assertEqual(dt.get_device_by_path("/dev/dev22"), dev2)
+
+        dev1.sysfs_path = "/devices/dev11"
+        self.assertIsNone(dt.get_device_by_sysfs_path("/devices/dev1"))
+        self.assertEqual(dt.get_device_by_sysfs_path("/devices/dev11"), dev1)
+
+        # format changes are picked up by the uuid and label indexes
+        dev2.format = get_format("ext4", uuid="1234-5678", label="data")
+        self.assertEqual(dt.get_device_by_uuid("1234-5678"), dev2)
+        self.assertEqual(dt.get_device_by_label("data"), dev2)
+
+        # and so are changes to the format's uuid and label
+        dev2.format.uuid = "8765-4321"
+        dev2.format.label = "data2"
+        with patch.object(dt, "_filter_devices") as filter_devices:
+            self.assertEqual(dt.get_device_by_uuid("8765-4321"), dev2)
+            self.assertIsNone(dt.get_device_by_uuid("1234-5678"))
+            self.assertEqual(dt.get_device_by_label("data2"), dev2)
+            self.assertIsNone(dt.get_device_by_label("data"))
+            self.assertFalse(filter_devices.called)
+
+        dev1.uuid = "abcd"
+        self.assertEqual(dt.get_device_by_uuid("abcd"), dev1)
+
+        # each tree keeps its own index
+        dt2 = DeviceTree()
+        dev4 = StorageDevice("dev4", exists=True, parents=[], size=Size("1 GiB"))
+        dt2._add_device(dev4)
+        dev4.format = get_format("ext4", uuid="4444")
+        self.assertIsNone(dt.get_device_by_uuid("4444"))
+        self.assertEqual(dt2.get_device_by_uuid("4444"), dev4)
+
+        # so are direct modifications of the device lists
+        dev3 = StorageDevice("dev3", exists=True, parents=[])
+        dt._devices.append(dev3)
+        self.assertEqual(dt.get_device_by_name("dev3"), dev3)
+
+        dt.hide(dev3)
+        self.assertIsNone(dt.get_device_by_path("/dev/dev3"))
+        self.assertEqual(dt.get_device_by_path("/dev/dev3", hidden=True), dev3)
+        dt.unhide(dev3)
+        self.assertEqual(dt.get_device_by_path("/dev/dev3"), dev3)
+
+        dt._remove_device(dev2)
+        self.assertIsNone(dt.get_device_by_name("dev22"))
+        self.assertIsNone(dt.get_device_by_uuid("8765-4321"))
+
+    @patch("blivet.static_data.lvm_info.blockdev.lvm.lvs", return_value=[])
+    def test_names_cache(self, *args):  # pylint: disable=unused-argument
+        dt = DeviceTree()
+
+        dev1 = StorageDevice("dev1", exists=True, parents=[])
+        dev2 = StorageDevice("dev2", exists=True, parents=[])
+        dt._add_device(dev1)
+        self.assertEqual(dt.names, ["dev1"])
+
+        dt._add_device(dev2)
+        self.assertEqual(dt.names, ["dev1", "dev2"])
+
+        dev2.name = "dev22"
+        self.assertEqual(dt.names, ["dev1", "dev22"])
+
+        dt.hide(dev2)
+        self.assertEqual(dt.names, ["dev1", "dev22"])
+        dt.unhide(dev2)
+
+        dt._remove_device(dev1)
+        self.assertEqual(dt.names, ["dev22"])
+
+        # UUIDs assigned after a device was added are checked too
+        dev3 = StorageDevice("dev3", exists=True, parents=[], uuid="abcd")
+        dev2.uuid = "abcd"
+        six.assertRaisesRegex(self, DuplicateUUIDError, "Duplicate UUID.*", dt._add_device, dev3)
+        self.assertEqual(dt.names, ["dev22"])
+
+    @patch("blivet.populator.populator.util.get_sysfs_attr", return_value="2048")
+    @patch("blivet.populator.populator.disklib.update_volume_info")
+    def test_refresh(self, *args):  # pylint: disable=unused-argument
+        dt = DeviceTree()
+
+        udev_devices = []
+        for name in ("sda", "sdb", "sdc"):
+            disk = DiskDevice(name, exists=True)
+            disk.sysfs_path = "/devices/%s" % name
+            dt._add_device(disk)
+            info = {"SYS_NAME": name, "SYS_PATH": disk.sysfs_path, "ID_FS_TYPE": "ext4"}
+            dt._fingerprints[disk.sysfs_path] = dt._get_fingerprint(info)
+            udev_devices.append(info)
+
+        sda, sdb, sdc = dt.devices
+        sda_info, sdb_info, _sdc_info = udev_devices
+
+        # sdb was reformatted, sdc was removed and sdd was added
+        sdb_info = dict(sdb_info, ID_FS_TYPE="xfs")
+        sdd_info = {"SYS_NAME": "sdd", "SYS_PATH": "/devices/sdd"}
+        udev_devices = [sda_info, sdb_info, sdd_info]
+
+        with patch("blivet.populator.populator.udev.get_devices", return_value=udev_devices), \
+             patch.object(dt, "_handle_change_event") as handle_change_event, \
+             patch.object(dt, "handle_device") as handle_device:
+            dt.refresh()
+            self.assertEqual(handle_change_event.call_count, 1)
+            self.assertEqual(handle_change_event.call_args[0][0].info, sdb_info)
+            handle_device.assert_called_once_with(sdd_info)
+            self.assertEqual(dt.devices, [sda, sdb])
+            self.assertNotIn(sdc.sysfs_path, dt._fingerprints)
+
+            # nothing changed since the last refresh, but sda is requested
+            dt.handle_device.reset_mock()
+            handle_change_event.reset_mock()
+            dt.refresh(devices=[sda])
+            self.assertEqual(handle_change_event.call_count, 1)
+            self.assertEqual(handle_change_event.call_args[0][0].info, sda_info)
+            handle_device.assert_called_once_with(sdd_info)
+
+    @patch("blivet.populator.populator.flags.include_nodev", True)
+    def test_handle_nodev_filesystems(self):
+        dt = DeviceTree()
+
+        def mounts(*lines):
+            return patch("blivet.populator.populator.open", mock_open(read_data="\n".join(lines) + "\n"),
+                         create=True)
+
+        with mounts("tmpfs /tmp tmpfs rw 0 0", "tmpfs /run tmpfs rw 0 0"):
+            dt.handle_nodev_filesystems()
+        self.assertEqual(sorted(dt.names), ["tmpfs.0", "tmpfs.1"])
+        tmpfs0 = dt.get_device_by_name("tmpfs.0")
+
+        # devices for filesystems that are still mounted are kept
+        with mounts("tmpfs /tmp tmpfs rw 0 0", "tmpfs /run tmpfs rw 0 0"):
+            dt.handle_nodev_filesystems()
+        self.assertEqual(sorted(dt.names), ["tmpfs.0", "tmpfs.1"])
+        self.assertIs(dt.get_device_by_name("tmpfs.0"), tmpfs0)
+
+        # the others are removed
+        with mounts("tmpfs /tmp tmpfs rw 0 0"):
+            dt.handle_nodev_filesystems()
+        self.assertEqual(dt.names, ["tmpfs.0"])
+        self.assertIs(dt.get_device_by_name("tmpfs.0"), tmpfs0)
+
     def test_recursive_remove(self):
         dt = DeviceTree()
         dev1 = StorageDevice("dev1", exists=False, parents=[])
@@ -6,7 +6,9 @@ except ImportError:
 import time
 from unittest import TestCase
 
-from blivet.events.manager import Event, EventManager
+from blivet.events.changes import data as event_data, record_change
+from blivet.events.manager import Event, EventManager, coalesce_events
+from blivet.flags import flags
 
 
 class FakeEventManager(EventManager):
@@ -83,3 +85,55 @@ class EventManagerTest(TestCase):
         time.sleep(1)
         self.assertEqual(handler_cb.call_count, 0)
         mgr.remove_mask(mask)
+
+    def test_event_batch(self):
+        handler_cb = Mock()
+        with patch("blivet.events.manager.validate_cb", return_value=True):
+            mgr = FakeEventManager(handler_cb=handler_cb)
+
+        # redundant events that arrive within the batch window are coalesced
+        with patch.object(flags, "uevent_batch_window", 0.5):
+            for action in ("change", "change", "add", "change", "change", "remove"):
+                mgr.handle_event(action, "sdc")
+            mgr.handle_event("change", "sdd")
+            time.sleep(1.5)
+
+        handled = [(c[1]["event"].action, c[1]["event"].device)  # pylint: disable=unsubscriptable-object
+                   for c in handler_cb.call_args_list]
+        self.assertEqual(handled, [("change", "sdc"), ("add", "sdc"),
+                                   ("remove", "sdc"), ("change", "sdd")])
+
+        stats = mgr.stats
+        self.assertEqual(stats["received"], 7)
+        self.assertEqual(stats["coalesced"], 3)
+        self.assertEqual(stats["handled"], 4)
+        self.assertEqual(stats["batches"], 1)
+        self.assertEqual(stats["depth"], 0)
+        self.assertTrue(0 < stats["max_depth"] <= 7)
+        self.assertTrue(stats["latency_max"] >= stats["latency_mean"] > 0)
+
+    def test_event_changes(self):
+        def handler_cb(event, notify_cb):
+            record_change(event.device)
+            notify_cb(event=event, changes=event_data.changes)
+
+        notified = []
+
+        def notify_cb(event, changes):
+            notified.append((event.device, list(changes)))
+
+        with patch("blivet.events.manager.validate_cb", return_value=True):
+            mgr = FakeEventManager(handler_cb=handler_cb, notify_cb=notify_cb)
+
+        # each notification only gets the changes made for its own event
+        with patch.object(flags, "uevent_batch_window", 0.2):
+            mgr.handle_event("change", "sda")
+            mgr.handle_event("change", "sdb")
+            time.sleep(1)
+
+        self.assertEqual(notified, [("sda", ["sda"]), ("sdb", ["sdb"])])
+
+    def test_coalesce_events(self):
+        events = [Event("add", "sda"), Event("add", "sda"), Event("change", "sdb"),
+                  Event("remove", "sda"), Event("add", "sda"), Event("change", "sdb")]
+        self.assertEqual(coalesce_events(events), [events[1], events[3], events[4], events[5]])
@@ -3,6 +3,7 @@ try:
 except ImportError:
     import mock
 
+import copy
 import parted
 import unittest
 
@@ -120,6 +121,65 @@ class DiskLabelTestCase(unittest.TestCase):
             # no parted device -> no passing size check
             self.assertEqual(dl._label_type_size_check("msdos"), False)
 
+    def test_copy(self):
+        dl = blivet.formats.disklabel.DiskLabel()
+        dl._parted_disk = mock.Mock(name="parted_disk")
+        dl._orig_parted_disk = mock.Mock(name="orig_parted_disk")
+        orig_parted_disk = dl._orig_parted_disk
+
+        # the working disk is duplicated, the original one is shared
+        new = copy.deepcopy(dl)
+        self.assertEqual(new._parted_disk, dl._parted_disk.duplicate.return_value)
+        self.assertIs(new._orig_parted_disk, orig_parted_disk)
+        self.assertFalse(orig_parted_disk.duplicate.called)
+
+        # resetting the parted disk stops the sharing
+        new.reset_parted_disk()
+        self.assertIs(new._parted_disk, orig_parted_disk.duplicate.return_value)
+        self.assertIs(new._orig_parted_disk, new._parted_disk)
+        self.assertIs(dl._orig_parted_disk, orig_parted_disk)
+
+        dl.reset_parted_disk()
+        self.assertEqual(orig_parted_disk.duplicate.call_count, 2)
+
+        # a working disk that is also the original one is not shared
+        dl = blivet.formats.disklabel.DiskLabel()
+        dl._parted_disk = dl._orig_parted_disk = mock.Mock(name="parted_disk")
+        new = copy.deepcopy(dl)
+        self.assertIsNot(new._orig_parted_disk, dl._orig_parted_disk)
+        self.assertFalse(new._orig_parted_disk_shared)
+
+    def test_layout_cache(self):
+        dl = blivet.formats.disklabel.DiskLabel()
+        parted_disk = dl._parted_disk = mock.Mock(name="parted_disk")
+        parted_disk.getFreeSpaceRegions.return_value = [mock.Mock(name="region")]
+
+        with patch.object(blivet.formats.disklabel.DiskLabel, "parted_device", new=mock.PropertyMock()):
+            # free regions are only read from parted once per layout
+            regions = dl.free_regions
+            self.assertEqual(list(regions), parted_disk.getFreeSpaceRegions.return_value)
+            self.assertIs(dl.free_regions, regions)
+            self.assertEqual(parted_disk.getFreeSpaceRegions.call_count, 1)
+
+            # removing a partition changes the layout
+            dl.remove_partition(mock.Mock(name="partition"))
+            self.assertIsNot(dl.free_regions, regions)
+            self.assertEqual(parted_disk.getFreeSpaceRegions.call_count, 2)
+
+            # so does replacing the parted disk
+            new_parted_disk = dl._parted_disk = mock.Mock(name="new_parted_disk")
+            new_parted_disk.getFreeSpaceRegions.return_value = []
+            self.assertEqual(dl.free_regions, ())
+            self.assertEqual(parted_disk.getFreeSpaceRegions.call_count, 2)
+            self.assertEqual(new_parted_disk.getFreeSpaceRegions.call_count, 1)
+
+            # copies do not share the cache
+            new_parted_disk.duplicate.return_value.getFreeSpaceRegions.return_value = []
+            new = copy.deepcopy(dl)
+            self.assertEqual(new.free_regions, ())
+            self.assertEqual(new._parted_disk.getFreeSpaceRegions.call_count, 1)
+            self.assertEqual(new_parted_disk.getFreeSpaceRegions.call_count, 1)
+
     @patch("blivet.formats.disklabel.arch")
     def test_best_label_type(self, arch):
         """
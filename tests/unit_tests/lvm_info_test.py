@@ -0,0 +1,204 @@
+try:
+    from unittest.mock import patch, Mock
+except ImportError:
+    from mock import patch, Mock
+
+import json
+import unittest
+
+from blivet.static_data import lvm_info
+from blivet.static_data.lvm_info import LVsInfo, PVsInfo, VGsInfo
+
+
+class LVMInfoTestCase(unittest.TestCase):
+
+    def test_lvs_vg_cache(self):
+        lvs = {"vg1": [Mock(vg_name="vg1", lv_name="lv1")],
+               "vg2": [Mock(vg_name="vg2", lv_name="lv1"), Mock(vg_name="vg2", lv_name="lv2")]}
+
+        info = LVsInfo()
+        with patch("blivet.static_data.lvm_info.blockdev.lvm") as lvm:
+            lvm.lvs.side_effect = lambda vg_name=None: lvs.get(vg_name, sum(lvs.values(), []))
+            self.assertEqual(sorted(info.cache.keys()), ["vg1-lv1", "vg2-lv1", "vg2-lv2"])
+            self.assertEqual(sorted(info.cache.keys()), ["vg1-lv1", "vg2-lv1", "vg2-lv2"])
+            self.assertEqual(info.stats, {"hits": 1, "misses": 1})
+
+            # only vg2 gets re-read
+            lvs["vg2"] = [Mock(vg_name="vg2", lv_name="lv3")]
+            info.drop_vg_cache("vg2")
+            self.assertEqual(sorted(info.cache.keys()), ["vg1-lv1", "vg2-lv3"])
+            lvm.lvs.assert_called_with("vg2")
+            self.assertEqual(info.stats, {"hits": 1, "misses": 2})
+
+            info.drop_cache()
+            info.drop_vg_cache("vg1")
+            self.assertEqual(sorted(info.cache.keys()), ["vg1-lv1", "vg2-lv3"])
+            lvm.lvs.assert_called_with()
+            self.assertEqual(info.stats, {"hits": 1, "misses": 3})
+
+    def test_pvs_vg_cache(self):
+        pv1 = Mock(pv_name="/dev/sda1", vg_name="vg1", vg_uuid="uuid1")
+        pv2 = Mock(pv_name="/dev/sdb1", vg_name="vg2", vg_uuid="uuid2")
+        pv3 = Mock(pv_name="/dev/sdc1", vg_name="", vg_uuid="")
+
+        info = PVsInfo()
+        with patch("blivet.static_data.lvm_info.blockdev.lvm") as lvm:
+            lvm.pvs.return_value = [pv1, pv2, pv3]
+            self.assertEqual(set(info.cache.values()), set([pv1, pv2, pv3]))
+
+            # pv3 was added to vg1
+            new_pv1 = Mock(pv_name="/dev/sda1", vg_name="vg1", vg_uuid="uuid1")
+            new_pv3 = Mock(pv_name="/dev/sdc1", vg_name="vg1", vg_uuid="uuid1")
+            lvm.pvinfo.side_effect = {"/dev/sda1": new_pv1, "/dev/sdc1": new_pv3}.get
+            info.drop_vg_cache("uuid1")
+            info.drop_pv_cache("/dev/sdc1")
+            self.assertEqual(info.cache, {"/dev/sda1": new_pv1, "/dev/sdb1": pv2, "/dev/sdc1": new_pv3})
+            self.assertEqual(lvm.pvs.call_count, 1)
+            self.assertEqual(lvm.pvinfo.call_count, 2)
+            self.assertEqual(info.stats, {"hits": 0, "misses": 3})
+
+    def test_vgs_vg_cache(self):
+        vg1 = Mock(uuid="uuid1")
+        vg1.name = "vg1"
+        vg2 = Mock(uuid="uuid2")
+        vg2.name = "vg2"
+
+        info = VGsInfo()
+        with patch("blivet.static_data.lvm_info.blockdev.lvm") as lvm:
+            lvm.vgs.return_value = [vg1, vg2]
+            self.assertEqual(info.cache, {"uuid1": vg1, "uuid2": vg2})
+
+            # vg2 was removed
+            lvm.vginfo.return_value = None
+            info.drop_vg_cache("vg2", "uuid2")
+            self.assertEqual(info.cache, {"uuid1": vg1})
+            lvm.vginfo.assert_called_once_with("vg2")
+            self.assertEqual(info.stats, {"hits": 0, "misses": 2})
+
+    def test_renamed_vg(self):
+        vg1 = Mock(uuid="uuid1")
+        vg1.name = "vg1"
+        lvs = {"vg1": [Mock(vg_name="vg1", lv_name="lv1")]}
+
+        with patch("blivet.static_data.lvm_info.blockdev.lvm") as lvm, \
+             patch.object(lvm_info, "lvs_info", LVsInfo()) as lvs_info, \
+             patch.object(lvm_info, "pvs_info", PVsInfo()), \
+             patch.object(lvm_info, "vgs_info", VGsInfo()) as vgs_info:
+            def get_lvs(vg_name=None):
+                if vg_name is None:
+                    return sum(lvs.values(), [])
+                if vg_name not in lvs:
+                    raise lvm_info.blockdev.LVMError("no such VG")
+                return lvs[vg_name]
+
+            lvm.vgs.return_value = [vg1]
+            lvm.pvs.return_value = []
+            lvm.lvs.side_effect = get_lvs
+            self.assertEqual(list(lvs_info.cache.keys()), ["vg1-lv1"])
+            self.assertEqual(list(vgs_info.cache.keys()), ["uuid1"])
+
+            # vg1 was renamed to vg2
+            lvs = {"vg2": [Mock(vg_name="vg2", lv_name="lv1")]}
+            lvm_info.drop_vg_cache("vg2", "uuid1")
+            self.assertEqual(list(lvs_info.cache.keys()), ["vg2-lv1"])
+
+
+class LVMFullReportTestCase(unittest.TestCase):
+
+    _report = {"report": [{"vg": [{"vg_name": "vg1", "vg_uuid": "vg1-uuid", "vg_size": "20967981056",
+                                   "vg_free": "16672948224", "vg_extent_size": "4194304",
+                                   "vg_extent_count": "4999", "vg_free_count": "3975", "pv_count": "1",
+                                   "vg_exported": "0", "vg_tags": ""}],
+                           "pv": [{"pv_name": "/dev/sda1", "pv_uuid": "pv1-uuid", "pv_free": "16672948224",
+                                   "pv_size": "20967981056", "pe_start": "1048576", "pv_tags": "",
+                                   "pv_missing": "0"}],
+                           "lv": [{"lv_name": "lv1", "lv_uuid": "lv1-uuid", "lv_size": "4294967296",
+                                   "lv_attr": "-wi-a-----", "segtype": "linear", "origin": "",
+                                   "pool_lv": "", "data_lv": "", "metadata_lv": "", "lv_role": "public",
+                                   "move_pv": "", "data_percent": "", "metadata_percent": "",
+                                   "copy_percent": "", "lv_tags": "tag1,tag2"},
+                                  {"lv_name": "pool", "lv_uuid": "pool-uuid", "lv_size": "1073741824",
+                                   "lv_attr": "twi-a-tz--", "segtype": "thin-pool", "origin": "",
+                                   "pool_lv": "", "data_lv": "[pool_tdata]", "metadata_lv": "[pool_tmeta]",
+                                   "lv_role": "private", "move_pv": "", "data_percent": "0.00",
+                                   "metadata_percent": "10.84", "copy_percent": "", "lv_tags": ""},
+                                  {"lv_name": "[pool_tdata]", "lv_uuid": "tdata-uuid", "lv_size": "1073741824",
+                                   "lv_attr": "Twi-ao----", "segtype": "linear", "origin": "",
+                                   "pool_lv": "", "data_lv": "", "metadata_lv": "",
+                                   "lv_role": "private,thin,pool,data", "move_pv": "", "data_percent": "",
+                                   "metadata_percent": "", "copy_percent": "", "lv_tags": ""},
+                                  {"lv_name": "[pool_tmeta]", "lv_uuid": "tmeta-uuid", "lv_size": "4194304",
+                                   "lv_attr": "ewi-ao----", "segtype": "linear", "origin": "",
+                                   "pool_lv": "", "data_lv": "", "metadata_lv": "",
+                                   "lv_role": "private,thin,pool,metadata", "move_pv": "", "data_percent": "",
+                                   "metadata_percent": "", "copy_percent": "", "lv_tags": ""},
+                                  {"lv_name": "[lvol0_pmspare]", "lv_uuid": "pmspare-uuid", "lv_size": "4194304",
+                                   "lv_attr": "ewi-------", "segtype": "linear", "origin": "",
+                                   "pool_lv": "", "data_lv": "", "metadata_lv": "",
+                                   "lv_role": "private,pool,spare", "move_pv": "", "data_percent": "",
+                                   "metadata_percent": "", "copy_percent": "", "lv_tags": ""}]},
+                          {"vg": [],
+                           "pv": [{"pv_name": "/dev/sdb", "pv_uuid": "pv2-uuid", "pv_free": "10737418240",
+                                   "pv_size": "10737418240", "pe_start": "1048576", "pv_tags": "",
+                                   "pv_missing": "0"}],
+                           "lv": []}]}
+
+    def setUp(self):
+        self.addCleanup(setattr, lvm_info, "_fullreport_usable", lvm_info._fullreport_usable)
+        lvm_info._fullreport_usable = True
+        lvm_info.request_fullreport()
+        self.addCleanup(setattr, lvm_info, "_fullreport_requested", False)
+        for info in (lvm_info.lvs_info, lvm_info.pvs_info, lvm_info.vgs_info):
+            info.drop_cache()
+            self.addCleanup(info.drop_cache)
+
+    @patch("blivet.static_data.lvm_info.blockdev.lvm")
+    def test_fullreport(self, lvm):
+        with patch("blivet.static_data.lvm_info.util.run_program_and_capture_output",
+                   return_value=(0, json.dumps(self._report))) as run:
+            lvs = lvm_info.lvs_info.cache
+            pvs = lvm_info.pvs_info.cache
+            vgs = lvm_info.vgs_info.cache
+            self.assertEqual(run.call_count, 1)
+
+        self.assertFalse(lvm.lvs.called or lvm.pvs.called or lvm.vgs.called)
+
+        self.assertIn("--all", run.call_args[0][0])
+        self.assertEqual(sorted(lvs.keys()), ["vg1-[lvol0_pmspare]", "vg1-[pool_tdata]", "vg1-[pool_tmeta]",
+                                              "vg1-lv1", "vg1-pool"])
+        self.assertEqual(lvs["vg1-pool"].data_lv, "[pool_tdata]")
+        self.assertEqual(lvs["vg1-pool"].metadata_lv, "[pool_tmeta]")
+        self.assertEqual(lvs["vg1-[pool_tdata]"].attr, "Twi-ao----")
+        self.assertEqual(lvs["vg1-[pool_tdata]"].lv_name, "[pool_tdata]")
+        self.assertEqual(lvs["vg1-lv1"].size, 4294967296)
+        self.assertEqual(lvs["vg1-lv1"].attr, "-wi-a-----")
+        self.assertEqual(lvs["vg1-lv1"].lv_tags, ["tag1", "tag2"])
+
+        self.assertEqual(sorted(pvs.keys()), ["/dev/sda1", "/dev/sdb"])
+        self.assertEqual(pvs["/dev/sda1"].vg_uuid, "vg1-uuid")
+        self.assertEqual(pvs["/dev/sda1"].vg_extent_count, 4999)
+        self.assertEqual(pvs["/dev/sdb"].vg_name, "")
+
+        self.assertEqual(list(vgs.keys()), ["vg1-uuid"])
+        self.assertEqual(vgs["vg1-uuid"].name, "vg1")
+        self.assertFalse(vgs["vg1-uuid"].exported)
+
+        # without a new request the caches are filled separately
+        lvm.lvs.return_value = []
+        lvm_info.lvs_info.drop_cache()
+        self.assertEqual(lvm_info.lvs_info.cache, {})
+        self.assertTrue(lvm.lvs.called)
+
+    @patch("blivet.static_data.lvm_info.blockdev.lvm")
+    def test_fullreport_fallback(self, lvm):
+        lvm.lvs.return_value = []
+        with patch("blivet.static_data.lvm_info.util.run_program_and_capture_output",
+                   return_value=(3, "")) as run:
+            self.assertEqual(lvm_info.lvs_info.cache, {})
+            lvm_info.lvs_info.drop_cache()
+            lvm_info.request_fullreport()
+            self.assertEqual(lvm_info.lvs_info.cache, {})
+
+            # the fullreport is not tried again after it failed
+            self.assertEqual(run.call_count, 1)
+            self.assertEqual(lvm.lvs.call_count, 2)
@@ -1,3 +1,6 @@
+import inspect
+import logging
+import six
 import unittest
 
 try:
@@ -8,6 +11,9 @@ except ImportError:
 import blivet
 
 from blivet.devices import PartitionDevice, DiskDevice, StorageDevice
+from blivet.flags import flags
+from blivet.storage_log import function_name_and_depth, log, log_method_call, log_method_return
+from blivet.threads import run_concurrently
 
 
 class SuggestNameTestCase(unittest.TestCase):
@@ -83,3 +89,121 @@ class SortDevicesTest(unittest.TestCase):
 
         self.assertEqual([d.name for d in bl.devices],
                          ["10", "nvme0n1", "sda"] + ["sda%d" % i for i in range(1, 12)] + ["sdb"])
+
+
+class RunConcurrentlyTest(unittest.TestCase):
+
+    def test_run_concurrently(self):
+        items = list(range(20))
+        self.assertEqual(run_concurrently(lambda x: x * 2, items, 4), [x * 2 for x in items])
+        self.assertEqual(run_concurrently(lambda x: x * 2, items, 1), [x * 2 for x in items])
+        self.assertEqual(run_concurrently(lambda x: x, [], 4), [])
+
+        def fail_odd(x):
+            if x % 2:
+                raise ValueError(x)
+            return x
+
+        with six.assertRaisesRegex(self, ValueError, "^1$"):
+            run_concurrently(fail_odd, items, 4)
+
+
+class LazyPluginTest(unittest.TestCase):
+
+    @patch("blivet._failed_plugins", new_callable=set)
+    @patch("blivet._loaded_plugins", new_callable=set)
+    @patch("blivet._tried_plugins", new_callable=set)
+    @patch("blivet.blockdev")
+    def test_lazy_plugin(self, bd, *args):  # pylint: disable=unused-argument
+        bd.plugin_specs_from_names.side_effect = sorted
+        bd.try_reinit.return_value = (True, ["lvm"])
+        functions = Mock()
+        lvm = blivet._LazyPlugin("lvm", functions)
+
+        # the plugin is loaded when one of its functions is first used
+        self.assertEqual(bd.try_reinit.call_count, 0)
+        lvm.pvs()
+        functions.pvs.assert_called_once_with()
+        self.assertEqual(bd.try_reinit.call_count, 1)
+        self.assertEqual(bd.try_reinit.call_args[1]["require_plugins"], ["lvm"])
+
+        lvm.vgs()
+        self.assertEqual(bd.try_reinit.call_count, 1)
+
+        # loaded plugins are requested again along with the new ones and
+        # plugins that failed to load are not tried again
+        self.assertEqual(blivet.load_plugins(["lvm", "btrfs"]), set(["lvm"]))
+        self.assertEqual(bd.try_reinit.call_args[1]["require_plugins"], ["btrfs", "lvm"])
+        self.assertEqual(blivet._failed_plugins, set(["btrfs"]))
+        blivet.load_plugins(["btrfs"])
+        self.assertEqual(bd.try_reinit.call_count, 2)
+
+    @patch("blivet.load_plugins")
+    def test_plugin_names(self, load_plugins):
+        names = set(["lvm"])
+        plugs = blivet._PluginNames(names)
+        self.assertFalse(load_plugins.called)
+
+        # reading the names loads the default plugins first
+        self.assertIn("lvm", plugs)
+        load_plugins.assert_called_once_with()
+        self.assertEqual(plugs, set(["lvm"]))
+        self.assertEqual(plugs | set(["btrfs"]), set(["lvm", "btrfs"]))
+        names.add("btrfs")
+        self.assertEqual(sorted(plugs), ["btrfs", "lvm"])
+
+
+class StorageLogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.addCleanup(setattr, flags, "debug", flags.debug)
+        self.addCleanup(setattr, flags, "debug_sample_rate", flags.debug_sample_rate)
+        self.addCleanup(log.setLevel, log.level)
+        log.setLevel(logging.DEBUG)
+
+    def test_function_name_and_depth(self):
+        def log_method_call():  # pylint: disable=redefined-outer-name
+            return function_name_and_depth()
+
+        self.assertEqual(log_method_call(), ("test_function_name_and_depth", len(inspect.stack())))
+
+    @patch.object(log, "debug")
+    def test_log_method_call(self, debug):
+        flags.debug = False
+        log_method_call(self, "arg", password="secret")
+        log_method_return(self, None)
+        self.assertFalse(debug.called)
+
+        flags.debug = True
+        log_method_call(self, "arg", password="secret")
+        self.assertEqual(debug.call_args[0][1:], (" " * len(inspect.stack()), "StorageLogTest",
+                                                  "test_log_method_call", "arg", "password", "Skipped"))
+        log_method_return(self, "retval")
+        self.assertEqual(debug.call_args[0][-1], "retval")
+        self.assertEqual(debug.call_count, 2)
+
+        # only every n-th call is logged when sampling, together with its return
+        debug.reset_mock()
+        flags.debug_sample_rate = 4
+        for _i in range(8):
+            log_method_call(self)
+            log_method_return(self, None)
+        self.assertEqual(debug.call_count, 4)
+        self.assertEqual([c[0][0].endswith("returned %s") for c in debug.call_args_list],
+                         [False, True, False, True])
+
+        # nested calls do not get their returns mixed up
+        def nested():
+            log_method_call(self)
+            log_method_return(self, None)
+
+        debug.reset_mock()
+        for _i in range(8):
+            log_method_call(self)
+            nested()
+            log_method_return(self, None)
+        self.assertEqual(debug.call_count, 8)
+        logged = [(c[0][3], c[0][0].endswith("returned %s")) for c in debug.call_args_list]
+        for i in range(0, 8, 2):
+            self.assertEqual(logged[i][0], logged[i + 1][0])
+            self.assertEqual((logged[i][1], logged[i + 1][1]), (False, True))
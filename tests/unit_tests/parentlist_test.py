@@ -78,3 +78,33 @@ class ParentListTestCase(unittest.TestCase):
 
         dev3.parents = []
         self.assertEqual(len(dev3.parents), 0)
+
+    def test_device_ancestors(self):
+        """ Verify that Device.depends_on follows changes of the parent lists. """
+        dev1 = Device("dev1")
+        dev2 = Device("dev2")
+        dev3 = Device("dev3", [dev1])
+        dev4 = Device("dev4", [dev3])
+
+        self.assertTrue(dev4.depends_on(dev3))
+        self.assertTrue(dev4.depends_on(dev1))
+        self.assertFalse(dev4.depends_on(dev2))
+        self.assertFalse(dev1.depends_on(dev4))
+        self.assertEqual(set(dev4.ancestors), set([dev1, dev3, dev4]))
+
+        # changes to the parents of an ancestor are reflected in its descendants
+        dev3.parents.append(dev2)
+        self.assertTrue(dev4.depends_on(dev2))
+        dev3.parents.remove(dev1)
+        self.assertFalse(dev4.depends_on(dev1))
+        self.assertEqual(set(dev4.ancestors), set([dev2, dev3, dev4]))
+
+        dev3.parents = []
+        self.assertFalse(dev4.depends_on(dev2))
+        self.assertEqual(set(dev4.ancestors), set([dev3, dev4]))
+
+        # a parent list forming a cycle doesn't make the lookup loop forever
+        dev1.parents.append(dev4)
+        dev3.parents.append(dev1)
+        self.assertTrue(dev4.depends_on(dev4))
+        self.assertEqual(set(dev4.ancestors), set([dev1, dev3, dev4]))
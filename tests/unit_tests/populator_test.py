@@ -4,7 +4,11 @@ except ImportError:
     from mock import call, patch, sentinel, Mock, PropertyMock
 
 import gi
+import os
+import shutil
 import six
+import tempfile
+import time
 import unittest
 
 gi.require_version("BlockDev", "2.0")
@@ -16,6 +20,7 @@ from blivet.devices import PartitionDevice, StorageDevice, NVDIMMNamespaceDevice
 from blivet.devices import NVMeNamespaceDevice, NVMeFabricsNamespaceDevice
 from blivet.devicelibs import lvm
 from blivet.devicetree import DeviceTree
+from blivet.errors import LUKSError
 from blivet.formats import get_device_format_class, get_format, DeviceFormat
 from blivet.formats.disklabel import DiskLabel
 from blivet.populator.helpers import DiskDevicePopulator, DMDevicePopulator, LoopDevicePopulator
@@ -28,6 +33,8 @@ from blivet.populator.helpers.boot import AppleBootFormatPopulator, EFIFormatPop
 from blivet.populator.helpers.formatpopulator import FormatPopulator
 from blivet.populator.helpers.disklabel import DiskLabelFormatPopulator
 from blivet.size import Size
+from blivet.static_data.luks_data import LUKS_Data
+from blivet.static_data.probe_cache import ProbeCache
 
 
 class PopulatorHelperTestCase(unittest.TestCase):
@@ -1295,6 +1302,214 @@ class MDFormatPopulatorTestCase(FormatPopulatorTestCase):
             self.assertEqual(array.name, array_name)
 
 
+class ProbeCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.dev_path = os.path.join(self.tmpdir, "sda1")
+        with open(self.dev_path, "wb") as f:
+            f.write(b"\0" * 4096)
+
+        self.info = {"SYS_PATH": "/sys/devices/sda/sda1", "DEVNAME": self.dev_path,
+                     "ID_SERIAL": "disk-1", "ID_PART_ENTRY_NUMBER": "1"}
+        patcher = patch("blivet.static_data.probe_cache.flags.probe_cache_path",
+                        os.path.join(self.tmpdir, "probes.json"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch.object(MDFormatPopulator, "_examine")
+    def test_probe_cache(self, examine):
+        md_info = {"uuid": "3386ff85:f5012621:4a435f06:1eb47236", "level": "raid1",
+                   "num_devices": 2, "metadata": "1.2", "device": "/dev/md/test"}
+        examine.return_value = md_info
+
+        # the first run has to probe the device
+        cache = ProbeCache()
+        self.assertEqual(cache.probe(MDFormatPopulator, self.info), md_info)
+        self.assertEqual(examine.call_count, 1)
+        cache.save()
+
+        # the next run reuses the saved result
+        cache = ProbeCache()
+        self.assertEqual(cache.probe(MDFormatPopulator, self.info), md_info)
+        self.assertEqual(examine.call_count, 1)
+        self.assertEqual(cache.hits, 1)
+
+        # helpers that are not cacheable always probe
+        with patch.object(FormatPopulator, "probe", return_value=sentinel.result) as probe:
+            self.assertEqual(cache.probe(FormatPopulator, self.info), sentinel.result)
+            self.assertEqual(probe.call_count, 1)
+        cache.save()
+
+        # entries used since the last reset are kept by all following saves
+        cache = ProbeCache()
+        cache.reset()
+        cache.probe(MDFormatPopulator, self.info)
+        cache.save()
+        cache.save()
+        cache = ProbeCache()
+        cache.probe(MDFormatPopulator, self.info)
+        self.assertEqual(cache.hits, 1)
+
+        # entries not used since the last reset are dropped
+        cache.reset()
+        cache.save()
+        cache = ProbeCache()
+        cache.probe(MDFormatPopulator, self.info)
+        self.assertEqual(cache.hits, 0)
+        self.assertEqual(examine.call_count, 2)
+        cache.save()
+
+        # a change of the device's metadata invalidates the entry
+        with open(self.dev_path, "r+b") as f:
+            f.write(b"\1")
+
+        cache = ProbeCache()
+        self.assertEqual(cache.probe(MDFormatPopulator, self.info), md_info)
+        self.assertEqual(examine.call_count, 3)
+        cache.save()
+
+        # so does a different device at the same place
+        info = dict(self.info, ID_SERIAL="disk-2")
+        cache = ProbeCache()
+        cache.probe(MDFormatPopulator, info)
+        self.assertEqual(examine.call_count, 4)
+
+        # an unusable cache file is ignored
+        with open(os.path.join(self.tmpdir, "probes.json"), "w") as f:
+            f.write("garbage")
+
+        cache = ProbeCache()
+        cache.probe(MDFormatPopulator, self.info)
+        self.assertEqual(examine.call_count, 5)
+
+        # without a cache path, the cache is not used at all
+        with patch("blivet.static_data.probe_cache.flags.probe_cache_path", None):
+            cache = ProbeCache()
+            cache.probe(MDFormatPopulator, self.info)
+            cache.save()
+            self.assertEqual(examine.call_count, 6)
+
+    @patch("blivet.populator.populator.flags.populate_workers", 4)
+    @patch("blivet.populator.populator.get_probe_helpers", return_value=[MDFormatPopulator])
+    @patch("blivet.populator.populator.probe_cache")
+    @patch("blivet.populator.populator.udev.get_devices")
+    def test_probe_order(self, get_devices, probe_cache, _get_probe_helpers):
+        devices = [{"SYS_PATH": "/sys/devices/sd%s" % c, "SYS_NAME": "sd%s" % c, "DEVNAME": "/dev/sd%s" % c}
+                   for c in "abcd"]
+        get_devices.return_value = devices
+
+        # the probes of the later devices finish first
+        def probe(helper_class, info):
+            time.sleep(0.05 * (len(devices) - devices.index(info)))
+            finished.append(info["DEVNAME"])
+            return (helper_class, info["DEVNAME"])
+        finished = []
+        probe_cache.probe.side_effect = probe
+
+        devicetree = DeviceTree()
+        handled = []
+
+        def handle_device(info, update_orig_fmt=False):  # pylint: disable=unused-argument
+            handled.append(devicetree._pop_probe_result(MDFormatPopulator, info))
+
+        with patch.object(devicetree, "handle_device", side_effect=handle_device):
+            devicetree._scan_new_devices(set())
+
+        self.assertEqual(finished, ["/dev/sdd", "/dev/sdc", "/dev/sdb", "/dev/sda"])
+        # the devices are handled in order, each with its own result
+        self.assertEqual(handled, [(MDFormatPopulator, d["DEVNAME"]) for d in devices])
+
+
+class LUKSSetupTestCase(unittest.TestCase):
+
+    def _luks_device(self, uuid, passphrase):
+        fmt = Mock(uuid=uuid, passphrase=None, map_name="luks-%s" % uuid, device="/dev/%s" % uuid,
+                   status=False)
+
+        def setup():
+            if fmt.status:
+                return
+            if fmt.passphrase != passphrase:
+                raise LUKSError("wrong passphrase")
+            fmt.status = True
+        fmt.setup.side_effect = setup
+        self._passphrases[fmt.device] = (fmt, passphrase)
+        return Mock(format=fmt)
+
+    def _luks_open(self, path, _map_name, passphrase=None):
+        (fmt, correct) = self._passphrases[path]
+        if passphrase != correct:
+            raise self.bd.BlockDevError("wrong passphrase")
+        fmt.status = True
+
+    def setUp(self):
+        self._passphrases = {}
+        patcher = patch("blivet.populator.helpers.luks.blockdev")
+        self.bd = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.bd.BlockDevError = type("BlockDevError", (Exception,), {})
+        self.bd.CryptoError = type("CryptoError", (self.bd.BlockDevError,), {})
+        self.bd.crypto.luks_open.side_effect = self._luks_open
+
+    def test_sort_passphrases(self):
+        data = LUKS_Data()
+        self.assertEqual(data.sort_passphrases("uuid1", ["a", "b", None, "a", "c"]), ["a", "b", "c"])
+
+        data.remember_passphrase("uuid1", "c")
+        self.assertEqual(data.sort_passphrases("uuid1", ["a", "b", "c"]), ["c", "a", "b"])
+        self.assertEqual(data.sort_passphrases("uuid2", ["a", "b", "c"]), ["a", "b", "c"])
+
+        # the hints survive resets, the passphrases do not
+        data.reset()
+        self.assertEqual(data.passphrases, [])
+        self.assertEqual(data.sort_passphrases("uuid1", ["b", "c"]), ["c", "b"])
+
+    @patch("blivet.populator.populator.luks_data", new_callable=LUKS_Data)
+    @patch("blivet.populator.populator.crypto.calculate_luks_open_workers", return_value=4)
+    @patch("blivet.populator.populator.flags.populate_workers", 8)
+    def test_run_luks_setups(self, open_workers, luks_data):
+        devicetree = DeviceTree()
+        passphrases = ["p%d" % i for i in range(4)]
+
+        devices = [self._luks_device("uuid%d" % i, passphrases[i % 4]) for i in range(8)]
+        devicetree._luks_setups = []
+        for device in devices:
+            devicetree.setup_luks_format(device, passphrases)
+        self.assertFalse(any(d.format.setup.called for d in devices))
+        self.assertFalse(self.bd.crypto.luks_open.called)
+
+        devicetree._run_luks_setups(devicetree._luks_setups)
+        open_workers.assert_called_once_with(8)
+        self.assertTrue(all(d.format.status for d in devices))
+        self.assertEqual([d.format.passphrase for d in devices], [passphrases[i % 4] for i in range(8)])
+        # the failed attempts with the wrong passphrases and the successful one
+        self.assertEqual(self.bd.crypto.luks_open.call_count, 2 * (1 + 2 + 3 + 4))
+        # the formats are only updated in the end
+        self.assertTrue(all(d.format.setup.call_count == 1 for d in devices))
+
+        # the passphrase that worked is tried first after a reset
+        self.bd.crypto.luks_open.reset_mock()
+        devices = [self._luks_device("uuid%d" % i, passphrases[i % 4]) for i in range(8)]
+        devicetree._run_luks_setups([(d, passphrases) for d in devices])
+        self.assertTrue(all(d.format.status for d in devices))
+        self.assertEqual(self.bd.crypto.luks_open.call_count, 8)
+
+        # formats no passphrase opens are left alone
+        devices = [self._luks_device("uuid%d" % i, "other") for i in range(2)]
+        devicetree._run_luks_setups([(d, passphrases) for d in devices])
+        self.assertFalse(any(d.format.status for d in devices))
+        self.assertEqual([d.format.passphrase for d in devices], [None, None])
+
+        # outside of a batch, the setup is not postponed
+        devicetree._luks_setups = None
+        device = self._luks_device("uuid0", "p0")
+        with patch("blivet.populator.helpers.luks.luks_data", new_callable=LUKS_Data):
+            devicetree.setup_luks_format(device, passphrases)
+        self.assertTrue(device.format.status)
+
+
 class FakePartedPart(object):
     """Fake parted_partition for testing the parted partition name
     matching stuff. Has to provide size also.
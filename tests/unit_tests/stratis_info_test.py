@@ -0,0 +1,146 @@
+try:
+    from unittest.mock import patch, Mock
+except ImportError:
+    from mock import patch, Mock
+
+import unittest
+
+from blivet.size import Size
+from blivet.static_data.stratis_info import StratisInfo
+from blivet.static_data.stratis_info import STRATIS_POOL_INTF, STRATIS_FILESYSTEM_INTF, STRATIS_BLOCKDEV_INTF
+
+POOL_PATH = "/org/storage/stratis3/pool/1"
+FS_PATH = "/org/storage/stratis3/filesystem/1"
+BD_PATH = "/org/storage/stratis3/blockdev/1"
+BD_UUID = "ff4b7a4d-8f2c-4fbb-8d5c-b1a6d41f9a36"
+
+
+def _objects():
+    return {POOL_PATH: {STRATIS_POOL_INTF: {"Name": "pool1", "Uuid": "pool-uuid", "Encrypted": False,
+                                            "TotalPhysicalSize": "8589934592",
+                                            "TotalPhysicalUsed": (True, "536870912")}},
+            FS_PATH: {STRATIS_FILESYSTEM_INTF: {"Name": "fs1", "Uuid": "fs-uuid", "Pool": POOL_PATH,
+                                                "Used": (True, "1048576")}},
+            BD_PATH: {STRATIS_BLOCKDEV_INTF: {"Devnode": "/dev/sda", "Uuid": BD_UUID, "Pool": POOL_PATH}}}
+
+
+@patch.object(StratisInfo, "_watch")
+@patch("blivet.static_data.stratis_info.safe_dbus")
+class StratisInfoTestCase(unittest.TestCase):
+
+    def _info(self, safe_dbus):
+        safe_dbus.check_object_available.return_value = True
+        safe_dbus.call_sync.side_effect = lambda *args: (_objects(),)
+        safe_dbus.get_property_sync.return_value = ({},)
+        return StratisInfo()
+
+    def test_managed_objects(self, safe_dbus, _watch):
+        info = self._info(safe_dbus)
+
+        self.assertEqual(list(info.pools.keys()), ["pool-uuid"])
+        pool = info.pools["pool-uuid"]
+        self.assertEqual(pool.name, "pool1")
+        self.assertEqual(pool.physical_size, Size("8 GiB"))
+        self.assertEqual(pool.physical_used, Size("512 MiB"))
+        self.assertEqual(info.filesystems["fs-uuid"].pool_name, "pool1")
+        self.assertEqual(info.filesystems["fs-uuid"].used_size, Size("1 MiB"))
+        self.assertEqual(info.blockdevs[BD_UUID].pool_uuid, "pool-uuid")
+        self.assertEqual(info.locked_pools, [])
+
+        # everything comes from the GetManagedObjects call
+        self.assertEqual(safe_dbus.call_sync.call_count, 1)
+        self.assertEqual(safe_dbus.get_properties_sync.call_count, 0)
+
+        # incomplete properties are requested again
+        objects = _objects()
+        del objects[FS_PATH][STRATIS_FILESYSTEM_INTF]["Pool"]
+        safe_dbus.call_sync.side_effect = lambda *args: (objects,)
+        safe_dbus.get_properties_sync.return_value = (_objects()[FS_PATH][STRATIS_FILESYSTEM_INTF],)
+        info.drop_cache()
+        self.assertEqual(info.filesystems["fs-uuid"].pool_name, "pool1")
+        safe_dbus.get_properties_sync.assert_called_once_with("org.storage.stratis3", FS_PATH,
+                                                              STRATIS_FILESYSTEM_INTF)
+
+        # and kept
+        info.properties_changed(POOL_PATH, STRATIS_POOL_INTF, {"Name": "pool2"}, [])
+        self.assertEqual(info.filesystems["fs-uuid"].pool_name, "pool2")
+        self.assertEqual(safe_dbus.get_properties_sync.call_count, 1)
+
+    def test_signals(self, safe_dbus, _watch):
+        info = self._info(safe_dbus)
+        self.assertEqual(len(info.filesystems), 1)
+
+        def signal(path, interface, name, *args):
+            info._on_signal(None, "org.storage.stratis3", path, interface, name,
+                            Mock(unpack=Mock(return_value=args)), None)
+
+        # new filesystem
+        fs2 = {"Name": "fs2", "Uuid": "fs2-uuid", "Pool": POOL_PATH, "Used": (True, "0")}
+        signal("/org/storage/stratis3", "org.freedesktop.DBus.ObjectManager", "InterfacesAdded",
+               FS_PATH + "2", {STRATIS_FILESYSTEM_INTF: fs2})
+        self.assertEqual(sorted(info.filesystems.keys()), ["fs-uuid", "fs2-uuid"])
+        self.assertEqual(info.filesystems["fs2-uuid"].pool_uuid, "pool-uuid")
+
+        # renamed pool
+        signal(POOL_PATH, "org.freedesktop.DBus.Properties", "PropertiesChanged",
+               STRATIS_POOL_INTF, {"Name": "pool2"}, [])
+        self.assertEqual(info.pools["pool-uuid"].name, "pool2")
+        self.assertEqual(info.filesystems["fs2-uuid"].pool_name, "pool2")
+
+        # removed filesystem
+        signal("/org/storage/stratis3", "org.freedesktop.DBus.ObjectManager", "InterfacesRemoved",
+               FS_PATH, [STRATIS_FILESYSTEM_INTF])
+        self.assertEqual(list(info.filesystems.keys()), ["fs2-uuid"])
+
+        # no further DBus calls were needed
+        self.assertEqual(safe_dbus.call_sync.call_count, 1)
+        self.assertEqual(safe_dbus.get_properties_sync.call_count, 0)
+
+        # objects created by blivet are added right away
+        pool = dict(_objects()[POOL_PATH][STRATIS_POOL_INTF], Name="pool3", Uuid="pool3-uuid")
+        safe_dbus.get_properties_sync.return_value = (pool,)
+        info.update_objects([(POOL_PATH + "3", STRATIS_POOL_INTF)])
+        self.assertEqual(sorted(info.pools.keys()), ["pool-uuid", "pool3-uuid"])
+
+        # objects the signals have not told about yet are got again
+        info._watch_connection = Mock()
+        info.refresh(pools=["pool3-uuid"])
+        self.assertEqual(safe_dbus.call_sync.call_count, 1)
+        info.refresh(pools=["pool-uuid"], filesystems=["fs-uuid"])
+        self.assertEqual(sorted(info.pools.keys()), ["pool-uuid"])
+        self.assertEqual(sorted(info.filesystems.keys()), ["fs-uuid"])
+        self.assertEqual(safe_dbus.call_sync.call_count, 2)
+        info._watch_connection = None
+
+        # without the signals, refresh drops the cache
+        info.update_objects([(POOL_PATH + "3", STRATIS_POOL_INTF)])
+        info.refresh()
+        self.assertEqual(sorted(info.pools.keys()), ["pool-uuid"])
+        self.assertEqual(safe_dbus.call_sync.call_count, 3)
+
+    def test_service_started(self, safe_dbus, _watch):
+        info = self._info(safe_dbus)
+
+        # stratisd is not running when the cache is first filled
+        safe_dbus.DBusCallError = type("DBusCallError", (Exception,), {})
+        safe_dbus.check_object_available.side_effect = safe_dbus.DBusCallError
+        self.assertEqual(info.pools, {})
+        self.assertEqual(safe_dbus.call_sync.call_count, 0)
+
+        # then it is started and a pool is created
+        safe_dbus.check_object_available.side_effect = None
+        info.update_objects([(POOL_PATH, STRATIS_POOL_INTF)])
+        self.assertEqual(sorted(info.pools.keys()), ["pool-uuid"])
+        self.assertEqual(safe_dbus.call_sync.call_count, 1)
+
+        # the same goes for removals and refreshes with the signals watched
+        for update in (lambda: info.interfaces_removed(FS_PATH, [STRATIS_FILESYSTEM_INTF]),
+                       lambda: info.refresh(pools=["pool-uuid"])):
+            info._watch_connection = Mock()
+            info.drop_cache()
+            safe_dbus.check_object_available.side_effect = safe_dbus.DBusCallError
+            self.assertEqual(info.pools, {})
+            safe_dbus.check_object_available.side_effect = None
+            update()
+            self.assertEqual(sorted(info.pools.keys()), ["pool-uuid"])
+        info._watch_connection = None
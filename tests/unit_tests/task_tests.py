@@ -1,5 +1,13 @@
+import os
+import shutil
+import tempfile
 import unittest
 
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
 import blivet.tasks.task as task
 import blivet.tasks.availability as availability
 
@@ -32,6 +40,90 @@ class ResourceTestCase(unittest.TestCase):
         self.assertTrue(available_resource.available)
 
 
+class VersionCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.app_path = os.path.join(self.tmpdir, "mkfs.test")
+        with open(self.app_path, "w") as f:
+            f.write("#!/bin/sh\n")
+
+        patchers = [patch("blivet.tasks.availability.flags.availability_cache_path",
+                          os.path.join(self.tmpdir, "availability.json")),
+                    patch("blivet.tasks.availability.shutil.which", return_value=self.app_path),
+                    patch("blivet.tasks.availability._version_cache", availability._VersionCache())]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _app(self, required_version="1.0"):
+        info = availability.AppVersionInfo(app_name="mkfs.test", required_version=required_version,
+                                           version_opt="-V", version_regex=r"mkfs.test ([0-9\.]+)")
+        return availability.application_by_version("mkfs.test", availability.VersionMethod(info))
+
+    @patch("blivet.tasks.availability.blockdev.utils.check_util_version", return_value=False)
+    def test_version_cache(self, check_util_version):
+        self.assertFalse(self._app().available)
+        self.assertEqual(check_util_version.call_count, 1)
+
+        # another process can use the result of the previous check
+        with patch("blivet.tasks.availability._version_cache", availability._VersionCache()):
+            app = self._app()
+            self.assertFalse(app.available)
+            self.assertIn("installed version of mkfs.test is less than required version 1.0",
+                          app.availability_errors)
+            self.assertEqual(check_util_version.call_count, 1)
+
+        # the check has to run again when the application changes
+        os.utime(self.app_path, (0, 0))
+        check_util_version.return_value = True
+        with patch("blivet.tasks.availability._version_cache", availability._VersionCache()):
+            self.assertTrue(self._app().available)
+            self.assertEqual(check_util_version.call_count, 2)
+
+        # the cache is not used without a path
+        with patch("blivet.tasks.availability.flags.availability_cache_path", None):
+            self.assertTrue(self._app().available)
+            self.assertEqual(check_util_version.call_count, 3)
+
+        # nor if availability is not to be cached
+        with patch("blivet.tasks.availability.CACHE_AVAILABILITY", False):
+            self.assertTrue(self._app().available)
+            self.assertEqual(check_util_version.call_count, 4)
+
+    @patch("blivet.tasks.availability.blockdev.utils.check_util_version", return_value=True)
+    def test_version_cache_merge(self, check_util_version):
+        cache = availability._VersionCache()
+        self.assertIsNone(cache.get(availability.AppVersionInfo("mkfs.test", "1.0", "-V", "")))
+
+        # another process saves its result in the meantime
+        self.assertTrue(self._app("2.0").available)
+
+        with patch("blivet.tasks.availability._version_cache", cache):
+            self.assertTrue(self._app("1.0").available)
+        self.assertEqual(check_util_version.call_count, 2)
+
+        # both results are kept
+        with patch("blivet.tasks.availability._version_cache", availability._VersionCache()):
+            self.assertTrue(self._app("1.0").available)
+            self.assertTrue(self._app("2.0").available)
+        self.assertEqual(check_util_version.call_count, 2)
+
+    @patch("blivet.tasks.availability.blockdev.utils.check_util_version", return_value=True)
+    def test_prefetch(self, check_util_version):
+        apps = [self._app() for _i in range(4)] + [self._app("2.0")]
+        unavailable = availability.unavailable_resource("unavailable")
+        with patch("blivet.tasks.availability.os.rename", wraps=os.rename) as rename:
+            availability.prefetch_availability(apps + [unavailable, unavailable], max_workers=3)
+        self.assertEqual(check_util_version.call_count, 2)
+        # the cache is saved once
+        self.assertEqual(rename.call_count, 1)
+        for app in apps:
+            self.assertEqual(app._availability_errors, [])
+        self.assertNotEqual(unavailable._availability_errors, [])
+
+
 class TasksTestCase(unittest.TestCase):
 
     def test_availability(self):
@@ -51,3 +51,26 @@ class TopologicalSortTestCase(unittest.TestCase):
         # verify that all ordering constraints are satisfied
         self.assertTrue(check_order(order, graph),
                         "ordering constraints not satisfied")
+
+    def test_ranks(self):
+        # higher ranks come first unless an explicit edge says otherwise
+        items = [1, 2, 3, 4, 5]
+        ranks = {1: 10, 2: 100, 3: None, 4: 100, 5: 10}
+        edges = [(3, 4)]
+        graph = blivet.tsort.create_graph(items, edges, ranks=ranks)
+        order = blivet.tsort.tsort(graph)
+        self.assertEqual(len(order), len(items))
+        self.assertLess(order.index(3), order.index(4))
+        for high in (2, 4):
+            for low in (1, 5):
+                self.assertLess(order.index(high), order.index(low))
+
+        # the result matches a sort of the same graph with explicit edges
+        explicit = sorted(set(edges + [(h, l) for h in (2, 4) for l in (1, 5)]))
+        graph = blivet.tsort.create_graph(items, explicit)
+        self.assertEqual(blivet.tsort.tsort(graph), order)
+
+        # an explicit edge from a lower rank to a higher rank is a cycle
+        graph = blivet.tsort.create_graph(items, [(1, 2)], ranks=ranks)
+        with self.assertRaises(blivet.tsort.CyclicGraphError):
+            blivet.tsort.tsort(graph)
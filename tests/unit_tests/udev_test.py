@@ -127,3 +127,155 @@ class UdevGetNameRaidTest(unittest.TestCase):
     def test_raid_name_on_part_old_metadata(self):
         data = raid_data.RaidOnPartition2()
         self._test_raid_name(data)
+
+
+class UdevSnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        import blivet.udev
+        from blivet.flags import flags
+        self.addCleanup(blivet.udev.drop_snapshot)
+        self.addCleanup(setattr, flags, "uevents", flags.uevents)
+        flags.uevents = True
+
+    def _info(self, name, **kwargs):
+        info = dict(SYS_NAME=name, SYS_PATH="/sys/block/%s" % name, DEVNAME="/dev/%s" % name)
+        info.update(kwargs)
+        return info
+
+    def test_resolve(self):
+        import blivet.udev
+        devices = [self._info("sda", DEVLINKS="/dev/disk/by-id/disk1 /dev/disk/by-label/sdb", MAJOR="8", MINOR="0"),
+                   self._info("sdb", ID_FS_LABEL="data", ID_FS_UUID="1234"),
+                   self._info("sdc", ID_FS_LABEL="data")]
+        blivet.udev._set_snapshot(blivet.udev.UdevSnapshot(devices))
+
+        with mock.patch("blivet.udev.get_devices") as get_devices:
+            self.assertEqual(blivet.udev.resolve_devspec("LABEL=data"), "sdb")
+            self.assertEqual(blivet.udev.resolve_devspec("UUID=1234"), "sdb")
+            self.assertEqual(blivet.udev.resolve_devspec("/dev/sdc"), "sdc")
+            self.assertEqual(blivet.udev.resolve_devspec("/dev/disk/by-id/disk1"), "sda")
+            self.assertIsNone(blivet.udev.resolve_devspec("tmpfs"))
+
+            # the first device matching by name or symlink wins
+            self.assertEqual(blivet.udev.resolve_devspec("disk/by-label/sdb"), "sda")
+
+            self.assertEqual(blivet.udev.resolve_glob("sd[ab]"), ["sda", "sdb"])
+            self.assertFalse(get_devices.called)
+
+        # uevents update the snapshot
+        blivet.udev.update_snapshot(mock.Mock(action="remove", sys_name="sdb", sys_path="/sys/block/sdb"))
+        self.assertEqual(blivet.udev.resolve_devspec("LABEL=data"), "sdc")
+
+        device = mock.Mock(action="add", sys_name="sdd", sys_path="/sys/block/sdd",
+                           properties=dict(DEVNAME="/dev/sdd", ID_FS_UUID="1234"))
+        blivet.udev.update_snapshot(device)
+        self.assertEqual(blivet.udev.resolve_devspec("UUID=1234"), "sdd")
+
+        # settling drops it
+        with mock.patch("blivet.udev.util"), mock.patch("blivet.udev.running_in_chroot", return_value=False):
+            blivet.udev.settle()
+        self.assertIsNone(blivet.udev._snapshot)
+
+    def test_no_uevents(self):
+        import blivet.udev
+        from blivet.flags import flags
+        flags.uevents = False
+
+        # without uevents nothing keeps the snapshot current, so it is not kept
+        devices = [self._info("sda", ID_FS_LABEL="data")]
+        with mock.patch("blivet.udev.global_udev") as global_udev, \
+                mock.patch("blivet.udev.device_to_dict", side_effect=lambda d: devices.pop(0)), \
+                mock.patch("blivet.udev.settle"):
+            global_udev.list_devices.side_effect = lambda **kwargs: [mock.Mock(sys_name="sda")]
+            self.assertEqual(blivet.udev.resolve_devspec("LABEL=data"), "sda")
+            self.assertIsNone(blivet.udev._snapshot)
+
+            # e.g. relabeled by mkfs
+            devices.append(self._info("sda", ID_FS_LABEL="new"))
+            self.assertIsNone(blivet.udev.resolve_devspec("LABEL=data"))
+            devices.append(self._info("sda", ID_FS_LABEL="new"))
+            self.assertEqual(blivet.udev.resolve_devspec("LABEL=new"), "sda")
+
+    def test_snapshot_kept(self):
+        import blivet.udev
+        from blivet.flags import flags
+        flags.uevents = False
+
+        devices = [self._info("sda", ID_FS_LABEL="data"), self._info("sdb")]
+        with mock.patch("blivet.udev.global_udev") as global_udev, \
+                mock.patch("blivet.udev.device_to_dict", side_effect=lambda d: dict(devices[int(d.sys_name)])), \
+                mock.patch("blivet.udev.settle"):
+            global_udev.list_devices.side_effect = lambda **kwargs: [mock.Mock(sys_name="0"), mock.Mock(sys_name="1")]
+
+            with blivet.udev.snapshot_kept():
+                with blivet.udev.snapshot_kept():
+                    self.assertEqual(blivet.udev.resolve_devspec("LABEL=data"), "sda")
+                    self.assertEqual(blivet.udev.resolve_devspec("sdb"), "sdb")
+                self.assertEqual(global_udev.list_devices.call_count, 1)
+
+                # only the indexes needed so far have been built
+                snapshot = blivet.udev._snapshot
+                self.assertEqual(sorted(snapshot._indexes.keys()), ["label", "name", "symlink", "sys_name"])
+
+            # dropped when the outermost block is left
+            self.assertIsNone(blivet.udev._snapshot)
+
+
+class UdevInfoTest(unittest.TestCase):
+
+    def test_udev_info(self):
+        import blivet.udev
+        properties = mock.Mock(wraps=dict(DEVNAME="/dev/sda", DEVTYPE="disk"))
+        device = mock.Mock(sys_name="sda", sys_path="/sys/block/sda", properties=properties)
+
+        info = blivet.udev.device_to_dict(device)
+        self.assertEqual(info["SYS_NAME"], "sda")
+        self.assertEqual(info["DEVNAME"], "/dev/sda")
+        self.assertEqual(info.get("DEVNAME"), "/dev/sda")
+        self.assertIsNone(info.get("ID_FS_TYPE"))
+        self.assertNotIn("ID_FS_TYPE", info)
+        self.assertEqual(properties.get.call_count, 2)
+        self.assertFalse(properties.items.called)
+        self.assertFalse(info.frozen)
+
+        info["ID_FS_TYPE"] = "ext4"
+        self.assertEqual(info.freeze(), info)
+        self.assertTrue(info.frozen)
+        self.assertEqual(dict(info), dict(SYS_NAME="sda", SYS_PATH="/sys/block/sda", DEVNAME="/dev/sda",
+                                          DEVTYPE="disk", ID_FS_TYPE="ext4"))
+        self.assertEqual(len(info), 5)
+
+        del info["DEVTYPE"]
+        self.assertNotIn("DEVTYPE", info)
+
+
+class UdevWaitTest(unittest.TestCase):
+
+    @mock.patch("blivet.udev.running_in_chroot", return_value=False)
+    @mock.patch("blivet.udev.settle")
+    @mock.patch("blivet.udev.pyudev.Monitor")
+    def test_wait_for_device(self, monitor_class, settle, *args):  # pylint: disable=unused-argument
+        import blivet.udev
+        monitor = monitor_class.from_netlink.return_value
+
+        # already there, no need to watch uevents
+        with mock.patch("blivet.udev._device_in_state", return_value=True):
+            self.assertTrue(blivet.udev.wait_for_device(device_node="/dev/sda"))
+        self.assertFalse(monitor_class.from_netlink.called)
+
+        # gets there after a few uevents
+        with mock.patch("blivet.udev._device_in_state", side_effect=[False, False, False, True]):
+            self.assertTrue(blivet.udev.wait_for_device(device_node="/dev/sda"))
+        self.assertEqual(monitor.poll.call_count, 2)
+        self.assertFalse(settle.called)
+
+        # falls back to settling when it takes too long
+        with mock.patch("blivet.udev._device_in_state", return_value=False):
+            self.assertFalse(blivet.udev.wait_for_device(device_node="/dev/sda", timeout=0))
+        self.assertTrue(settle.called)
+
+    def test_device_in_state(self):
+        import blivet.udev
+        self.assertTrue(blivet.udev._device_in_state(None, "/dev/nonexistent-device", False))
+        self.assertFalse(blivet.udev._device_in_state(None, "/dev/nonexistent-device", True))
@@ -7,6 +7,8 @@ except ImportError:
 import os
 import six
 import tempfile
+import threading
+import time
 import unittest
 from unittest.mock import patch
 from decimal import Decimal
@@ -15,6 +17,8 @@ from io import StringIO
 
 from blivet import errors
 from blivet import util
+from blivet.flags import flags
+from blivet.threads import run_concurrently
 from blivet.size import Size
 
 
@@ -167,6 +171,52 @@ class DependencyGuardTestCase(unittest.TestCase):
             self.assertEqual(self._test_dependency_guard_critical(), True)
 
 
+class RunProgramTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.addCleanup(setattr, flags, "program_workers", flags.program_workers)
+
+    def test_run_program_concurrently(self):
+        flags.program_workers = 2
+        running = [0, 0]  # current, maximum
+        lock = threading.Lock()
+        exec_program = util._exec_program
+
+        def tracked_exec_program(*args):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.05)
+            try:
+                return exec_program(*args)
+            finally:
+                with lock:
+                    running[0] -= 1
+
+        def run(i):
+            return util.run_program_and_capture_output(["sh", "-c", "echo a%d; echo b%d" % (i, i)])
+
+        with mock.patch.object(util, "_exec_program", side_effect=tracked_exec_program), \
+                mock.patch.object(util, "program_log") as program_log:
+            results = run_concurrently(run, range(6), 6)
+
+        self.assertEqual(results, [(0, "a%d\nb%d\n" % (i, i)) for i in range(6)])
+        self.assertLessEqual(running[1], 2)
+
+        # every invocation's log block is tagged with its id and not interleaved
+        records = [(c[0][2], c[0][1].endswith("Running... %s")) for c in program_log.log.call_args_list]
+        starts = [i for (i, start) in records if start]
+        self.assertEqual(len(set(starts)), 6)
+        ids = [i for (i, start) in records if not start]
+        self.assertEqual(set(ids), set(starts))
+        blocks = [i for (n, i) in enumerate(ids) if n == 0 or ids[n - 1] != i]
+        self.assertEqual(sorted(blocks), sorted(set(ids)))
+
+        # the start of each run is logged right away, before its output
+        for i in starts:
+            self.assertTrue(next(start for (j, start) in records if j == i))
+
+
 class GetSysfsAttrTestCase(unittest.TestCase):
 
     def test_get_sysfs_attr(self):